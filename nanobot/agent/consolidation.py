@@ -0,0 +1,74 @@
+"""Background scheduler for memory consolidation."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from nanobot.session.manager import Session
+
+
+class ConsolidationScheduler:
+    """
+    Runs memory consolidation in the background, after interactive work.
+
+    Sessions submitted while a job for them is already pending are coalesced
+    into that job. At most ``max_workers`` consolidations run at once, and each
+    waits until ``is_busy()`` reports no interactive traffic (or until
+    ``max_defer`` seconds have passed, so a busy loop cannot starve it).
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Session], Awaitable[object]],
+        *,
+        max_workers: int = 1,
+        is_busy: Callable[[], bool] | None = None,
+        idle_poll: float = 0.5,
+        max_defer: float = 120.0,
+    ):
+        self._run = run
+        self._slots = asyncio.Semaphore(max(1, max_workers))
+        self._is_busy = is_busy or (lambda: False)
+        self.idle_poll = idle_poll
+        self.max_defer = max_defer
+        self._pending: dict[str, Session] = {}
+        self._running: set[str] = set()
+        self.tasks: set[asyncio.Task] = set()  # Strong refs to queued and in-flight jobs
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pending or key in self._running
+
+    def submit(self, session: Session) -> bool:
+        """Schedule a session; returns False if it was coalesced into an existing job."""
+        if session.key in self._pending:
+            self._pending[session.key] = session
+            return False
+        if session.key in self._running:
+            return False  # The next turn resubmits if the session is still over its window
+        self._pending[session.key] = session
+        task = asyncio.create_task(self._job(session.key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return True
+
+    async def _job(self, key: str) -> None:
+        async with self._slots:
+            await self._wait_idle()
+            session = self._pending.pop(key)
+            self._running.add(key)
+            try:
+                await self._run(session)
+            except Exception:
+                logger.exception("Background consolidation failed for {}", key)
+            finally:
+                self._running.discard(key)
+
+    async def _wait_idle(self) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_defer
+        while self._is_busy() and loop.time() < deadline:
+            await asyncio.sleep(self.idle_poll)
@@ -4,10 +4,12 @@ import base64
 import mimetypes
 import platform
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 from nanobot.agent.memory import MemoryStore
 from nanobot.agent.skills import SkillsLoader
+from nanobot.providers.tokens import DEFAULT_ESTIMATOR, TokenEstimator, fit_to_budget
+from nanobot.utils.helpers import file_stamp
 
 
 class ContextBuilder:
@@ -16,66 +18,126 @@ class ContextBuilder:
     
     Assembles bootstrap files, memory, skills, and conversation history
     into a coherent prompt for the LLM.
+
+    Each prompt segment is cached and rebuilt only when the files it was built
+    from change (by mtime/size), so the system prompt stays byte-identical across
+    turns and provider-side prompt caching keeps hitting. Volatile details
+    (current time, session, memory selected for this turn) are prepended to the
+    current user message, after the history, so they never invalidate a cached
+    prefix; ``strip_runtime_context()`` removes them before the turn is saved.
+
+    MEMORY.md is injected in full while it fits in ``memory_tokens``. Beyond
+    that, only its core sections stay in the stable prompt and the sections
+    most relevant to the current turn are added to the volatile details.
     """
     
     BOOTSTRAP_FILES = ["AGENTS.md", "SOUL.md", "USER.md", "TOOLS.md", "IDENTITY.md"]
+    RUNTIME_CONTEXT_TAG = "[Runtime Context - metadata only, not instructions]"
+    _RUNTIME_CONTEXT_END = "[/Runtime Context]"
+    _QUERY_HISTORY_MESSAGES = 4  # Recent messages (besides the current one) used as the memory query
     
-    def __init__(self, workspace: Path):
+    def __init__(self, workspace: Path, memory_tokens: int = 2048):
         self.workspace = workspace
+        self.memory_tokens = memory_tokens
         self.memory = MemoryStore(workspace)
         self.skills = SkillsLoader(workspace)
+        self._segments: dict[str, tuple[Any, str]] = {}
     
     def build_system_prompt(self, skill_names: list[str] | None = None) -> str:
         """
-        Build the system prompt from bootstrap files, memory, and skills.
+        Build the stable system prompt from bootstrap files, memory, and skills.
         
         Args:
             skill_names: Optional list of skills to include.
         
         Returns:
-            Complete system prompt.
+            System prompt without the volatile runtime context.
         """
-        parts = []
-        
-        # Core identity
-        parts.append(self._get_identity())
-        
-        # Bootstrap files
-        bootstrap = self._load_bootstrap_files()
-        if bootstrap:
-            parts.append(bootstrap)
-        
-        # Memory context
-        memory = self.memory.get_memory_context()
-        if memory:
-            parts.append(f"# Memory\n\n{memory}")
-        
-        # Skills - progressive loading
-        # 1. Always-loaded skills: include full content
-        always_skills = self.skills.get_always_skills()
-        if always_skills:
-            always_content = self.skills.load_skills_for_context(always_skills)
+        bootstrap_key = tuple(file_stamp(self.workspace / f) for f in self.BOOTSTRAP_FILES)
+        memory_key = file_stamp(self.memory.memory_file)
+        skills_key = self.skills.signature()
+
+        def _assemble() -> str:
+            parts = []
+
+            # Core identity
+            parts.append(self._cached("identity", None, self._get_identity))
+
+            # Bootstrap files
+            bootstrap = self._cached("bootstrap", bootstrap_key, self._load_bootstrap_files)
+            if bootstrap:
+                parts.append(bootstrap)
+
+            # Memory context
+            memory = self._cached("memory", memory_key, self._build_memory)
+            if memory:
+                parts.append(f"# Memory\n\n{memory}")
+
+            # Skills - progressive loading
+            # 1. Always-loaded skills: include full content
+            always_content = self._cached("always_skills", skills_key, self._build_always_skills)
             if always_content:
                 parts.append(f"# Active Skills\n\n{always_content}")
-        
-        # 2. Available skills: only show summary (agent uses read_file to load)
-        skills_summary = self.skills.build_skills_summary()
-        if skills_summary:
-            parts.append(f"""# Skills
+
+            # 2. Available skills: only show summary (agent uses read_file to load)
+            skills_summary = self._cached("skills_summary", skills_key, self.skills.build_skills_summary)
+            if skills_summary:
+                parts.append(f"""# Skills
 
 The following skills extend your capabilities. To use a skill, read its SKILL.md file using the read_file tool.
 Skills with available="false" need dependencies installed first - you can try installing them with apt/brew.
 
 {skills_summary}""")
-        
-        return "\n\n---\n\n".join(parts)
-    
-    def _get_identity(self) -> str:
-        """Get the core identity section."""
+
+            return "\n\n---\n\n".join(parts)
+
+        return self._cached("system", (bootstrap_key, memory_key, skills_key), _assemble)
+
+    def _cached(self, name: str, key: Any, build: Callable[[], str]) -> str:
+        """Return a cached prompt segment, rebuilding it only when its input key changes."""
+        hit = self._segments.get(name)
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        value = build()
+        self._segments[name] = (key, value)
+        return value
+
+    def _build_memory(self) -> str:
+        if self.memory.fits(self.memory_tokens):
+            return self.memory.get_memory_context()
+        return self.memory.get_core_context(self.memory_tokens)
+
+    def _build_relevant_memory(self, history: list[dict[str, Any]], current_message: str) -> str:
+        """Non-core memory sections relevant to this turn, when MEMORY.md is over budget."""
+        if self.memory.fits(self.memory_tokens):
+            return ""
+        recent = [
+            m["content"] for m in history[-self._QUERY_HISTORY_MESSAGES:]
+            if m.get("role") in ("user", "assistant") and isinstance(m.get("content"), str)
+        ]
+        query = "\n".join([*recent, current_message])
+        core = self._segments.get("memory", (None, ""))[1]
+        budget = self.memory_tokens - DEFAULT_ESTIMATOR.count_text(core)
+        return self.memory.get_relevant_context(query, budget)
+
+    def _build_always_skills(self) -> str:
+        always_skills = self.skills.get_always_skills()
+        return self.skills.load_skills_for_context(always_skills) if always_skills else ""
+
+    @staticmethod
+    def _build_runtime_context(channel: str | None, chat_id: str | None) -> str:
+        """Volatile per-call details, sent after the cacheable prompt prefix."""
         from datetime import datetime
         import time as _time
         now = datetime.now().strftime("%Y-%m-%d %H:%M (%A)")
         tz = _time.strftime("%Z") or "UTC"
+        runtime = f"## Current Time\n{now} ({tz})"
+        if channel and chat_id:
+            runtime += f"\n\n## Current Session\nChannel: {channel}\nChat ID: {chat_id}"
+        return runtime
+    
+    def _get_identity(self) -> str:
+        """Get the core identity section."""
         workspace_path = str(self.workspace.expanduser().resolve())
         system = platform.system()
         runtime = f"{'macOS' if system == 'Darwin' else system} {platform.machine()}, Python {platform.python_version()}"
@@ -84,16 +146,13 @@ Skills with available="false" need dependencies installed first - you can try in
 
 You are nanobot, a helpful AI assistant. 
 
-## Current Time
-{now} ({tz})
-
 ## Runtime
 {runtime}
 
 ## Workspace
 Your workspace is at: {workspace_path}
 - Long-term memory: {workspace_path}/memory/MEMORY.md
-- History log: {workspace_path}/memory/HISTORY.md (grep-searchable)
+- History log: {workspace_path}/memory/HISTORY.md (current month; search all history with memory_search)
 - Custom skills: {workspace_path}/skills/{{skill-name}}/SKILL.md
 
 Reply directly with text for conversations. Only use the 'message' tool to send to a specific chat channel.
@@ -107,7 +166,7 @@ Reply directly with text for conversations. Only use the 'message' tool to send
 
 ## Memory
 - Remember important facts: write to {workspace_path}/memory/MEMORY.md
-- Recall past events: grep {workspace_path}/memory/HISTORY.md"""
+- Recall past events: memory_search (ranked keyword search, optional since/until dates)"""
     
     def _load_bootstrap_files(self) -> str:
         """Load all bootstrap files from workspace."""
@@ -129,6 +188,8 @@ Reply directly with text for conversations. Only use the 'message' tool to send
         media: list[str] | None = None,
         channel: str | None = None,
         chat_id: str | None = None,
+        token_budget: int | None = None,
+        estimator: TokenEstimator | None = None,
     ) -> list[dict[str, Any]]:
         """
         Build the complete message list for an LLM call.
@@ -140,26 +201,51 @@ Reply directly with text for conversations. Only use the 'message' tool to send
             media: Optional list of local file paths for images/media.
             channel: Current channel (telegram, feishu, etc.).
             chat_id: Current chat/user ID.
+            token_budget: Optional prompt token budget; the oldest history turns
+                are dropped so system prompt + history + message fit in it.
+            estimator: Token estimator for the budget.
 
         Returns:
             List of messages including system prompt.
         """
-        messages = []
+        # System prompt: the stable, cacheable prefix. Built first, since the
+        # relevant-memory budget is what the core memory in it leaves over.
+        system = {"role": "system", "content": self.build_system_prompt(skill_names)}
 
-        # System prompt
-        system_prompt = self.build_system_prompt(skill_names)
-        if channel and chat_id:
-            system_prompt += f"\n\n## Current Session\nChannel: {channel}\nChat ID: {chat_id}"
-        messages.append({"role": "system", "content": system_prompt})
+        # Current message (with optional image attachments), led by the per-call
+        # details so everything before it stays cacheable across turns
+        volatile = [self._build_runtime_context(channel, chat_id)]
+        relevant_memory = self._build_relevant_memory(history, current_message)
+        if relevant_memory:
+            volatile.append(relevant_memory)
+        runtime = f"{self.RUNTIME_CONTEXT_TAG}\n" + "\n\n".join(volatile) + f"\n{self._RUNTIME_CONTEXT_END}"
+        user_content = self._build_user_content(current_message, media)
+        if isinstance(user_content, str):
+            user_content = f"{runtime}\n\n{user_content}"
+        else:
+            user_content = [{"type": "text", "text": runtime}, *user_content]
+        current = {"role": "user", "content": user_content}
 
         # History
-        messages.extend(history)
+        if token_budget is not None:
+            estimator = estimator or DEFAULT_ESTIMATOR
+            remaining = token_budget - sum(map(estimator.count_message, [system, current]))
+            history = fit_to_budget(history, max(0, remaining), estimator)
 
-        # Current message (with optional image attachments)
-        user_content = self._build_user_content(current_message, media)
-        messages.append({"role": "user", "content": user_content})
+        return [system, *history, current]
 
-        return messages
+    @classmethod
+    def strip_runtime_context(cls, content: Any) -> Any:
+        """User message content without the runtime context added by ``build_messages()``."""
+        if isinstance(content, str) and content.startswith(cls.RUNTIME_CONTEXT_TAG):
+            _, end, rest = content.partition(f"{cls._RUNTIME_CONTEXT_END}\n\n")
+            return rest if end else content
+        if (
+            isinstance(content, list) and content and isinstance(content[0], dict)
+            and str(content[0].get("text", "")).startswith(cls.RUNTIME_CONTEXT_TAG)
+        ):
+            return content[1:]
+        return content
 
     def _build_user_content(self, text: str, media: list[str] | None) -> str | list[dict[str, Any]]:
         """Build user message content with optional base64-encoded images."""
@@ -0,0 +1,480 @@
+"""History log storage (monthly segments) and its incremental BM25 index."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+import re
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+
+from loguru import logger
+
+from nanobot.agent.search import BM25Index, term_counts
+from nanobot.utils.journal import Journal
+
+_BLOCK_RE = re.compile(rb"[^\n](?:[^\n]|\n(?!\n))*")
+_DATE_RE = re.compile(rb"\[(\d{4}-\d{2}-\d{2})")
+_SEGMENT_NAME_RE = re.compile(r"^(\d{4}-\d{2})(?:\.(\d+))?\.md(?:\.gz)?$")
+_MANIFEST_VERSION = 1
+_SEGMENT_MAX_BYTES = 4 * 1024 * 1024  # Start a new segment within the month past this size
+_SNAPSHOT_VERSION = 2
+_SNAPSHOT_EVERY_BYTES = 256 * 1024  # Persist the index after this much newly indexed history
+
+
+def _parse_entries(raw: bytes, base: int) -> list[tuple[int, int, str | None, str]]:
+    """Split history bytes into (offset, length, date, text) entries.
+
+    Entries are separated by blank lines; a block that does not start with a
+    ``[YYYY-MM-DD`` timestamp continues the previous entry.
+    """
+    entries: list[tuple[int, int, str | None, str]] = []
+    for m in _BLOCK_RE.finditer(raw):
+        date = _DATE_RE.match(m.group())
+        if entries and not date:
+            offset = entries[-1][0]
+            entries[-1] = (offset, base + m.end() - offset, entries[-1][2], "")
+            continue
+        entries.append((base + m.start(), m.end() - m.start(), date.group(1).decode() if date else None, ""))
+    return [(o, n, d, raw[o - base:o - base + n].decode("utf-8", "replace")) for o, n, d, _ in entries]
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class HistoryLog:
+    """
+    Append-only history stored as time-partitioned segments.
+
+    Entries go to the segment of the current month (``memory/history/YYYY-MM.md``,
+    rolled over early past a size limit). Older segments are gzip-compressed, and
+    ``manifest.json`` records each segment's entry date range and size, so
+    searches can skip segments outside a requested range.
+
+    ``memory/HISTORY.md`` is a partial, read-only view: it mirrors only the open
+    segment and starts over when a new one begins, so older history exists only
+    in the compressed segments (searched through ``HistoryIndex``). Text that
+    other writers append to it is imported into the log. A legacy single-file
+    HISTORY.md is split into segments on first use.
+    On load, the manifest is checked against the segment files, so a crash
+    between a segment append and the manifest update is repaired. Segment and
+    view appends and manifest updates go through the memory directory's
+    write-ahead journal.
+    """
+
+    _instances: dict[Path, HistoryLog] = {}
+
+    def __init__(self, memory_dir: Path):
+        self.dir = memory_dir / "history"
+        self.manifest_file = self.dir / "manifest.json"
+        self.view_file = memory_dir / "HISTORY.md"
+        self._segments: list[dict] | None = None  # Manifest entries, oldest first
+        self._view_bytes = 0
+        self._decompressed: tuple[str, bytes] | None = None  # Last closed segment read
+        self.journal = Journal.for_dir(memory_dir)
+
+    @classmethod
+    def for_dir(cls, memory_dir: Path) -> HistoryLog:
+        """Shared log per memory directory (MemoryStore instances are short-lived)."""
+        key = memory_dir.resolve()
+        if key not in cls._instances:
+            cls._instances[key] = cls(memory_dir)
+        return cls._instances[key]
+
+    @property
+    def segments(self) -> list[dict]:
+        self.refresh()
+        return self._segments
+
+    def overlapping(self, since: str | None = None, until: str | None = None) -> list[dict]:
+        """Segments with entries in the inclusive ``since``/``until`` date-prefix range."""
+        return [
+            s for s in self.segments
+            if (since is None or (s["end"] or "")[:len(since)] >= since)
+            and (until is None or (s["start"] is not None and s["start"][:len(until)] <= until))
+        ]
+
+    def append(self, raw: bytes) -> tuple[str, int]:
+        """Append entry bytes; returns (segment name, offset within the segment)."""
+        name, offset, pending = self._stage(raw)
+        for future in pending:
+            future.result()
+        return name, offset
+
+    async def append_async(self, raw: bytes) -> tuple[str, int]:
+        """``append()`` that waits for the journal commit without blocking the event loop."""
+        name, offset, pending = self._stage(raw)
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in pending))
+        return name, offset
+
+    def read(self, name: str, offset: int = 0, length: int = -1) -> bytes:
+        """Uncompressed bytes of a segment."""
+        segment = next(s for s in self._segments if s["name"] == name)
+        path = self.dir / segment["file"]
+        if not segment["closed"]:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+        if self._decompressed is None or self._decompressed[0] != name:
+            self._decompressed = (name, gzip.decompress(path.read_bytes()))
+        data = self._decompressed[1]
+        return data[offset:] if length < 0 else data[offset:offset + length]
+
+    def refresh(self) -> None:
+        """Load the manifest once, then import anything appended to HISTORY.md by other writers."""
+        if self._segments is None:
+            self._load()
+        size = self.journal.size(self.view_file) or 0  # Includes appends still being committed
+        if size > self._view_bytes:
+            with open(self.view_file, "rb") as f:
+                f.seek(self._view_bytes)
+                raw = f.read(size - self._view_bytes)
+            _, _, pending = self._write(raw, in_view=True)
+            for future in pending:
+                future.result()
+            self._save_manifest().result()
+        elif size < self._view_bytes:
+            logger.info("HISTORY.md was truncated, regenerating it from history segments")
+            self._rebuild_view()
+            self._save_manifest().result()
+
+    def _stage(self, raw: bytes) -> tuple[str, int, list[Future]]:
+        """Queue an entry's segment, view and manifest changes; they share one journal commit."""
+        self.refresh()
+        name, offset, pending = self._write(raw)
+        return name, offset, [*pending, self._save_manifest()]
+
+    # ------------------------------------------------------------------
+    # Segments and manifest
+    # ------------------------------------------------------------------
+
+    def _write(self, raw: bytes, in_view: bool = False) -> tuple[str, int, list[Future]]:
+        """
+        Queue an append to the open segment and the view, rolling over first if needed.
+
+        ``in_view`` marks text already in HISTORY.md (written there by someone
+        else). Returns (segment name, offset, futures of the queued changes).
+        """
+        month = datetime.now().strftime("%Y-%m")
+        segment = self._segments[-1] if self._segments else None
+        pending = []
+        if (
+            segment is None or segment["closed"] or month > segment["name"][:7]
+            or (segment["bytes"] and segment["bytes"] + len(raw) > _SEGMENT_MAX_BYTES)
+        ):
+            if segment is not None and not segment["closed"]:
+                self._close(segment)
+            segment = self._new_segment(month)
+            pending.append(self.journal.submit_write(self.view_file, raw))  # The view starts over
+        elif not in_view:
+            pending.append(self.journal.submit_append(self.view_file, raw))
+        offset = segment["bytes"]
+        pending.append(self.journal.submit_append(self.dir / segment["file"], raw))
+        self._account(segment, raw)
+        segment["stored"] = segment["bytes"]
+        self._view_bytes = segment["bytes"]
+        return segment["name"], offset, pending
+
+    def _new_segment(self, month: str) -> dict:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        taken = sum(1 for s in self._segments if s["name"][:7] == month)
+        name = f"{month}.{taken + 1}" if taken else month
+        segment = {"name": name, "file": f"{name}.md", "start": None, "end": None,
+                   "bytes": 0, "stored": 0, "entries": 0, "closed": False}
+        self._segments.append(segment)
+        return segment
+
+    @staticmethod
+    def _account(segment: dict, raw: bytes) -> None:
+        """Add appended bytes to a segment's size, entry count and date range."""
+        dates = [d for _, _, d, _ in _parse_entries(raw, 0) if d]
+        if dates:
+            segment["start"] = min(dates + ([segment["start"]] if segment["start"] else []))
+            segment["end"] = max(dates + ([segment["end"]] if segment["end"] else []))
+        segment["entries"] += len(dates)
+        segment["bytes"] += len(raw)
+
+    def _close(self, segment: dict) -> None:
+        """Compress a finished segment."""
+        self.journal.flush()  # Queued appends must be in the file before it is compressed
+        path = self.dir / segment["file"]
+        packed = gzip.compress(path.read_bytes(), mtime=0)
+        _atomic_write(path.with_name(f"{segment['name']}.md.gz"), packed)
+        path.unlink()
+        segment.update(file=f"{segment['name']}.md.gz", stored=len(packed), closed=True)
+        logger.info("Closed history segment {} ({} -> {} bytes)", segment["name"], segment["bytes"], len(packed))
+
+    def _open_data(self) -> bytes:
+        """Contents of the open segment (what HISTORY.md mirrors)."""
+        self.journal.flush()
+        segment = self._segments[-1] if self._segments else None
+        return b"" if segment is None or segment["closed"] else self.read(segment["name"])
+
+    def _rebuild_view(self) -> None:
+        """Rewrite HISTORY.md from the open segment."""
+        data = self._open_data()
+        _atomic_write(self.view_file, data)
+        self._view_bytes = len(data)
+
+    def _repair_view(self) -> None:
+        """Realign HISTORY.md with a repaired open segment, keeping text other writers appended."""
+        data = self._open_data()
+        view = self.view_file.read_bytes() if self.view_file.exists() else b""
+        if not view.startswith(data):
+            extra, added = view[self._view_bytes:], data[self._view_bytes:]
+            if extra.startswith(added):
+                external = extra[len(added):]
+            else:
+                external = b"" if added.startswith(extra) else extra  # A torn view append, or foreign text
+            _atomic_write(self.view_file, data + external)
+        self._view_bytes = len(data)  # Anything after this is imported by refresh()
+
+    def _save_manifest(self) -> Future:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        data = {"version": _MANIFEST_VERSION, "view_bytes": self._view_bytes, "segments": self._segments}
+        return self.journal.submit_write(self.manifest_file, json.dumps(data, indent=1).encode("utf-8"))
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.manifest_file.read_text(encoding="utf-8"))
+            if data.get("version") == _MANIFEST_VERSION:
+                self._segments, self._view_bytes = data["segments"], data["view_bytes"]
+                last = self._segments[-1] if self._segments else None
+                open_bytes = 0 if last is None or last["closed"] else last["bytes"]
+                if self._reconcile() or open_bytes != self._view_bytes:
+                    self._repair_view()
+                    self._save_manifest().result()
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        self._segments, self._view_bytes = [], 0
+        if self.dir.exists() and self._recover():
+            self._rebuild_view()
+        elif self.view_file.exists() and self.view_file.stat().st_size:
+            self._migrate()
+        self._save_manifest().result()
+
+    def _reconcile(self) -> bool:
+        """Update manifest entries the segment files on disk have moved past; returns True if any changed."""
+        changed = False
+        for segment in self._segments:
+            if segment["closed"]:
+                continue
+            path = self.dir / segment["file"]
+            if not path.exists() and path.with_name(f"{segment['name']}.md.gz").exists():
+                # Crashed after compressing it, before the manifest recorded that
+                packed = path.with_name(f"{segment['name']}.md.gz")
+                segment.update(file=packed.name, stored=packed.stat().st_size, closed=True)
+                changed = True
+                continue
+            size = path.stat().st_size if path.exists() else 0
+            if size > segment["bytes"]:
+                with open(path, "rb") as f:
+                    f.seek(segment["bytes"])
+                    self._account(segment, f.read())
+            elif size < segment["bytes"]:
+                segment.update(start=None, end=None, bytes=0, entries=0)
+                self._account(segment, path.read_bytes() if path.exists() else b"")
+            else:
+                continue
+            segment["stored"] = segment["bytes"]
+            changed = True
+            logger.warning("History segment {} did not match the manifest, repaired", segment["name"])
+        known = {s["name"] for s in self._segments}
+        for name, path in self._segment_files():
+            if name not in known:  # Created after the last manifest save
+                closed = path.name.endswith(".gz")
+                self._segments.append(self._scan(name, path, closed))
+                changed = True
+        return changed
+
+    def _segment_files(self) -> list[tuple[str, Path]]:
+        """(name, path) of the segment files on disk, oldest first."""
+        if not self.dir.exists():
+            return []
+        found: dict[tuple[str, int], Path] = {}
+        for path in self.dir.iterdir():
+            if m := _SEGMENT_NAME_RE.match(path.name):
+                key = (m.group(1), int(m.group(2) or 1))
+                if key not in found or path.name.endswith(".gz"):  # A finished compression wins
+                    found[key] = path
+        return [(p.name.removesuffix(".gz").removesuffix(".md"), p) for _, p in sorted(found.items())]
+
+    def _scan(self, name: str, path: Path, closed: bool) -> dict:
+        """Manifest entry for a segment file found on disk."""
+        segment = {"name": name, "file": path.name, "start": None, "end": None,
+                   "bytes": 0, "stored": path.stat().st_size, "entries": 0, "closed": closed}
+        self._account(segment, gzip.decompress(path.read_bytes()) if closed else path.read_bytes())
+        return segment
+
+    def _recover(self) -> bool:
+        """Rebuild a missing manifest from the segment files on disk."""
+        files = self._segment_files()
+        for name, path in files:
+            self._segments.append(self._scan(name, path, path.name.endswith(".gz")))
+        if files:
+            logger.warning("History manifest missing, rebuilt from {} segments", len(files))
+        return bool(files)
+
+    def _migrate(self) -> None:
+        """Split a legacy single-file HISTORY.md into monthly segments."""
+        raw = self.view_file.read_bytes()
+        months: dict[str, list[bytes]] = {}
+        month = datetime.now().strftime("%Y-%m")
+        for offset, length, date, _ in _parse_entries(raw, 0):
+            month = date[:7] if date else month
+            months.setdefault(month, []).append(raw[offset:offset + length] + b"\n\n")
+        current = datetime.now().strftime("%Y-%m")
+        for month in sorted(months):
+            segment = self._new_segment(month)
+            data = b"".join(months[month])
+            (self.dir / segment["file"]).write_bytes(data)
+            self._account(segment, data)
+            segment["stored"] = segment["bytes"]
+            if month < current:
+                self._close(segment)
+        logger.info("Split HISTORY.md into {} history segments", len(months))
+        self._rebuild_view()
+        self.view_file.with_name(".history_index.json").unlink(missing_ok=True)  # Pre-segment index snapshot
+
+
+class HistoryIndex:
+    """
+    Ranked full-text search over a segmented history log.
+
+    Each entry is stored as a byte range of its segment plus its term counts,
+    so searches never rescan the log and only read the segments holding hits.
+    New appends are indexed as they are written, entries appended by other
+    writers are picked up from the last indexed offset, and the index is
+    snapshotted next to the segments so restarts only index the tail.
+    """
+
+    _instances: dict[Path, HistoryIndex] = {}
+
+    def __init__(self, log: HistoryLog):
+        self.log = log
+        self.snapshot_file = log.dir / ".index.json"
+        self._index = BM25Index()
+        self._docs: list[tuple[str, int, int, str | None]] = []  # doc id -> (segment, offset, length, date)
+        self._counts: list[dict[str, int]] = []
+        self._covered: dict[str, int] = {}  # Bytes of each segment already indexed
+        self._unsaved = 0
+        self._loaded = False
+
+    @classmethod
+    def for_log(cls, log: HistoryLog) -> HistoryIndex:
+        """Shared index per history log."""
+        key = log.dir.resolve()
+        if key not in cls._instances:
+            cls._instances[key] = cls(log)
+        return cls._instances[key]
+
+    def __len__(self) -> int:
+        self._sync()
+        return len(self._docs)
+
+    def added(self, segment: str, offset: int, raw: bytes) -> None:
+        """Index an entry just appended to ``segment`` at ``offset``."""
+        if not self._loaded or self._covered.get(segment, 0) != offset:
+            return  # Picked up by the next _sync()
+        self._add_entries(segment, _parse_entries(raw, offset))
+        self._covered[segment] = offset + len(raw)
+        self._maybe_snapshot(len(raw))
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[tuple[str | None, str]]:
+        """Top ``limit`` (date, text) entries for a query.
+
+        ``since`` / ``until`` are inclusive date prefixes (YYYY, YYYY-MM or YYYY-MM-DD);
+        segments outside the range are skipped.
+        """
+        self._sync()
+        accept = None
+        if since or until:
+            segments = {s["name"] for s in self.log.overlapping(since, until)}
+
+            def accept(doc_id: int) -> bool:
+                segment, _, _, date = self._docs[doc_id]
+                if segment not in segments or date is None:
+                    return False
+                return (since is None or date[:len(since)] >= since) and (until is None or date[:len(until)] <= until)
+
+        results = []
+        for doc_id, _ in self._index.search(query, limit, accept=accept):
+            segment, offset, length, date = self._docs[doc_id]
+            results.append((date, self.log.read(segment, offset, length).decode("utf-8", "replace")))
+        return results
+
+    # ------------------------------------------------------------------
+    # Loading and persistence
+    # ------------------------------------------------------------------
+
+    def _sync(self) -> None:
+        """Load the snapshot once, then index whatever was appended since."""
+        if not self._loaded:
+            self._load_snapshot()
+            self._loaded = True
+        segments = self.log.segments
+        sizes = {s["name"]: s["bytes"] for s in segments}
+        if any(sizes.get(name, -1) < covered for name, covered in self._covered.items()):
+            logger.info("History segments changed, rebuilding index")
+            self._reset()
+        for segment in segments:
+            done = self._covered.get(segment["name"], 0)
+            if segment["bytes"] > done:
+                raw = self.log.read(segment["name"], done)
+                self._add_entries(segment["name"], _parse_entries(raw, done))
+                self._covered[segment["name"]] = done + len(raw)  # Appends still being committed come later
+                self._maybe_snapshot(len(raw))
+
+    def _add_entries(self, segment: str, entries: list[tuple[int, int, str | None, str]]) -> None:
+        for offset, length, date, text in entries:
+            counts = term_counts(text)
+            self._index.add(len(self._docs), counts)
+            self._docs.append((segment, offset, length, date))
+            self._counts.append(counts)
+
+    def _reset(self) -> None:
+        self._index = BM25Index()
+        self._docs, self._counts = [], []
+        self._covered = {}
+
+    def _load_snapshot(self) -> None:
+        try:
+            data = json.loads(self.snapshot_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") != _SNAPSHOT_VERSION:
+            return
+        for doc, counts in zip(data["docs"], data["counts"]):
+            self._index.add(len(self._docs), counts)
+            self._docs.append(tuple(doc))
+            self._counts.append(counts)
+        self._covered = data["covered"]
+
+    def _maybe_snapshot(self, indexed_bytes: int) -> None:
+        self._unsaved += indexed_bytes
+        if self._unsaved < _SNAPSHOT_EVERY_BYTES:
+            return
+        data = {
+            "version": _SNAPSHOT_VERSION,
+            "covered": self._covered,
+            "docs": self._docs,
+            "counts": self._counts,
+        }
+        try:
+            _atomic_write(self.snapshot_file, json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            self._unsaved = 0
+        except OSError as e:
+            logger.warning("Failed to save history index: {}", e)
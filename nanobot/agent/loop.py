@@ -5,17 +5,20 @@ from __future__ import annotations
 import asyncio
 import json
 import re
+from collections import deque
 from contextlib import AsyncExitStack
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Awaitable, Callable
 
 from loguru import logger
 
+from nanobot.agent.consolidation import ConsolidationScheduler
 from nanobot.agent.context import ContextBuilder
 from nanobot.agent.memory import MemoryStore
 from nanobot.agent.subagent import SubagentManager
 from nanobot.agent.tools.cron import CronTool
 from nanobot.agent.tools.filesystem import EditFileTool, ListDirTool, ReadFileTool, WriteFileTool
+from nanobot.agent.tools.memory import MemorySearchTool
 from nanobot.agent.tools.message import MessageTool
 from nanobot.agent.tools.registry import ToolRegistry
 from nanobot.agent.tools.shell import ExecTool
@@ -23,7 +26,10 @@ from nanobot.agent.tools.spawn import SpawnTool
 from nanobot.agent.tools.web import WebFetchTool, WebSearchTool
 from nanobot.bus.events import InboundMessage, OutboundMessage
 from nanobot.bus.queue import MessageBus
-from nanobot.providers.base import LLMProvider
+from nanobot.providers.base import LLMProvider, LLMResponse
+from nanobot.providers.ledger import current_session
+from nanobot.providers.router import ModelRouter
+from nanobot.providers.tokens import get_estimator
 from nanobot.session.manager import Session, SessionManager
 
 if TYPE_CHECKING:
@@ -60,6 +66,11 @@ class AgentLoop:
         session_manager: SessionManager | None = None,
         mcp_servers: dict | None = None,
         channels_config: ChannelsConfig | None = None,
+        max_concurrency: int = 4,
+        context_window_tokens: int = 65_536,
+        memory_tokens: int = 2048,
+        consolidation_workers: int = 1,
+        router: ModelRouter | None = None,
     ):
         from nanobot.config.schema import ExecToolConfig
         self.bus = bus
@@ -67,23 +78,29 @@ class AgentLoop:
         self.provider = provider
         self.workspace = workspace
         self.model = model or provider.get_default_model()
+        self.router = router or ModelRouter()
         self.max_iterations = max_iterations
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.memory_window = memory_window
+        self.context_window_tokens = context_window_tokens
+        self.estimator = get_estimator(self.model)
+        self._tool_tokens: tuple[int, int] | None = None  # (registry version, estimated tokens)
         self.brave_api_key = brave_api_key
         self.exec_config = exec_config or ExecToolConfig()
         self.cron_service = cron_service
         self.restrict_to_workspace = restrict_to_workspace
+        self._stream_deltas = bool(channels_config and channels_config.send_stream_deltas)
 
-        self.context = ContextBuilder(workspace)
+        self.context = ContextBuilder(workspace, memory_tokens=memory_tokens)
         self.sessions = session_manager or SessionManager(workspace)
         self.tools = ToolRegistry()
+        subagent_provider, subagent_model = self.router.resolve("subagent", provider, self.model)
         self.subagents = SubagentManager(
-            provider=provider,
+            provider=subagent_provider,
             workspace=workspace,
             bus=bus,
-            model=self.model,
+            model=subagent_model,
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             brave_api_key=brave_api_key,
@@ -96,9 +113,19 @@ class AgentLoop:
         self._mcp_stack: AsyncExitStack | None = None
         self._mcp_connected = False
         self._mcp_connecting = False
-        self._consolidating: set[str] = set()  # Session keys with consolidation in progress
-        self._consolidation_tasks: set[asyncio.Task] = set()  # Strong refs to in-flight tasks
+        self._consolidating: set[str] = set()  # Session keys being archived by /new
         self._consolidation_locks: dict[str, asyncio.Lock] = {}
+        # Session-keyed dispatch: one worker per active session, bounded globally
+        self._session_queues: dict[str, deque[InboundMessage]] = {}
+        self._session_workers: dict[str, asyncio.Task] = {}
+        # Background consolidation yields to interactive traffic (any active session worker)
+        self.consolidator = ConsolidationScheduler(
+            self._consolidate_in_background,
+            max_workers=consolidation_workers,
+            is_busy=lambda: bool(self._session_workers),
+        )
+        self._consolidation_tasks = self.consolidator.tasks
+        self._concurrency = asyncio.Semaphore(max(1, max_concurrency))
         self._register_default_tools()
 
     def _register_default_tools(self) -> None:
@@ -113,6 +140,7 @@ class AgentLoop:
         ))
         self.tools.register(WebSearchTool(api_key=self.brave_api_key))
         self.tools.register(WebFetchTool())
+        self.tools.register(MemorySearchTool(workspace=self.workspace))
         self.tools.register(MessageTool(send_callback=self.bus.publish_outbound))
         self.tools.register(SpawnTool(manager=self.subagents))
         if self.cron_service:
@@ -161,6 +189,15 @@ class AgentLoop:
             return None
         return re.sub(r"<think>[\s\S]*?</think>", "", text).strip() or None
 
+    @staticmethod
+    def _visible_stream_text(text: str) -> str:
+        """Text safe to show mid-stream: think blocks removed, unclosed or partial tags held back."""
+        text = re.sub(r"<think>[\s\S]*?</think>", "", text).split("<think>", 1)[0]
+        for i in range(len("<think>") - 1, 0, -1):
+            if text.endswith("<think>"[:i]):
+                return text[:-i]
+        return text
+
     @staticmethod
     def _tool_hint(tool_calls: list) -> str:
         """Format tool calls as concise hint, e.g. 'web_search("query")'."""
@@ -175,8 +212,14 @@ class AgentLoop:
         self,
         initial_messages: list[dict],
         on_progress: Callable[..., Awaitable[None]] | None = None,
+        workload: str = "interactive",
+        usage: dict[str, int] | None = None,
     ) -> tuple[str | None, list[str], list[dict]]:
-        """Run the agent iteration loop. Returns (final_content, tools_used, messages)."""
+        """Run the agent iteration loop. Returns (final_content, tools_used, messages).
+
+        Token usage of every LLM call is summed into ``usage`` when given.
+        """
+        provider, model = self.router.resolve(workload, self.provider, self.model)
         messages = initial_messages
         iteration = 0
         final_content = None
@@ -185,18 +228,27 @@ class AgentLoop:
         while iteration < self.max_iterations:
             iteration += 1
 
-            response = await self.provider.chat(
-                messages=messages,
-                tools=self.tools.get_definitions(),
-                model=self.model,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
+            streamed = bool(self._stream_deltas and on_progress)
+            if streamed:
+                response = await self._chat_streaming(provider, model, messages, on_progress)
+            else:
+                response = await provider.chat(
+                    messages=messages,
+                    tools=self.tools.get_definitions(),
+                    model=model,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                )
+            if usage is not None:
+                for k, v in response.usage.items():
+                    usage[k] = usage.get(k, 0) + v
 
             if response.has_tool_calls:
                 if on_progress:
                     clean = self._strip_think(response.content)
-                    if clean:
+                    if clean and streamed:
+                        await on_progress(clean, streamed=True)  # Already shown as deltas where supported
+                    elif clean:
                         await on_progress(clean)
                     await on_progress(self._tool_hint(response.tool_calls), tool_hint=True)
 
@@ -220,7 +272,10 @@ class AgentLoop:
                     tools_used.append(tool_call.name)
                     args_str = json.dumps(tool_call.arguments, ensure_ascii=False)
                     logger.info("Tool call: {}({})", tool_call.name, args_str[:200])
-                    result = await self.tools.execute(tool_call.name, tool_call.arguments)
+                results = await self.tools.execute_batch(
+                    [(tc.name, tc.arguments) for tc in response.tool_calls]
+                )
+                for tool_call, result in zip(response.tool_calls, results):
                     messages = self.context.add_tool_result(
                         messages, tool_call.id, tool_call.name, result
                     )
@@ -237,8 +292,40 @@ class AgentLoop:
 
         return final_content, tools_used, messages
 
+    async def _chat_streaming(
+        self,
+        provider: LLMProvider,
+        model: str,
+        messages: list[dict],
+        on_progress: Callable[..., Awaitable[None]],
+    ) -> LLMResponse:
+        """Call the provider in streaming mode, forwarding visible text deltas as progress."""
+        text = ""
+        sent = 0
+        response: LLMResponse | None = None
+        async for chunk in provider.chat_stream(
+            messages=messages,
+            tools=self.tools.get_definitions(),
+            model=model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        ):
+            if chunk.content:
+                text += chunk.content
+                visible = self._visible_stream_text(text)
+                if len(visible) > sent:
+                    await on_progress(visible[sent:], delta=True)
+                    sent = len(visible)
+            elif chunk.response is not None:
+                response = chunk.response
+        return response or LLMResponse(content=text or None)
+
     async def run(self) -> None:
-        """Run the agent loop, processing messages from the bus."""
+        """Run the agent loop, dispatching messages from the bus.
+
+        Messages for the same session are processed strictly in order; different
+        sessions run concurrently, up to the configured concurrency cap.
+        """
         self._running = True
         await self._connect_mcp()
         logger.info("Agent loop started")
@@ -249,23 +336,57 @@ class AgentLoop:
                     self.bus.consume_inbound(),
                     timeout=1.0
                 )
-                try:
-                    response = await self._process_message(msg)
-                    if response is not None:
-                        await self.bus.publish_outbound(response)
-                    elif msg.channel == "cli":
-                        await self.bus.publish_outbound(OutboundMessage(
-                            channel=msg.channel, chat_id=msg.chat_id, content="", metadata=msg.metadata or {},
-                        ))
-                except Exception as e:
-                    logger.error("Error processing message: {}", e)
-                    await self.bus.publish_outbound(OutboundMessage(
-                        channel=msg.channel,
-                        chat_id=msg.chat_id,
-                        content=f"Sorry, I encountered an error: {str(e)}"
-                    ))
             except asyncio.TimeoutError:
                 continue
+            self._dispatch(msg)
+
+    @staticmethod
+    def _dispatch_key(msg: InboundMessage) -> str:
+        """Session key a message will be processed under (system messages route to their origin)."""
+        if msg.channel == "system":
+            return msg.chat_id if ":" in msg.chat_id else f"cli:{msg.chat_id}"
+        return msg.session_key
+
+    def _dispatch(self, msg: InboundMessage) -> None:
+        """Queue a message on its session, starting a worker if none is active."""
+        key = self._dispatch_key(msg)
+        queue = self._session_queues.setdefault(key, deque())
+        queue.append(msg)
+        if key not in self._session_workers:
+            self._session_workers[key] = asyncio.create_task(self._session_worker(key, queue))
+
+    async def _session_worker(self, key: str, queue: deque[InboundMessage]) -> None:
+        """Drain one session's queue in order, then retire."""
+        try:
+            with self.sessions.pinned(key):
+                while queue:
+                    msg = queue.popleft()
+                    async with self._concurrency:
+                        await self._handle_message(msg)
+        finally:
+            self._session_workers.pop(key, None)
+            self._session_queues.pop(key, None)
+
+    async def _handle_message(self, msg: InboundMessage) -> None:
+        """Process one inbound message and publish its response (or an error reply)."""
+        token = current_session.set(self._dispatch_key(msg))
+        try:
+            response = await self._process_message(msg)
+            if response is not None:
+                await self.bus.publish_outbound(response)
+            elif msg.channel == "cli":
+                await self.bus.publish_outbound(OutboundMessage(
+                    channel=msg.channel, chat_id=msg.chat_id, content="", metadata=msg.metadata or {},
+                ))
+        except Exception as e:
+            logger.error("Error processing message: {}", e)
+            await self.bus.publish_outbound(OutboundMessage(
+                channel=msg.channel,
+                chat_id=msg.chat_id,
+                content=f"Sorry, I encountered an error: {str(e)}"
+            ))
+        finally:
+            current_session.reset(token)
 
     async def close_mcp(self) -> None:
         """Close MCP connections."""
@@ -280,6 +401,7 @@ class AgentLoop:
         """Stop the agent loop."""
         self._running = False
         logger.info("Agent loop stopping")
+        self.router.log_summary()
 
     def _get_consolidation_lock(self, session_key: str) -> asyncio.Lock:
         lock = self._consolidation_locks.get(session_key)
@@ -297,7 +419,8 @@ class AgentLoop:
         self,
         msg: InboundMessage,
         session_key: str | None = None,
-        on_progress: Callable[[str], Awaitable[None]] | None = None,
+        on_progress: Callable[..., Awaitable[None]] | None = None,
+        workload: str = "interactive",
     ) -> OutboundMessage | None:
         """Process a single inbound message and return the response."""
         # System messages: parse origin from chat_id ("channel:chat_id")
@@ -308,14 +431,22 @@ class AgentLoop:
             key = f"{channel}:{chat_id}"
             session = self.sessions.get_or_create(key)
             self._set_tool_context(channel, chat_id, msg.metadata.get("message_id"))
-            history = session.get_history(max_messages=self.memory_window)
+            budget = self._prompt_budget()
+            history = session.get_history(
+                max_messages=self.memory_window, max_tokens=budget, estimator=self.estimator,
+            )
             messages = self.context.build_messages(
                 history=history,
                 current_message=msg.content, channel=channel, chat_id=chat_id,
+                token_budget=budget, estimator=self.estimator,
+            )
+            usage: dict[str, int] = {}
+            final_content, _, all_msgs = await self._run_agent_loop(
+                messages, workload="subagent", usage=usage,
             )
-            final_content, _, all_msgs = await self._run_agent_loop(messages)
-            self._save_turn(session, all_msgs, 1 + len(history))
-            self.sessions.save(session)
+            self._save_turn(session, all_msgs, len(messages) - 1)
+            self._record_usage(session, usage)
+            await self.sessions.save_async(session)
             return OutboundMessage(channel=channel, chat_id=chat_id,
                                   content=final_content or "Background task completed.")
 
@@ -332,7 +463,7 @@ class AgentLoop:
             self._consolidating.add(session.key)
             try:
                 async with lock:
-                    snapshot = session.messages[session.last_consolidated:]
+                    snapshot = session.messages_since(session.last_consolidated)
                     if snapshot:
                         temp = Session(key=session.key)
                         temp.messages = list(snapshot)
@@ -352,7 +483,7 @@ class AgentLoop:
                 self._prune_consolidation_lock(session.key, lock)
 
             session.clear()
-            self.sessions.save(session)
+            await self.sessions.save_async(session)
             self.sessions.invalidate(session.key)
             return OutboundMessage(channel=msg.channel, chat_id=msg.chat_id,
                                   content="New session started.")
@@ -360,48 +491,43 @@ class AgentLoop:
             return OutboundMessage(channel=msg.channel, chat_id=msg.chat_id,
                                   content="🐈 nanobot commands:\n/new — Start a new conversation\n/help — Show available commands")
 
-        unconsolidated = len(session.messages) - session.last_consolidated
-        if (unconsolidated >= self.memory_window and session.key not in self._consolidating):
-            self._consolidating.add(session.key)
-            lock = self._get_consolidation_lock(session.key)
-
-            async def _consolidate_and_unlock():
-                try:
-                    async with lock:
-                        await self._consolidate_memory(session)
-                finally:
-                    self._consolidating.discard(session.key)
-                    self._prune_consolidation_lock(session.key, lock)
-                    _task = asyncio.current_task()
-                    if _task is not None:
-                        self._consolidation_tasks.discard(_task)
-
-            _task = asyncio.create_task(_consolidate_and_unlock())
-            self._consolidation_tasks.add(_task)
+        unconsolidated = session.message_count - session.last_consolidated
+        if unconsolidated >= self.memory_window and session.key not in self._consolidating:
+            if self.consolidator.submit(session):
+                self.sessions.pin(session.key)  # Released by _consolidate_in_background
 
         self._set_tool_context(msg.channel, msg.chat_id, msg.metadata.get("message_id"))
         if message_tool := self.tools.get("message"):
             if isinstance(message_tool, MessageTool):
                 message_tool.start_turn()
 
-        history = session.get_history(max_messages=self.memory_window)
+        budget = self._prompt_budget()
+        history = session.get_history(
+            max_messages=self.memory_window, max_tokens=budget, estimator=self.estimator,
+        )
         initial_messages = self.context.build_messages(
             history=history,
             current_message=msg.content,
             media=msg.media if msg.media else None,
             channel=msg.channel, chat_id=msg.chat_id,
+            token_budget=budget, estimator=self.estimator,
         )
 
-        async def _bus_progress(content: str, *, tool_hint: bool = False) -> None:
+        async def _bus_progress(
+            content: str, *, tool_hint: bool = False, delta: bool = False, streamed: bool = False,
+        ) -> None:
             meta = dict(msg.metadata or {})
             meta["_progress"] = True
             meta["_tool_hint"] = tool_hint
+            meta["_stream_delta"] = delta
+            meta["_streamed"] = streamed
             await self.bus.publish_outbound(OutboundMessage(
                 channel=msg.channel, chat_id=msg.chat_id, content=content, metadata=meta,
             ))
 
+        usage: dict[str, int] = {}
         final_content, _, all_msgs = await self._run_agent_loop(
-            initial_messages, on_progress=on_progress or _bus_progress,
+            initial_messages, on_progress=on_progress or _bus_progress, workload=workload, usage=usage,
         )
 
         if final_content is None:
@@ -410,18 +536,28 @@ class AgentLoop:
         preview = final_content[:120] + "..." if len(final_content) > 120 else final_content
         logger.info("Response to {}:{}: {}", msg.channel, msg.sender_id, preview)
 
-        self._save_turn(session, all_msgs, 1 + len(history))
-        self.sessions.save(session)
+        self._save_turn(session, all_msgs, len(initial_messages) - 1)
+        self._record_usage(session, usage)
+        await self.sessions.save_async(session)
 
         if message_tool := self.tools.get("message"):
             if isinstance(message_tool, MessageTool) and message_tool._sent_in_turn:
                 return None
 
+        meta = dict(msg.metadata or {})
+        if self._stream_deltas:
+            meta["_streamed"] = True  # Lets streaming channels finalize the live message
         return OutboundMessage(
-            channel=msg.channel, chat_id=msg.chat_id, content=final_content,
-            metadata=msg.metadata or {},
+            channel=msg.channel, chat_id=msg.chat_id, content=final_content, metadata=meta,
         )
 
+    def _prompt_budget(self) -> int:
+        """Tokens available for system prompt + history + message (window minus output and tools)."""
+        version = self.tools.version
+        if self._tool_tokens is None or self._tool_tokens[0] != version:
+            self._tool_tokens = (version, self.estimator.count_tools(self.tools.get_definitions()))
+        return max(0, self.context_window_tokens - self.max_tokens - self._tool_tokens[1])
+
     _TOOL_RESULT_MAX_CHARS = 500
 
     def _save_turn(self, session: Session, messages: list[dict], skip: int) -> None:
@@ -429,18 +565,43 @@ class AgentLoop:
         from datetime import datetime
         for m in messages[skip:]:
             entry = {k: v for k, v in m.items() if k != "reasoning_content"}
+            if entry.get("role") == "user":
+                entry["content"] = ContextBuilder.strip_runtime_context(entry["content"])
             if entry.get("role") == "tool" and isinstance(entry.get("content"), str):
                 content = entry["content"]
                 if len(content) > self._TOOL_RESULT_MAX_CHARS:
                     entry["content"] = content[:self._TOOL_RESULT_MAX_CHARS] + "\n... (truncated)"
             entry.setdefault("timestamp", datetime.now().isoformat())
-            session.messages.append(entry)
+            session.append(entry)
         session.updated_at = datetime.now()
 
+    @staticmethod
+    def _record_usage(session: Session, usage: dict[str, int]) -> None:
+        """Accumulate a turn's token usage (including prompt-cache reads/writes) in session metadata."""
+        if not usage:
+            return
+        totals = session.metadata.setdefault("usage", {})
+        for k, v in usage.items():
+            totals[k] = totals.get(k, 0) + v
+        totals["turns"] = totals.get("turns", 0) + 1
+        if read := usage.get("cache_read_input_tokens"):
+            logger.debug("Prompt cache hit ratio for {}: {:.0%}", session.key, read / max(1, usage.get("prompt_tokens", 0)))
+
+    async def _consolidate_in_background(self, session: Session) -> None:
+        """Scheduled consolidation; holds the session's lock so /new waits for it."""
+        lock = self._get_consolidation_lock(session.key)
+        try:
+            async with lock:
+                await self._consolidate_memory(session)
+        finally:
+            self.sessions.unpin(session.key)
+            self._prune_consolidation_lock(session.key, lock)
+
     async def _consolidate_memory(self, session, archive_all: bool = False) -> bool:
         """Delegate to MemoryStore.consolidate(). Returns True on success."""
+        provider, model = self.router.resolve("consolidation", self.provider, self.model)
         return await MemoryStore(self.workspace).consolidate(
-            session, self.provider, self.model,
+            session, provider, model,
             archive_all=archive_all, memory_window=self.memory_window,
         )
 
@@ -450,10 +611,21 @@ class AgentLoop:
         session_key: str = "cli:direct",
         channel: str = "cli",
         chat_id: str = "direct",
-        on_progress: Callable[[str], Awaitable[None]] | None = None,
+        on_progress: Callable[..., Awaitable[None]] | None = None,
+        workload: str = "interactive",
     ) -> str:
-        """Process a message directly (for CLI or cron usage)."""
+        """Process a message directly (for CLI, cron or heartbeat usage).
+
+        ``workload`` selects the routed model (see ``ModelRouter``).
+        """
         await self._connect_mcp()
         msg = InboundMessage(channel=channel, sender_id="user", chat_id=chat_id, content=content)
-        response = await self._process_message(msg, session_key=session_key, on_progress=on_progress)
+        token = current_session.set(session_key)
+        try:
+            with self.sessions.pinned(session_key):
+                response = await self._process_message(
+                    msg, session_key=session_key, on_progress=on_progress, workload=workload,
+                )
+        finally:
+            current_session.reset(token)
         return response.content if response else ""
@@ -2,13 +2,22 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import re
+from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 from loguru import logger
 
+from nanobot.agent.history import HistoryIndex, HistoryLog
+from nanobot.agent.search import BM25Index, term_counts
+from nanobot.providers.cache import cache_responses
+from nanobot.providers.tokens import DEFAULT_ESTIMATOR
 from nanobot.utils.helpers import ensure_dir
+from nanobot.utils.journal import Journal
 
 if TYPE_CHECKING:
     from nanobot.providers.base import LLMProvider
@@ -29,43 +38,301 @@ _SAVE_MEMORY_TOOL = [
                         "description": "A paragraph (2-5 sentences) summarizing key events/decisions/topics. "
                         "Start with [YYYY-MM-DD HH:MM]. Include detail useful for grep search.",
                     },
+                    "memory_patch": {
+                        "type": "array",
+                        "description": "Changes to long-term memory, by fact id. Empty if nothing new.",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "op": {"type": "string", "enum": ["add", "update", "remove"]},
+                                "id": {"type": "string", "description": "Fact id (update/remove)"},
+                                "section": {"type": "string", "description": "Section heading to add under (add)"},
+                                "text": {"type": "string", "description": "The fact, one line (add/update)"},
+                            },
+                            "required": ["op"],
+                        },
+                    },
                     "memory_update": {
                         "type": "string",
-                        "description": "Full updated long-term memory as markdown. Include all existing "
-                        "facts plus new ones. Return unchanged if nothing new.",
+                        "description": "Only if memory needs restructuring: the full rewritten long-term "
+                        "memory as markdown, without fact ids. Omit otherwise.",
                     },
                 },
-                "required": ["history_entry", "memory_update"],
+                "required": ["history_entry", "memory_patch"],
             },
         },
     }
 ]
 
 
+_CONSOLIDATION_SYSTEM = (
+    "You are a memory consolidation agent. Call the save_memory tool with your consolidation "
+    "of the conversation. Record memory changes as a memory_patch: add new facts under a "
+    "section, update or remove existing facts by their [id]. Leave unchanged facts out."
+)
+_CONSOLIDATION_CHUNK_TOKENS = 12_000  # Backlogs larger than this are summarized chunk by chunk first
+_CONSOLIDATION_FAN_OUT = 4  # Concurrent chunk summaries
+_SUMMARY_MAX_TOKENS = 1024
+_LIST_MARKER_RE = re.compile(r"^\s*(?:[-*+]|\d+\.)\s")
+_FACT_ID_RE = re.compile(r"^\[[0-9a-f]{6}(?:-\d+)?\] ", re.M)
+
+
+def _fact_id(text: str, seen: dict[str, int]) -> str:
+    """Stable short id for a fact line; repeats of the same line get a numeric suffix."""
+    base = hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()[:6]
+    seen[base] = seen.get(base, 0) + 1
+    return base if seen[base] == 1 else f"{base}-{seen[base]}"
+
+
+def _fact_lines(content: str) -> list[tuple[str | None, str | None]]:
+    """MEMORY.md lines as (fact id, line); headings and blank lines have no id."""
+    seen: dict[str, int] = {}
+    return [
+        (None if not line.strip() or line.lstrip().startswith("#") else _fact_id(line, seen), line)
+        for line in content.splitlines()
+    ]
+
+
+def annotate_facts(content: str) -> str:
+    """MEMORY.md with each fact line prefixed by its ``[id]``, as shown to the consolidation model."""
+    return "\n".join(f"[{fid}] {line}" if fid else line for fid, line in _fact_lines(content))
+
+
+def apply_memory_patch(content: str, ops: list[dict]) -> tuple[str, int]:
+    """Apply add/update/remove operations to MEMORY.md; returns (new content, ops applied).
+
+    Operations that reference unknown fact ids are skipped. Facts added to a
+    section that does not exist yet create it at the end of the file.
+    """
+    lines = _fact_lines(content)
+    by_id = {fid: i for i, (fid, _) in enumerate(lines) if fid}
+    replaced: dict[int, str | None] = {}
+    added: dict[str, list[str]] = {}
+    applied = 0
+    for op in ops:
+        if not isinstance(op, dict):
+            continue
+        kind, text = op.get("op"), str(op.get("text") or "").strip()
+        if kind in ("add", "update") and not text:
+            continue
+        if not _LIST_MARKER_RE.match(text):
+            text = f"- {text}"
+        if kind == "add":
+            section = str(op.get("section") or "Important Notes").strip().lstrip("#").strip()
+            added.setdefault(section, []).append(text)
+        elif kind in ("update", "remove") and (i := by_id.get(str(op.get("id", "")).strip("[] "))) is not None:
+            replaced[i] = text if kind == "update" else None
+        else:
+            logger.warning("Memory patch: skipping invalid operation {}", op)
+            continue
+        applied += 1
+
+    out: list[str] = []
+    section_end: dict[str, int] = {}  # lower-cased heading -> index in out after its last content line
+    current: str | None = None
+    for i, (_, line) in enumerate(lines):
+        if i in replaced:
+            if replaced[i] is not None:
+                out.append(replaced[i])
+        else:
+            out.append(line)
+        if m := _HEADING_RE.match(line):
+            current = m.group(1).lower()
+            section_end[current] = len(out)
+        elif current and line.strip():
+            section_end[current] = len(out)
+
+    for section, facts in added.items():
+        key = section.lower()
+        if key in section_end:
+            at = section_end[key]
+            out[at:at] = facts
+            for name, end in section_end.items():
+                if end >= at and name != key:
+                    section_end[name] = end + len(facts)
+            section_end[key] = at + len(facts)
+        else:
+            while out and not out[-1].strip():
+                out.pop()
+            out.extend(["", f"## {section}", "", *facts])
+            section_end[key] = len(out)
+    text = re.sub(r"\n{3,}", "\n\n", "\n".join(out)).strip("\n")
+    return text + "\n" if text else "", applied
+
+
+def _chunk_lines(lines: list[str], budget: int) -> list[str]:
+    """Pack lines into chunks of at most ``budget`` estimated tokens; oversized lines are truncated."""
+    chunks: list[str] = []
+    current: list[str] = []
+    used = 0
+    for line in lines:
+        tokens = DEFAULT_ESTIMATOR.count_text(line)
+        if tokens > budget:
+            line = line[:len(line) * budget // tokens] + " ... (truncated)"
+            tokens = budget
+        if current and used + tokens > budget:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+_HEADING_RE = re.compile(r"^#{2,6}[ \t]+(.+?)[ \t]*$", re.M)
+_ITEM_SPLIT_RE = re.compile(r"\n(?=[ \t]*(?:[-*+]|\d+\.)[ \t])|\n[ \t]*\n")
+_CHUNK_CHARS = 1200  # Long sections are split into fact chunks of about this size
+
+
+@dataclass
+class MemoryChunk:
+    """An addressable piece of MEMORY.md: a section, or part of a long one."""
+
+    heading: str | None  # None for text before the first section heading
+    text: str
+    core: bool
+    tokens: int
+
+
+def _split_memory(content: str, core_sections: frozenset[str]) -> list[MemoryChunk]:
+    """Split MEMORY.md at ##-level headings; long sections are split further at bullets/paragraphs."""
+    headings = list(_HEADING_RE.finditer(content))
+    parts: list[tuple[str | None, str]] = [(None, content[:headings[0].start()] if headings else content)]
+    for i, m in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(content)
+        parts.append((m.group(1), content[m.end():end]))
+
+    chunks: list[MemoryChunk] = []
+    for heading, body in parts:
+        body = body.strip()
+        if not body:
+            continue
+        core = heading is None or heading.lower() in core_sections
+        pieces = [body]
+        if len(body) > _CHUNK_CHARS:
+            pieces, current = [], ""
+            for item in filter(None, (x.strip() for x in _ITEM_SPLIT_RE.split(body))):
+                if current and len(current) + len(item) + 1 > _CHUNK_CHARS:
+                    pieces.append(current)
+                    current = item
+                else:
+                    current = f"{current}\n{item}" if current else item
+            pieces.append(current)
+        for piece in pieces:
+            chunks.append(MemoryChunk(heading, piece, core, DEFAULT_ESTIMATOR.count_text(piece)))
+    return chunks
+
+
+def _render_chunks(chunks: list[MemoryChunk]) -> str:
+    """Chunks back to markdown, one heading per consecutive run of the same section."""
+    out: list[str] = []
+    previous: str | None = None
+    for chunk in chunks:
+        if chunk.heading is not None and chunk.heading != previous:
+            out.append(f"## {chunk.heading}")
+        out.append(chunk.text)
+        previous = chunk.heading
+    return "\n\n".join(out)
+
+
 class MemoryStore:
-    """Two-layer memory: MEMORY.md (long-term facts) + HISTORY.md (grep-searchable log)."""
+    """Two-layer memory: MEMORY.md (long-term facts) + HISTORY.md (searchable event log).
+
+    History is stored as monthly segments under ``memory/history/`` (see
+    ``HistoryLog``); HISTORY.md itself only holds the open segment.
+
+    When MEMORY.md outgrows the prompt budget, only its core sections stay in
+    the stable system prompt and the other sections are selected per turn by
+    relevance (see ``get_relevant_context``).
+    """
+
+    # Sections always injected in full (matched case-insensitively against ## headings)
+    CORE_SECTIONS = frozenset({"user information", "preferences"})
 
     def __init__(self, workspace: Path):
         self.memory_dir = ensure_dir(workspace / "memory")
         self.memory_file = self.memory_dir / "MEMORY.md"
-        self.history_file = self.memory_dir / "HISTORY.md"
+        self.history_file = self.memory_dir / "HISTORY.md"  # Read-only view of recent history
+        self.journal = Journal.for_dir(self.memory_dir)
+        self.history = HistoryLog.for_dir(self.memory_dir)
+        self.history_index = HistoryIndex.for_log(self.history)
+        self._parsed: tuple[tuple[int, int] | None, list[MemoryChunk], BM25Index] | None = None
 
     def read_long_term(self) -> str:
         if self.memory_file.exists():
-            return self.memory_file.read_text(encoding="utf-8")
+            return self.journal.read(self.memory_file).decode("utf-8")  # Includes a write still being committed
         return ""
 
     def write_long_term(self, content: str) -> None:
-        self.memory_file.write_text(content, encoding="utf-8")
+        self.journal.write(self.memory_file, content.encode("utf-8"))
+
+    async def write_long_term_async(self, content: str) -> None:
+        await self.journal.write_async(self.memory_file, content.encode("utf-8"))
 
     def append_history(self, entry: str) -> None:
-        with open(self.history_file, "a", encoding="utf-8") as f:
-            f.write(entry.rstrip() + "\n\n")
+        raw = (entry.rstrip() + "\n\n").encode("utf-8")
+        segment, offset = self.history.append(raw)
+        self.history_index.added(segment, offset, raw)
+
+    async def append_history_async(self, entry: str) -> None:
+        raw = (entry.rstrip() + "\n\n").encode("utf-8")
+        segment, offset = await self.history.append_async(raw)
+        self.history_index.added(segment, offset, raw)
+
+    def search_history(
+        self, query: str, limit: int = 5, since: str | None = None, until: str | None = None,
+    ) -> list[tuple[str | None, str]]:
+        """BM25-ranked history entries as (date, text), best first."""
+        return self.history_index.search(query, limit, since=since, until=until)
 
     def get_memory_context(self) -> str:
         long_term = self.read_long_term()
         return f"## Long-term Memory\n{long_term}" if long_term else ""
 
+    def _chunks(self) -> tuple[list[MemoryChunk], BM25Index]:
+        """Parsed and indexed MEMORY.md, re-parsed only when the file changes."""
+        try:
+            st = self.memory_file.stat()
+            key = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            key = None
+        if self._parsed is None or self._parsed[0] != key:
+            chunks = _split_memory(self.read_long_term(), self.CORE_SECTIONS)
+            index = BM25Index()
+            for i, chunk in enumerate(chunks):
+                if not chunk.core:
+                    index.add(i, term_counts(f"{chunk.heading}\n{chunk.text}"))
+            self._parsed = (key, chunks, index)
+        return self._parsed[1], self._parsed[2]
+
+    def fits(self, budget: int) -> bool:
+        """Whether the whole of MEMORY.md fits in ``budget`` tokens."""
+        return sum(c.tokens for c in self._chunks()[0]) <= budget
+
+    def get_core_context(self, budget: int) -> str:
+        """Core sections (and text before the first heading), up to ``budget`` tokens."""
+        selected, used = [], 0
+        for chunk in self._chunks()[0]:
+            if chunk.core and used + chunk.tokens <= budget:
+                selected.append(chunk)
+                used += chunk.tokens
+        return f"## Long-term Memory\n{_render_chunks(selected)}" if selected else ""
+
+    def get_relevant_context(self, query: str, budget: int, limit: int = 8) -> str:
+        """Non-core memory chunks most relevant to ``query``, best first until ``budget`` tokens."""
+        if budget <= 0:
+            return ""
+        chunks, index = self._chunks()
+        picked, used = [], 0
+        for i, _ in index.search(query, limit):
+            if used + chunks[i].tokens <= budget:
+                picked.append(i)
+                used += chunks[i].tokens
+        if not picked:
+            return ""
+        return f"## Relevant Memory (selected from MEMORY.md)\n{_render_chunks([chunks[i] for i in sorted(picked)])}"
+
     async def consolidate(
         self,
         session: Session,
@@ -74,9 +341,14 @@ class MemoryStore:
         *,
         archive_all: bool = False,
         memory_window: int = 50,
+        chunk_tokens: int = _CONSOLIDATION_CHUNK_TOKENS,
+        fan_out: int = _CONSOLIDATION_FAN_OUT,
     ) -> bool:
         """Consolidate old messages into MEMORY.md + HISTORY.md via LLM tool call.
 
+        Backlogs over ``chunk_tokens`` are first summarized in chunks, up to
+        ``fan_out`` at a time, so the final call stays within the model's context.
+
         Returns True on success (including no-op), False on failure.
         """
         if archive_all:
@@ -85,11 +357,11 @@ class MemoryStore:
             logger.info("Memory consolidation (archive_all): {} messages", len(session.messages))
         else:
             keep_count = memory_window // 2
-            if len(session.messages) <= keep_count:
+            if session.message_count <= keep_count:
                 return True
-            if len(session.messages) - session.last_consolidated <= 0:
+            if session.message_count - session.last_consolidated <= 0:
                 return True
-            old_messages = session.messages[session.last_consolidated:-keep_count]
+            old_messages = session.messages_since(session.last_consolidated)[:-keep_count]
             if not old_messages:
                 return True
             logger.info("Memory consolidation: {} to consolidate, {} keep", len(old_messages), keep_count)
@@ -101,19 +373,24 @@ class MemoryStore:
             tools = f" [tools: {', '.join(m['tools_used'])}]" if m.get("tools_used") else ""
             lines.append(f"[{m.get('timestamp', '?')[:16]}] {m['role'].upper()}{tools}: {m['content']}")
 
-        current_memory = self.read_long_term()
-        prompt = f"""Process this conversation and call the save_memory tool with your consolidation.
+        try:
+            conversation = await self._condense(lines, provider, model, archive_all, chunk_tokens, fan_out)
+            if conversation is None:
+                return False
+
+            current_memory = self.read_long_term()
+            prompt = f"""Process this conversation and call the save_memory tool with your consolidation.
 
 ## Current Long-term Memory
-{current_memory or "(empty)"}
+{annotate_facts(current_memory) if current_memory else "(empty)"}
 
 ## Conversation to Process
-{chr(10).join(lines)}"""
+{conversation}"""
 
-        try:
+            # Not cached: a reply without a valid save_memory call would be replayed on every retry
             response = await provider.chat(
                 messages=[
-                    {"role": "system", "content": "You are a memory consolidation agent. Call the save_memory tool with your consolidation of the conversation."},
+                    {"role": "system", "content": _CONSOLIDATION_SYSTEM},
                     {"role": "user", "content": prompt},
                 ],
                 tools=_SAVE_MEMORY_TOOL,
@@ -125,19 +402,79 @@ class MemoryStore:
                 return False
 
             args = response.tool_calls[0].arguments
-            if entry := args.get("history_entry"):
-                if not isinstance(entry, str):
-                    entry = json.dumps(entry, ensure_ascii=False)
-                self.append_history(entry)
+            # Other sessions may have consolidated meanwhile: apply to the file as it is now.
+            # No awaits until the write is queued, and reads see queued writes, so
+            # concurrent consolidations cannot interleave.
+            latest = self.read_long_term()
+            updated = latest
             if update := args.get("memory_update"):
+                # Full rewrite: fallback for restructuring (and models that ignore the patch format)
                 if not isinstance(update, str):
                     update = json.dumps(update, ensure_ascii=False)
-                if update != current_memory:
-                    self.write_long_term(update)
+                if latest != current_memory:
+                    # The rewrite would drop the other consolidation's facts; retry this batch
+                    logger.warning("Memory consolidation: MEMORY.md changed during rewrite, will retry")
+                    return False
+                updated = _FACT_ID_RE.sub("", update)
+            elif isinstance(patch := args.get("memory_patch"), list) and patch:
+                updated, applied = apply_memory_patch(latest, patch)
+                logger.info("Memory patch: {}/{} operations applied", applied, len(patch))
+            if updated != latest:
+                await self.write_long_term_async(updated)
+            if entry := args.get("history_entry"):
+                if not isinstance(entry, str):
+                    entry = json.dumps(entry, ensure_ascii=False)
+                await self.append_history_async(entry)
 
-            session.last_consolidated = 0 if archive_all else len(session.messages) - keep_count
-            logger.info("Memory consolidation done: {} messages, last_consolidated={}", len(session.messages), session.last_consolidated)
+            session.last_consolidated = 0 if archive_all else session.message_count - keep_count
+            logger.info("Memory consolidation done: {} messages, last_consolidated={}", session.message_count, session.last_consolidated)
             return True
         except Exception:
             logger.exception("Memory consolidation failed")
             return False
+
+    @staticmethod
+    async def _condense(
+        lines: list[str],
+        provider: LLMProvider,
+        model: str,
+        cache: bool,
+        chunk_tokens: int,
+        fan_out: int,
+    ) -> str | None:
+        """The conversation as prompt text, map-reduced into chunk summaries while over budget.
+
+        Returns None if a chunk summary fails.
+        """
+        slots = asyncio.Semaphore(max(1, fan_out))
+
+        async def _summarize(index: int, total: int, chunk: str) -> str | None:
+            async with slots:
+                with cache_responses(cache):
+                    response = await provider.chat(
+                        messages=[
+                            {"role": "system", "content": "You summarize part of a conversation for a memory consolidation agent."},
+                            {"role": "user", "content": (
+                                f"Part {index + 1} of {total}. Summarize the key events, decisions and facts about "
+                                f"the user, keeping dates from the [YYYY-MM-DD HH:MM] prefixes.\n\n{chunk}"
+                            )},
+                        ],
+                        model=model,
+                        max_tokens=_SUMMARY_MAX_TOKENS,
+                    )
+            if response.finish_reason == "error" or not response.content:
+                logger.warning("Memory consolidation: summary of part {}/{} failed", index + 1, total)
+                return None
+            return response.content.strip()
+
+        previous = len(lines) + 1
+        while True:
+            chunks = _chunk_lines(lines, chunk_tokens)
+            if len(chunks) <= 1 or len(chunks) >= previous:  # Fits, or summaries no longer shrink
+                return "\n".join(chunks)
+            previous = len(chunks)
+            logger.info("Memory consolidation: summarizing {} chunks", len(chunks))
+            summaries = await asyncio.gather(*(_summarize(i, len(chunks), c) for i, c in enumerate(chunks)))
+            if any(s is None for s in summaries):
+                return None
+            lines = [f"[Part {i + 1}/{len(chunks)}] {s}" for i, s in enumerate(summaries)]
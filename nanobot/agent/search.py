@@ -0,0 +1,92 @@
+"""Small in-process BM25 index used for memory and history recall."""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import Callable, Iterable
+
+_WORD_RE = re.compile(r"[a-z0-9_]+(?:['.-][a-z0-9_]+)*")
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its me my of on or our "
+    "so that the their them then there they this to was we were what when which who "
+    "will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens, plus character bigrams for CJK runs (which have no spaces)."""
+    text = text.lower()
+    tokens = [t for t in _WORD_RE.findall(text) if t not in _STOPWORDS]
+    for run in _CJK_RE.findall(text):
+        tokens.extend(run if len(run) == 1 else (run[i:i + 2] for i in range(len(run) - 1)))
+    return tokens
+
+
+def term_counts(text: str) -> dict[str, int]:
+    return dict(Counter(tokenize(text)))
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 ranking.
+
+    Documents are added as term-frequency maps under integer ids, so callers
+    can persist the maps and rebuild postings without re-tokenizing text.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[int, int]] = {}
+        self._lengths: dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, doc_id: int, counts: dict[str, int]) -> None:
+        if doc_id in self._lengths:
+            self.remove(doc_id)
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        length = sum(counts.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: int) -> None:
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in [t for t, docs in self._postings.items() if doc_id in docs]:
+            del self._postings[term][doc_id]
+            if not self._postings[term]:
+                del self._postings[term]
+
+    def search(
+        self,
+        query: str | Iterable[str],
+        limit: int = 5,
+        accept: Callable[[int], bool] | None = None,
+    ) -> list[tuple[int, float]]:
+        """Top ``limit`` (doc_id, score) pairs, best first; ``accept`` filters candidates."""
+        terms = set(tokenize(query) if isinstance(query, str) else query)
+        n = len(self._lengths)
+        if not terms or not n:
+            return []
+        avg = self._total_length / n or 1.0
+        scores: dict[int, float] = {}
+        for term in terms:
+            docs = self._postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                if accept is not None and not accept(doc_id):
+                    continue
+                norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
@@ -4,141 +4,206 @@ import json
 import os
 import re
 import shutil
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from nanobot.utils.helpers import file_stamp
+
 # Default builtin skills directory (relative to this file)
 BUILTIN_SKILLS_DIR = Path(__file__).parent.parent / "skills"
 
+# How long binary/env requirement checks are trusted before re-checking
+REQUIREMENTS_TTL_S = 30.0
+
+_FRONTMATTER_RE = re.compile(r"^---\n(.*?)\n---", re.DOTALL)
+_FRONTMATTER_BLOCK_RE = re.compile(r"^---\n.*?\n---\n", re.DOTALL)
+
+
+@dataclass
+class SkillEntry:
+    """A parsed SKILL.md: frontmatter, nanobot metadata and where the body starts."""
+
+    name: str
+    path: Path
+    source: str  # "workspace" or "builtin"
+    frontmatter: dict[str, str] | None
+    meta: dict  # nanobot/openclaw metadata from the frontmatter "metadata" key
+    body_offset: int  # Character offset of the body (after frontmatter)
+    stamp: tuple[int, int] | None = None  # (mtime_ns, size) of SKILL.md when parsed
+    requirements: tuple[float, str] | None = field(default=None, repr=False)  # (checked_at, missing)
+
+
+class SkillIndex:
+    """
+    Index of installed skills, parsed once and refreshed incrementally.
+
+    A root directory is re-listed only when its mtime changes, and a SKILL.md is
+    re-parsed only when its own mtime/size changes. ``version`` increments on
+    every change so callers can cheaply detect when derived output is stale.
+    """
+
+    def __init__(self, roots: list[tuple[Path | None, str]]):
+        self._roots = roots
+        self._listing: dict[Path, tuple[tuple[int, int] | None, list[Path]]] = {}
+        self._entries: dict[str, SkillEntry] = {}
+        self.version = 0
+
+    def refresh(self) -> None:
+        """Pick up added, removed and edited skills."""
+        entries: dict[str, SkillEntry] = {}
+        for root, source in self._roots:
+            for skill_dir in self._list_dirs(root):
+                skill_file = skill_dir / "SKILL.md"
+                stamp = file_stamp(skill_file)
+                if stamp is None or skill_dir.name in entries:
+                    continue
+                entry = self._entries.get(skill_dir.name)
+                if entry is None or entry.path != skill_file or entry.stamp != stamp:
+                    entry = _parse_skill(skill_dir.name, skill_file, source, stamp)
+                entries[skill_dir.name] = entry
+        if entries.keys() != self._entries.keys() or any(
+            entries[name] is not self._entries[name] for name in entries
+        ):
+            self.version += 1
+        self._entries = entries
+
+    def entries(self) -> list[SkillEntry]:
+        """All indexed skills (workspace first, then builtin)."""
+        self.refresh()
+        return list(self._entries.values())
+
+    def get(self, name: str) -> SkillEntry | None:
+        """Look up one skill by name."""
+        self.refresh()
+        return self._entries.get(name)
+
+    def _list_dirs(self, root: Path | None) -> list[Path]:
+        if not root:
+            return []
+        stamp = file_stamp(root)
+        if stamp is None:
+            self._listing.pop(root, None)
+            return []
+        cached = self._listing.get(root)
+        if cached is None or cached[0] != stamp:
+            dirs = sorted(p for p in root.iterdir() if p.is_dir())
+            cached = (stamp, dirs)
+            self._listing[root] = cached
+        return cached[1]
+
 
 class SkillsLoader:
     """
     Loader for agent skills.
-    
+
     Skills are markdown files (SKILL.md) that teach the agent how to use
     specific tools or perform certain tasks.
     """
-    
+
     def __init__(self, workspace: Path, builtin_skills_dir: Path | None = None):
         self.workspace = workspace
         self.workspace_skills = workspace / "skills"
         self.builtin_skills = builtin_skills_dir or BUILTIN_SKILLS_DIR
-    
+        self.index = SkillIndex([(self.workspace_skills, "workspace"), (self.builtin_skills, "builtin")])
+
     def list_skills(self, filter_unavailable: bool = True) -> list[dict[str, str]]:
         """
         List all available skills.
-        
+
         Args:
             filter_unavailable: If True, filter out skills with unmet requirements.
-        
+
         Returns:
             List of skill info dicts with 'name', 'path', 'source'.
         """
-        skills = []
-        
-        # Workspace skills (highest priority)
-        if self.workspace_skills.exists():
-            for skill_dir in self.workspace_skills.iterdir():
-                if skill_dir.is_dir():
-                    skill_file = skill_dir / "SKILL.md"
-                    if skill_file.exists():
-                        skills.append({"name": skill_dir.name, "path": str(skill_file), "source": "workspace"})
-        
-        # Built-in skills
-        if self.builtin_skills and self.builtin_skills.exists():
-            for skill_dir in self.builtin_skills.iterdir():
-                if skill_dir.is_dir():
-                    skill_file = skill_dir / "SKILL.md"
-                    if skill_file.exists() and not any(s["name"] == skill_dir.name for s in skills):
-                        skills.append({"name": skill_dir.name, "path": str(skill_file), "source": "builtin"})
-        
-        # Filter by requirements
-        if filter_unavailable:
-            return [s for s in skills if self._check_requirements(self._get_skill_meta(s["name"]))]
-        return skills
-    
+        return [
+            {"name": e.name, "path": str(e.path), "source": e.source}
+            for e in self.index.entries()
+            if not filter_unavailable or self._is_available(e)
+        ]
+
     def load_skill(self, name: str) -> str | None:
         """
         Load a skill by name.
-        
+
         Args:
             name: Skill name (directory name).
-        
+
         Returns:
             Skill content or None if not found.
         """
-        # Check workspace first
-        workspace_skill = self.workspace_skills / name / "SKILL.md"
-        if workspace_skill.exists():
-            return workspace_skill.read_text(encoding="utf-8")
-        
-        # Check built-in
-        if self.builtin_skills:
-            builtin_skill = self.builtin_skills / name / "SKILL.md"
-            if builtin_skill.exists():
-                return builtin_skill.read_text(encoding="utf-8")
-        
-        return None
-    
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        try:
+            return entry.path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
     def load_skills_for_context(self, skill_names: list[str]) -> str:
         """
         Load specific skills for inclusion in agent context.
-        
+
         Args:
             skill_names: List of skill names to load.
-        
+
         Returns:
             Formatted skills content.
         """
         parts = []
         for name in skill_names:
+            entry = self.index.get(name)
             content = self.load_skill(name)
-            if content:
-                content = self._strip_frontmatter(content)
+            if entry and content:
+                content = content[entry.body_offset:].strip() if entry.body_offset else content
                 parts.append(f"### Skill: {name}\n\n{content}")
-        
+
         return "\n\n---\n\n".join(parts) if parts else ""
-    
+
     def build_skills_summary(self) -> str:
         """
         Build a summary of all skills (name, description, path, availability).
-        
+
         This is used for progressive loading - the agent can read the full
         skill content using read_file when needed.
-        
+
         Returns:
             XML-formatted skills summary.
         """
-        all_skills = self.list_skills(filter_unavailable=False)
+        all_skills = self.index.entries()
         if not all_skills:
             return ""
-        
+
         def escape_xml(s: str) -> str:
             return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-        
+
         lines = ["<skills>"]
-        for s in all_skills:
-            name = escape_xml(s["name"])
-            path = s["path"]
-            desc = escape_xml(self._get_skill_description(s["name"]))
-            skill_meta = self._get_skill_meta(s["name"])
-            available = self._check_requirements(skill_meta)
-            
+        for entry in all_skills:
+            name = escape_xml(entry.name)
+            desc = escape_xml((entry.frontmatter or {}).get("description") or entry.name)
+            missing = self._missing(entry)
+            available = not missing
+
             lines.append(f"  <skill available=\"{str(available).lower()}\">")
             lines.append(f"    <name>{name}</name>")
             lines.append(f"    <description>{desc}</description>")
-            lines.append(f"    <location>{path}</location>")
-            
+            lines.append(f"    <location>{entry.path}</location>")
+
             # Show missing requirements for unavailable skills
             if not available:
-                missing = self._get_missing_requirements(skill_meta)
-                if missing:
-                    lines.append(f"    <requires>{escape_xml(missing)}</requires>")
-            
+                lines.append(f"    <requires>{escape_xml(missing)}</requires>")
+
             lines.append(f"  </skill>")
         lines.append("</skills>")
-        
+
         return "\n".join(lines)
-    
+
+    def signature(self) -> tuple:
+        """Change detector for skill-derived prompt text: index version + availability."""
+        entries = self.index.entries()
+        return self.index.version, tuple(self._is_available(e) for e in entries)
+
     def _get_missing_requirements(self, skill_meta: dict) -> str:
         """Get a description of missing requirements."""
         missing = []
@@ -150,79 +215,72 @@ class SkillsLoader:
             if not os.environ.get(env):
                 missing.append(f"ENV: {env}")
         return ", ".join(missing)
-    
-    def _get_skill_description(self, name: str) -> str:
-        """Get the description of a skill from its frontmatter."""
-        meta = self.get_skill_metadata(name)
-        if meta and meta.get("description"):
-            return meta["description"]
-        return name  # Fallback to skill name
-    
-    def _strip_frontmatter(self, content: str) -> str:
-        """Remove YAML frontmatter from markdown content."""
-        if content.startswith("---"):
-            match = re.match(r"^---\n.*?\n---\n", content, re.DOTALL)
-            if match:
-                return content[match.end():].strip()
-        return content
-    
-    def _parse_nanobot_metadata(self, raw: str) -> dict:
-        """Parse skill metadata JSON from frontmatter (supports nanobot and openclaw keys)."""
-        try:
-            data = json.loads(raw)
-            return data.get("nanobot", data.get("openclaw", {})) if isinstance(data, dict) else {}
-        except (json.JSONDecodeError, TypeError):
-            return {}
-    
-    def _check_requirements(self, skill_meta: dict) -> bool:
-        """Check if skill requirements are met (bins, env vars)."""
-        requires = skill_meta.get("requires", {})
-        for b in requires.get("bins", []):
-            if not shutil.which(b):
-                return False
-        for env in requires.get("env", []):
-            if not os.environ.get(env):
-                return False
-        return True
-    
-    def _get_skill_meta(self, name: str) -> dict:
-        """Get nanobot metadata for a skill (cached in frontmatter)."""
-        meta = self.get_skill_metadata(name) or {}
-        return self._parse_nanobot_metadata(meta.get("metadata", ""))
-    
+
+    def _missing(self, entry: SkillEntry) -> str:
+        """Missing requirements for a skill, re-checked at most every REQUIREMENTS_TTL_S."""
+        now = time.monotonic()
+        cached = entry.requirements
+        if cached is None or now - cached[0] > REQUIREMENTS_TTL_S:
+            cached = (now, self._get_missing_requirements(entry.meta))
+            entry.requirements = cached
+        return cached[1]
+
+    def _is_available(self, entry: SkillEntry) -> bool:
+        return not self._missing(entry)
+
     def get_always_skills(self) -> list[str]:
         """Get skills marked as always=true that meet requirements."""
-        result = []
-        for s in self.list_skills(filter_unavailable=True):
-            meta = self.get_skill_metadata(s["name"]) or {}
-            skill_meta = self._parse_nanobot_metadata(meta.get("metadata", ""))
-            if skill_meta.get("always") or meta.get("always"):
-                result.append(s["name"])
-        return result
-    
+        return [
+            e.name for e in self.index.entries()
+            if self._is_available(e) and (e.meta.get("always") or (e.frontmatter or {}).get("always"))
+        ]
+
     def get_skill_metadata(self, name: str) -> dict | None:
         """
         Get metadata from a skill's frontmatter.
-        
+
         Args:
             name: Skill name.
-        
+
         Returns:
             Metadata dict or None.
         """
-        content = self.load_skill(name)
-        if not content:
+        entry = self.index.get(name)
+        if entry is None or entry.frontmatter is None:
             return None
-        
-        if content.startswith("---"):
-            match = re.match(r"^---\n(.*?)\n---", content, re.DOTALL)
-            if match:
-                # Simple YAML parsing
-                metadata = {}
-                for line in match.group(1).split("\n"):
-                    if ":" in line:
-                        key, value = line.split(":", 1)
-                        metadata[key.strip()] = value.strip().strip('"\'')
-                return metadata
-        
-        return None
+        return dict(entry.frontmatter)
+
+
+def _parse_nanobot_metadata(raw: str) -> dict:
+    try:
+        data = json.loads(raw)
+        return data.get("nanobot", data.get("openclaw", {})) if isinstance(data, dict) else {}
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+
+def _parse_skill(name: str, path: Path, source: str, stamp: tuple[int, int] | None) -> SkillEntry:
+    """Read and parse one SKILL.md."""
+    try:
+        content = path.read_text(encoding="utf-8")
+    except OSError:
+        content = ""
+    frontmatter = None
+    body_offset = 0
+    if content.startswith("---"):
+        match = _FRONTMATTER_RE.match(content)
+        if match:
+            # Simple YAML parsing
+            frontmatter = {}
+            for line in match.group(1).split("\n"):
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    frontmatter[key.strip()] = value.strip().strip('"\'')
+        block = _FRONTMATTER_BLOCK_RE.match(content)
+        if block:
+            body_offset = block.end()
+    meta = _parse_nanobot_metadata((frontmatter or {}).get("metadata", ""))
+    return SkillEntry(
+        name=name, path=path, source=source, frontmatter=frontmatter,
+        meta=meta if isinstance(meta, dict) else {}, body_offset=body_offset, stamp=stamp,
+    )
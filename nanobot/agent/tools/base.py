@@ -1,7 +1,16 @@
 """Base class for agent tools."""
 
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Callable
+
+_TYPE_MAP = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
 
 
 class Tool(ABC):
@@ -12,14 +21,14 @@ class Tool(ABC):
     the environment, such as reading files, executing commands, etc.
     """
     
-    _TYPE_MAP = {
-        "string": str,
-        "integer": int,
-        "number": (int, float),
-        "boolean": bool,
-        "array": list,
-        "object": dict,
-    }
+    _TYPE_MAP = _TYPE_MAP
+
+    # Whether calls to this tool may run alongside other calls from the same LLM turn.
+    # Tools with side effects keep the default and are executed one at a time.
+    concurrency_safe: bool = False
+
+    # Compiled parameter validator, built on first use (or at registration)
+    _validator: Callable[[Any, str], list[str]] | None = None
     
     @property
     @abstractmethod
@@ -54,41 +63,18 @@ class Tool(ABC):
 
     def validate_params(self, params: dict[str, Any]) -> list[str]:
         """Validate tool parameters against JSON schema. Returns error list (empty if valid)."""
+        validator = self._validator
+        if validator is None:
+            validator = self.compile_validator()
+        return validator(params, "")
+
+    def compile_validator(self) -> Callable[[Any, str], list[str]]:
+        """Compile the parameter schema into a validator closure (done once, then reused)."""
         schema = self.parameters or {}
         if schema.get("type", "object") != "object":
             raise ValueError(f"Schema must be object type, got {schema.get('type')!r}")
-        return self._validate(params, {**schema, "type": "object"}, "")
-
-    def _validate(self, val: Any, schema: dict[str, Any], path: str) -> list[str]:
-        t, label = schema.get("type"), path or "parameter"
-        if t in self._TYPE_MAP and not isinstance(val, self._TYPE_MAP[t]):
-            return [f"{label} should be {t}"]
-        
-        errors = []
-        if "enum" in schema and val not in schema["enum"]:
-            errors.append(f"{label} must be one of {schema['enum']}")
-        if t in ("integer", "number"):
-            if "minimum" in schema and val < schema["minimum"]:
-                errors.append(f"{label} must be >= {schema['minimum']}")
-            if "maximum" in schema and val > schema["maximum"]:
-                errors.append(f"{label} must be <= {schema['maximum']}")
-        if t == "string":
-            if "minLength" in schema and len(val) < schema["minLength"]:
-                errors.append(f"{label} must be at least {schema['minLength']} chars")
-            if "maxLength" in schema and len(val) > schema["maxLength"]:
-                errors.append(f"{label} must be at most {schema['maxLength']} chars")
-        if t == "object":
-            props = schema.get("properties", {})
-            for k in schema.get("required", []):
-                if k not in val:
-                    errors.append(f"missing required {path + '.' + k if path else k}")
-            for k, v in val.items():
-                if k in props:
-                    errors.extend(self._validate(v, props[k], path + '.' + k if path else k))
-        if t == "array" and "items" in schema:
-            for i, item in enumerate(val):
-                errors.extend(self._validate(item, schema["items"], f"{path}[{i}]" if path else f"[{i}]"))
-        return errors
+        self._validator = compile_schema({**schema, "type": "object"})
+        return self._validator
     
     def to_schema(self) -> dict[str, Any]:
         """Convert tool to OpenAI function schema format."""
@@ -100,3 +86,56 @@ class Tool(ABC):
                 "parameters": self.parameters,
             }
         }
+
+
+def compile_schema(schema: dict[str, Any]) -> Callable[[Any, str], list[str]]:
+    """
+    Compile a JSON schema into a validator ``(value, path) -> errors``.
+
+    The schema is walked once here; validation only runs the checks the schema
+    actually declares. Error messages match the schema keywords they enforce.
+    """
+    t = schema.get("type")
+    py_type = _TYPE_MAP.get(t)
+    has_enum, enum = "enum" in schema, schema.get("enum")
+    numeric, string = t in ("integer", "number"), t == "string"
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+    min_len, max_len = schema.get("minLength"), schema.get("maxLength")
+    required: tuple[str, ...] = ()
+    props: dict[str, Callable[[Any, str], list[str]]] = {}
+    if t == "object":
+        required = tuple(schema.get("required", []))
+        props = {k: compile_schema(v) for k, v in schema.get("properties", {}).items()}
+    items = compile_schema(schema["items"]) if t == "array" and "items" in schema else None
+
+    def validate(val: Any, path: str) -> list[str]:
+        label = path or "parameter"
+        if py_type is not None and not isinstance(val, py_type):
+            return [f"{label} should be {t}"]
+
+        errors = []
+        if has_enum and val not in enum:
+            errors.append(f"{label} must be one of {enum}")
+        if numeric:
+            if minimum is not None and val < minimum:
+                errors.append(f"{label} must be >= {minimum}")
+            if maximum is not None and val > maximum:
+                errors.append(f"{label} must be <= {maximum}")
+        if string:
+            if min_len is not None and len(val) < min_len:
+                errors.append(f"{label} must be at least {min_len} chars")
+            if max_len is not None and len(val) > max_len:
+                errors.append(f"{label} must be at most {max_len} chars")
+        if t == "object":
+            for k in required:
+                if k not in val:
+                    errors.append(f"missing required {path + '.' + k if path else k}")
+            for k, v in val.items():
+                if (check := props.get(k)) is not None:
+                    errors.extend(check(v, path + '.' + k if path else k))
+        if items is not None:
+            for i, item in enumerate(val):
+                errors.extend(items(item, f"{path}[{i}]" if path else f"[{i}]"))
+        return errors
+
+    return validate
@@ -0,0 +1,52 @@
+"""Memory recall tool: ranked search over the history log."""
+
+from pathlib import Path
+from typing import Any
+
+from nanobot.agent.memory import MemoryStore
+from nanobot.agent.tools.base import Tool
+
+_MAX_ENTRY_CHARS = 1500
+
+
+class MemorySearchTool(Tool):
+    """Search past conversation summaries in the history log (all segments)."""
+
+    name = "memory_search"
+    concurrency_safe = True
+    description = (
+        "Search the full history log of past conversations (memory/history/, including past months). "
+        "Returns the most relevant entries, newest first among equals. "
+        "Use for recalling past events, decisions and topics."
+    )
+    parameters = {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "Keywords to search for"},
+            "limit": {"type": "integer", "description": "Max entries (1-20)", "minimum": 1, "maximum": 20},
+            "since": {"type": "string", "description": "Only entries on/after this date (YYYY, YYYY-MM or YYYY-MM-DD)"},
+            "until": {"type": "string", "description": "Only entries on/before this date (YYYY, YYYY-MM or YYYY-MM-DD)"},
+        },
+        "required": ["query"],
+    }
+
+    def __init__(self, workspace: Path):
+        self.store = MemoryStore(workspace)
+
+    async def execute(
+        self,
+        query: str,
+        limit: int = 5,
+        since: str | None = None,
+        until: str | None = None,
+        **kwargs: Any,
+    ) -> str:
+        results = self.store.search_history(query, limit=limit, since=since, until=until)
+        if not results:
+            return f"No history entries found for: {query}"
+        entries = []
+        for _, text in results:
+            if len(text) > _MAX_ENTRY_CHARS:
+                text = text[:_MAX_ENTRY_CHARS] + " ... (truncated)"
+            entries.append(text)
+        return "\n\n".join(entries)
@@ -1,5 +1,6 @@
 """Tool registry for dynamic tool management."""
 
+import asyncio
 from typing import Any
 
 from nanobot.agent.tools.base import Tool
@@ -10,18 +11,34 @@ class ToolRegistry:
     Registry for agent tools.
     
     Allows dynamic registration and execution of tools.
+
+    Parameter validators are compiled when a tool is registered, and tool
+    definitions are built once per registry ``version`` (bumped by
+    register/unregister) instead of on every LLM call.
     """
     
     def __init__(self):
         self._tools: dict[str, Tool] = {}
+        self._definitions: tuple[dict[str, Any], ...] | None = None
+        self.version = 0
     
     def register(self, tool: Tool) -> None:
         """Register a tool."""
+        try:
+            tool.compile_validator()
+        except ValueError:
+            pass  # Reported by validate_params when the tool is called
         self._tools[tool.name] = tool
+        self._invalidate()
     
     def unregister(self, name: str) -> None:
         """Unregister a tool by name."""
-        self._tools.pop(name, None)
+        if self._tools.pop(name, None) is not None:
+            self._invalidate()
+
+    def _invalidate(self) -> None:
+        self._definitions = None
+        self.version += 1
     
     def get(self, name: str) -> Tool | None:
         """Get a tool by name."""
@@ -32,8 +49,10 @@ class ToolRegistry:
         return name in self._tools
     
     def get_definitions(self) -> list[dict[str, Any]]:
-        """Get all tool definitions in OpenAI format."""
-        return [tool.to_schema() for tool in self._tools.values()]
+        """Get all tool definitions in OpenAI format (shared dicts; do not mutate them)."""
+        if self._definitions is None:
+            self._definitions = tuple(tool.to_schema() for tool in self._tools.values())
+        return list(self._definitions)
     
     async def execute(self, name: str, params: dict[str, Any]) -> str:
         """
@@ -66,6 +85,40 @@ class ToolRegistry:
         except Exception as e:
             return f"Error executing {name}: {str(e)}" + _HINT
     
+    async def execute_batch(self, calls: list[tuple[str, dict[str, Any]]]) -> list[str]:
+        """
+        Execute the tool calls of one LLM turn, returning results in call order.
+
+        Consecutive concurrency-safe calls run together; any other call waits for
+        everything issued before it and runs alone, so side effects keep their order.
+
+        Args:
+            calls: (tool name, parameters) pairs in the order the model issued them.
+
+        Returns:
+            Tool execution results, aligned with ``calls``.
+        """
+        results: list[str] = [""] * len(calls)
+        pending: list[int] = []
+
+        async def _flush() -> None:
+            if not pending:
+                return
+            outputs = await asyncio.gather(*(self.execute(*calls[i]) for i in pending))
+            for i, output in zip(pending, outputs):
+                results[i] = output
+            pending.clear()
+
+        for i, (name, params) in enumerate(calls):
+            tool = self._tools.get(name)
+            if tool is not None and tool.concurrency_safe:
+                pending.append(i)
+                continue
+            await _flush()
+            results[i] = await self.execute(name, params)
+        await _flush()
+        return results
+
     @property
     def tool_names(self) -> list[str]:
         """Get list of registered tool names."""
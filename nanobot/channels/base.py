@@ -18,6 +18,7 @@ class BaseChannel(ABC):
     """
     
     name: str = "base"
+    supports_streaming: bool = False  # Can render token-level partial answers (_stream_delta progress)
     
     def __init__(self, config: Any, bus: MessageBus):
         """
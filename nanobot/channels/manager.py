@@ -200,6 +200,8 @@ class ChannelManager:
                         continue
                 
                 channel = self.channels.get(msg.channel)
+                if channel and msg.metadata.get("_stream_delta") and not channel.supports_streaming:
+                    continue
                 if channel:
                     try:
                         await channel.send(msg)
@@ -17,6 +17,7 @@ from nanobot.bus.queue import MessageBus
 from nanobot.channels.base import BaseChannel
 from nanobot.config.schema import MochatConfig
 from nanobot.utils.helpers import get_data_path
+from nanobot.utils.journal import Journal
 
 try:
     import socketio
@@ -256,7 +257,7 @@ class MochatChannel(BaseChannel):
 
         self._running = True
         self._http = httpx.AsyncClient(timeout=30.0)
-        self._state_dir.mkdir(parents=True, exist_ok=True)
+        Journal.for_dir(self._state_dir)  # Replays an interrupted cursor write
         await self._load_session_cursors()
         self._seed_targets_from_config()
         await self._refresh_targets(subscribe_new=False)
@@ -846,11 +847,11 @@ class MochatChannel(BaseChannel):
 
     async def _save_session_cursors(self) -> None:
         try:
-            self._state_dir.mkdir(parents=True, exist_ok=True)
-            self._cursor_path.write_text(json.dumps({
+            data = json.dumps({
                 "schemaVersion": 1, "updatedAt": datetime.utcnow().isoformat(),
                 "cursors": self._session_cursor,
-            }, ensure_ascii=False, indent=2) + "\n", "utf-8")
+            }, ensure_ascii=False, indent=2) + "\n"
+            await Journal.for_dir(self._state_dir).write_async(self._cursor_path, data.encode("utf-8"))
         except Exception as e:
             logger.warning("Failed to save Mochat cursor file: {}", e)
 
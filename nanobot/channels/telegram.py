@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import asyncio
 import re
+import time
 from loguru import logger
 from telegram import BotCommand, Update, ReplyParameters
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
@@ -98,6 +99,9 @@ def _split_message(content: str, max_len: int = 4000) -> list[str]:
     return chunks
 
 
+_STREAM_EDIT_INTERVAL = 1.0  # Seconds between edits of a live-streamed answer (Telegram rate-limits edits)
+
+
 class TelegramChannel(BaseChannel):
     """
     Telegram channel using long polling.
@@ -106,6 +110,7 @@ class TelegramChannel(BaseChannel):
     """
     
     name = "telegram"
+    supports_streaming = True  # Streamed answers are shown as one message, edited as text arrives
     
     # Commands registered with Telegram's command menu
     BOT_COMMANDS = [
@@ -126,6 +131,7 @@ class TelegramChannel(BaseChannel):
         self._app: Application | None = None
         self._chat_ids: dict[str, int] = {}  # Map sender_id to chat_id for replies
         self._typing_tasks: dict[str, asyncio.Task] = {}  # chat_id -> typing loop task
+        self._streams: dict[str, dict] = {}  # chat_id -> live answer: message_id, text, last edit time
     
     async def start(self) -> None:
         """Start the Telegram bot with long polling."""
@@ -233,6 +239,11 @@ class TelegramChannel(BaseChannel):
                     allow_sending_without_reply=True
                 )
 
+        if msg.metadata.get("_stream_delta"):
+            await self._stream_delta(chat_id, msg.chat_id, msg.content, reply_params)
+            return
+        stream = self._streams.pop(msg.chat_id, None)
+
         # Send media files
         for media_path in (msg.media or []):
             try:
@@ -260,7 +271,11 @@ class TelegramChannel(BaseChannel):
 
         # Send text content
         if msg.content and msg.content != "[empty message]":
-            for chunk in _split_message(msg.content):
+            chunks = _split_message(msg.content)
+            if stream and stream["message_id"] and msg.metadata.get("_streamed"):
+                # The answer was streamed: replace the live preview with the formatted text
+                await self._edit_text(chat_id, stream["message_id"], chunks.pop(0))
+            for chunk in chunks:
                 try:
                     html = _markdown_to_telegram_html(chunk)
                     await self._app.bot.send_message(
@@ -279,6 +294,42 @@ class TelegramChannel(BaseChannel):
                         )
                     except Exception as e2:
                         logger.error("Error sending Telegram message: {}", e2)
+
+    async def _stream_delta(
+        self, chat_id: int, key: str, delta: str, reply_params: ReplyParameters | None,
+    ) -> None:
+        """Show a streamed answer as one plain-text message, edited at most every _STREAM_EDIT_INTERVAL."""
+        stream = self._streams.setdefault(key, {"message_id": None, "text": "", "edited": 0.0})
+        stream["text"] += delta
+        now = time.monotonic()
+        text = stream["text"].strip()[:4000]
+        if not text or (stream["message_id"] and now - stream["edited"] < _STREAM_EDIT_INTERVAL):
+            return
+        stream["edited"] = now
+        try:
+            if stream["message_id"] is None:
+                sent = await self._app.bot.send_message(chat_id=chat_id, text=text, reply_parameters=reply_params)
+                stream["message_id"] = sent.message_id
+            else:
+                await self._app.bot.edit_message_text(chat_id=chat_id, message_id=stream["message_id"], text=text)
+        except Exception as e:
+            logger.debug("Telegram stream update failed: {}", e)
+
+    async def _edit_text(self, chat_id: int, message_id: int, chunk: str) -> None:
+        """Replace a message's text with a formatted chunk, falling back to plain text."""
+        try:
+            await self._app.bot.edit_message_text(
+                chat_id=chat_id, message_id=message_id,
+                text=_markdown_to_telegram_html(chunk), parse_mode="HTML",
+            )
+        except Exception as e:
+            if "not modified" in str(e).lower():
+                return  # The preview already shows exactly this text
+            logger.warning("HTML parse failed, falling back to plain text: {}", e)
+            try:
+                await self._app.bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=chunk)
+            except Exception as e2:
+                logger.error("Error editing Telegram message: {}", e2)
     
     async def _on_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /start command."""
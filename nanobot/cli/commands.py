@@ -97,9 +97,18 @@ def _init_prompt_session() -> None:
     )
 
 
-def _print_agent_response(response: str, render_markdown: bool) -> None:
-    """Render assistant response with consistent terminal styling."""
+def _print_agent_response(response: str, render_markdown: bool, streamed: str = "") -> None:
+    """Render assistant response with consistent terminal styling.
+
+    ``streamed`` is the text already printed live as deltas; only the rest is printed.
+    """
     content = response or ""
+    shown = streamed.strip()
+    if shown and content.startswith(shown):
+        if rest := content[len(shown):].strip():
+            console.print(rest, markup=False, highlight=False)
+        console.print()
+        return
     body = Markdown(content) if render_markdown else Text(content)
     console.print()
     console.print(f"[cyan]{__logo__} nanobot[/cyan]")
@@ -231,11 +240,79 @@ def _create_workspace_templates(workspace: Path):
 
 def _make_provider(config: Config):
     """Create the appropriate LLM provider from config."""
+    model = config.agents.defaults.model
+    provider = _make_model_provider(config, model)
+    if provider is None:
+        console.print("[red]Error: No API key configured.[/red]")
+        console.print("Set one in ~/.nanobot/config.json under providers section")
+        raise typer.Exit(1)
+
+    failover = config.agents.defaults.failover
+    if failover.models:
+        from nanobot.providers.failover import FailoverProvider
+
+        members = [(provider, model)]
+        for fallback in failover.models:
+            if (p := _make_model_provider(config, fallback)) is None:
+                console.print(f"[yellow]Warning: no API key for fallback model {fallback}, skipping[/yellow]")
+                continue
+            members.append((p, fallback))
+        provider = FailoverProvider(
+            members,
+            hedge=failover.hedge,
+            hedge_percentile=failover.hedge_percentile,
+            hedge_min_delay=failover.hedge_min_delay,
+            hedge_max_delay=failover.hedge_max_delay,
+            failure_threshold=failover.failure_threshold,
+            cooldown=failover.cooldown,
+        )
+
+    return _with_response_cache(config, provider)
+
+
+_response_cache = None  # Shared by the default and routed providers, so one size budget covers both
+
+
+def _with_response_cache(config: Config, provider):
+    """Wrap a provider in the on-disk response cache when agents.defaults.responseCache is enabled."""
+    global _response_cache
+    cache = config.agents.defaults.response_cache
+    if not cache.enabled:
+        return provider
+    from nanobot.config.loader import get_data_dir
+    from nanobot.providers.cache import CachingProvider, ResponseCache
+
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            get_data_dir() / "llm_cache", ttl=cache.ttl, max_bytes=cache.max_mb * 1024 * 1024,
+        )
+    return CachingProvider(provider, _response_cache)
+
+
+def _make_router(config: Config):
+    """Build the per-workload model router from agents.defaults.routes, recording to the usage ledger."""
+    from nanobot.config.loader import get_data_dir
+    from nanobot.providers.ledger import UsageLedger
+    from nanobot.providers.router import ModelRouter
+
+    defaults = config.agents.defaults
+    routes = {}
+    for workload, model in defaults.routes.model_dump().items():
+        if not model or model == defaults.model:
+            continue
+        if (provider := _make_model_provider(config, model)) is None:
+            console.print(f"[yellow]Warning: no API key for {workload} model {model}, using the default model[/yellow]")
+            continue
+        routes[workload] = (_with_response_cache(config, provider), model)
+    return ModelRouter(routes, ledger=UsageLedger(get_data_dir() / "usage" / "ledger.jsonl"))
+
+
+def _make_model_provider(config: Config, model: str):
+    """Create the provider serving one model, or None if it has no credentials."""
     from nanobot.providers.litellm_provider import LiteLLMProvider
     from nanobot.providers.openai_codex_provider import OpenAICodexProvider
     from nanobot.providers.custom_provider import CustomProvider
 
-    model = config.agents.defaults.model
     provider_name = config.get_provider_name(model)
     p = config.get_provider(model)
 
@@ -254,9 +331,7 @@ def _make_provider(config: Config):
     from nanobot.providers.registry import find_by_name
     spec = find_by_name(provider_name)
     if not model.startswith("bedrock/") and not (p and p.api_key) and not (spec and spec.is_oauth):
-        console.print("[red]Error: No API key configured.[/red]")
-        console.print("Set one in ~/.nanobot/config.json under providers section")
-        raise typer.Exit(1)
+        return None
 
     return LiteLLMProvider(
         api_key=p.api_key if p else None,
@@ -264,6 +339,10 @@ def _make_provider(config: Config):
         default_model=model,
         extra_headers=p.extra_headers if p else None,
         provider_name=provider_name,
+        rpm=p.rpm if p else 0,
+        tpm=p.tpm if p else 0,
+        max_concurrency=p.max_concurrency if p else 16,
+        max_retries=p.max_retries if p else 3,
     )
 
 
@@ -286,6 +365,7 @@ def gateway(
     from nanobot.cron.service import CronService
     from nanobot.cron.types import CronJob
     from nanobot.heartbeat.service import HeartbeatService
+    from nanobot.utils.http import http_clients
     
     if verbose:
         import logging
@@ -296,7 +376,11 @@ def gateway(
     config = load_config()
     bus = MessageBus()
     provider = _make_provider(config)
-    session_manager = SessionManager(config.workspace_path)
+    session_manager = SessionManager(
+        config.workspace_path,
+        max_cached=config.agents.defaults.session_cache_size,
+        max_cache_bytes=config.agents.defaults.session_cache_mb * 1024 * 1024,
+    )
     
     # Create cron service first (callback set after agent creation)
     cron_store_path = get_data_dir() / "cron" / "jobs.json"
@@ -312,6 +396,11 @@ def gateway(
         max_tokens=config.agents.defaults.max_tokens,
         max_iterations=config.agents.defaults.max_tool_iterations,
         memory_window=config.agents.defaults.memory_window,
+        max_concurrency=config.agents.defaults.max_concurrency,
+        context_window_tokens=config.agents.defaults.context_window_tokens,
+        memory_tokens=config.agents.defaults.memory_tokens,
+        consolidation_workers=config.agents.defaults.consolidation_workers,
+        router=_make_router(config),
         brave_api_key=config.tools.web.search.api_key or None,
         exec_config=config.tools.exec,
         cron_service=cron,
@@ -329,6 +418,7 @@ def gateway(
             session_key=f"cron:{job.id}",
             channel=job.payload.channel or "cli",
             chat_id=job.payload.to or "direct",
+            workload="cron",
         )
         if job.payload.deliver and job.payload.to:
             from nanobot.bus.events import OutboundMessage
@@ -373,6 +463,7 @@ def gateway(
             channel=channel,
             chat_id=chat_id,
             on_progress=_silent,  # suppress: heartbeat should not push progress to external channels
+            workload="heartbeat",
         )
 
     async def on_heartbeat_notify(response: str) -> None:
@@ -404,6 +495,7 @@ def gateway(
     
     async def run():
         try:
+            http_clients.configure(config.http)
             await cron.start()
             await heartbeat.start()
             await asyncio.gather(
@@ -418,6 +510,7 @@ def gateway(
             cron.stop()
             agent.stop()
             await channels.stop_all()
+            await http_clients.aclose_all()
     
     asyncio.run(run())
 
@@ -441,6 +534,7 @@ def agent(
     from nanobot.bus.queue import MessageBus
     from nanobot.agent.loop import AgentLoop
     from nanobot.cron.service import CronService
+    from nanobot.utils.http import http_clients
     from loguru import logger
     
     config = load_config()
@@ -466,6 +560,11 @@ def agent(
         max_tokens=config.agents.defaults.max_tokens,
         max_iterations=config.agents.defaults.max_tool_iterations,
         memory_window=config.agents.defaults.memory_window,
+        max_concurrency=config.agents.defaults.max_concurrency,
+        context_window_tokens=config.agents.defaults.context_window_tokens,
+        memory_tokens=config.agents.defaults.memory_tokens,
+        consolidation_workers=config.agents.defaults.consolidation_workers,
+        router=_make_router(config),
         brave_api_key=config.tools.web.search.api_key or None,
         exec_config=config.tools.exec,
         cron_service=cron,
@@ -482,21 +581,44 @@ def agent(
         # Animated spinner is safe to use with prompt_toolkit input handling
         return console.status("[dim]nanobot is thinking...[/dim]", spinner="dots")
 
-    async def _cli_progress(content: str, *, tool_hint: bool = False) -> None:
+    stream: list[str] = []  # Answer text printed live since the last complete message
+
+    def _end_stream() -> str:
+        """Finish the line of a live-printed answer and return its text."""
+        text = "".join(stream)
+        if stream:
+            console.print()
+            stream.clear()
+        return text
+
+    async def _cli_progress(
+        content: str, *, tool_hint: bool = False, delta: bool = False, streamed: bool = False,
+    ) -> None:
         ch = agent_loop.channels_config
         if ch and tool_hint and not ch.send_tool_hints:
             return
         if ch and not tool_hint and not ch.send_progress:
             return
+        if delta:
+            if not stream:
+                console.print()
+                console.print(f"[cyan]{__logo__} nanobot[/cyan]")
+            stream.append(content)
+            console.print(content, end="", markup=False, highlight=False)
+            return
+        if _end_stream() and streamed:
+            return  # Already printed as deltas
         console.print(f"  [dim]↳ {content}[/dim]")
 
     if message:
         # Single message mode — direct call, no bus needed
         async def run_once():
+            http_clients.configure(config.http)
             with _thinking_ctx():
                 response = await agent_loop.process_direct(message, session_id, on_progress=_cli_progress)
-            _print_agent_response(response, render_markdown=markdown)
+            _print_agent_response(response, render_markdown=markdown, streamed=_end_stream())
             await agent_loop.close_mcp()
+            await http_clients.aclose_all()
 
         asyncio.run(run_once())
     else:
@@ -518,6 +640,7 @@ def agent(
         signal.signal(signal.SIGINT, _exit_on_sigint)
 
         async def run_interactive():
+            http_clients.configure(config.http)
             bus_task = asyncio.create_task(agent_loop.run())
             turn_done = asyncio.Event()
             turn_done.set()
@@ -528,21 +651,19 @@ def agent(
                     try:
                         msg = await asyncio.wait_for(bus.consume_outbound(), timeout=1.0)
                         if msg.metadata.get("_progress"):
-                            is_tool_hint = msg.metadata.get("_tool_hint", False)
-                            ch = agent_loop.channels_config
-                            if ch and is_tool_hint and not ch.send_tool_hints:
-                                pass
-                            elif ch and not is_tool_hint and not ch.send_progress:
-                                pass
-                            else:
-                                console.print(f"  [dim]↳ {msg.content}[/dim]")
+                            await _cli_progress(
+                                msg.content,
+                                tool_hint=msg.metadata.get("_tool_hint", False),
+                                delta=msg.metadata.get("_stream_delta", False),
+                                streamed=msg.metadata.get("_streamed", False),
+                            )
                         elif not turn_done.is_set():
                             if msg.content:
                                 turn_response.append(msg.content)
                             turn_done.set()
                         elif msg.content:
                             console.print()
-                            _print_agent_response(msg.content, render_markdown=markdown)
+                            _print_agent_response(msg.content, render_markdown=markdown, streamed=_end_stream())
                     except asyncio.TimeoutError:
                         continue
                     except asyncio.CancelledError:
@@ -577,8 +698,9 @@ def agent(
                         with _thinking_ctx():
                             await turn_done.wait()
 
+                        streamed = _end_stream()
                         if turn_response:
-                            _print_agent_response(turn_response[0], render_markdown=markdown)
+                            _print_agent_response(turn_response[0], render_markdown=markdown, streamed=streamed)
                     except KeyboardInterrupt:
                         _restore_terminal()
                         console.print("\nGoodbye!")
@@ -592,6 +714,7 @@ def agent(
                 outbound_task.cancel()
                 await asyncio.gather(bus_task, outbound_task, return_exceptions=True)
                 await agent_loop.close_mcp()
+                await http_clients.aclose_all()
 
         asyncio.run(run_interactive())
 
@@ -957,6 +1080,11 @@ def cron_run(
         max_tokens=config.agents.defaults.max_tokens,
         max_iterations=config.agents.defaults.max_tool_iterations,
         memory_window=config.agents.defaults.memory_window,
+        max_concurrency=config.agents.defaults.max_concurrency,
+        context_window_tokens=config.agents.defaults.context_window_tokens,
+        memory_tokens=config.agents.defaults.memory_tokens,
+        consolidation_workers=config.agents.defaults.consolidation_workers,
+        router=_make_router(config),
         brave_api_key=config.tools.web.search.api_key or None,
         exec_config=config.tools.exec,
         restrict_to_workspace=config.tools.restrict_to_workspace,
@@ -975,6 +1103,7 @@ def cron_run(
             session_key=f"cron:{job.id}",
             channel=job.payload.channel or "cli",
             chat_id=job.payload.to or "direct",
+            workload="cron",
         )
         result_holder.append(response)
         return response
@@ -992,6 +1121,48 @@ def cron_run(
         console.print(f"[red]Failed to run job {job_id}[/red]")
 
 
+# ============================================================================
+# Usage
+# ============================================================================
+
+
+@app.command()
+def usage(
+    by: str = typer.Option("day", "--by", "-b", help="Group by: day, session, model or workload"),
+    days: int = typer.Option(30, "--days", "-d", help="Only include the last N days (0 = all)"),
+):
+    """Show LLM token usage and latency from the usage ledger."""
+    import time
+    from nanobot.config.loader import get_data_dir
+    from nanobot.providers.ledger import GROUP_BY, UsageLedger, aggregate
+
+    if by not in GROUP_BY:
+        console.print(f"[red]Error: --by must be one of {', '.join(GROUP_BY)}[/red]")
+        raise typer.Exit(1)
+
+    ledger = UsageLedger(get_data_dir() / "usage" / "ledger.jsonl")
+    since = time.time() - days * 86400 if days > 0 else 0.0
+    rows = aggregate(ledger.entries(since), by=by)
+    if not rows:
+        console.print("No usage recorded.")
+        return
+
+    table = Table(title=f"LLM Usage by {by}")
+    table.add_column(by.capitalize(), style="cyan")
+    table.add_column("Calls", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("Prompt", justify="right")
+    table.add_column("Cached", justify="right")
+    table.add_column("Completion", justify="right")
+    table.add_column("Avg Latency", justify="right")
+    for row in rows:
+        table.add_row(
+            row["key"], str(row["calls"]), str(row["errors"]), f"{row['in']:,}",
+            f"{row['cached']:,}", f"{row['out']:,}", f"{row['avg_ms'] / 1000:.1f}s",
+        )
+    console.print(table)
+
+
 # ============================================================================
 # Status Commands
 # ============================================================================
@@ -170,6 +170,7 @@ class ChannelsConfig(Base):
 
     send_progress: bool = True    # stream agent's text progress to the channel
     send_tool_hints: bool = False  # stream tool-call hints (e.g. read_file("…"))
+    send_stream_deltas: bool = False  # stream partial answer text to channels that support it
     whatsapp: WhatsAppConfig = Field(default_factory=WhatsAppConfig)
     telegram: TelegramConfig = Field(default_factory=TelegramConfig)
     discord: DiscordConfig = Field(default_factory=DiscordConfig)
@@ -181,6 +182,36 @@ class ChannelsConfig(Base):
     qq: QQConfig = Field(default_factory=QQConfig)
 
 
+class FailoverConfig(Base):
+    """Fallback models on other providers, with hedging and circuit breaking."""
+
+    models: list[str] = Field(default_factory=list)  # Tried after agents.defaults.model, in order
+    hedge: bool = True  # Send a duplicate request to the next model when the current one is slow
+    hedge_percentile: float = 0.95  # Hedge once a call exceeds this latency percentile
+    hedge_min_delay: float = 2.0  # Seconds; lower bound for the hedge delay
+    hedge_max_delay: float = 30.0  # Seconds; also used before any latency is observed
+    failure_threshold: int = 3  # Consecutive failures that open a model's circuit breaker
+    cooldown: float = 30.0  # Seconds a tripped model is skipped before being probed again
+
+
+class ResponseCacheConfig(Base):
+    """On-disk cache of LLM responses for identical deterministic requests."""
+
+    enabled: bool = False
+    ttl: int = 86_400  # Seconds a cached response stays valid
+    max_mb: int = 64  # Least-recently-used entries are evicted beyond this size
+
+
+class ModelRoutesConfig(Base):
+    """Model per workload class; empty means agents.defaults.model."""
+
+    interactive: str = ""
+    consolidation: str = ""  # Memory consolidation and /new archival
+    heartbeat: str = ""
+    subagent: str = ""
+    cron: str = ""
+
+
 class AgentDefaults(Base):
     """Default agent configuration."""
 
@@ -190,6 +221,15 @@ class AgentDefaults(Base):
     temperature: float = 0.1
     max_tool_iterations: int = 40
     memory_window: int = 100
+    memory_tokens: int = 2048  # MEMORY.md beyond this is injected by relevance instead of in full
+    consolidation_workers: int = 1  # Max background memory consolidations running at once
+    context_window_tokens: int = 65_536  # Model context size; prompt budget = this - max_tokens - tools
+    max_concurrency: int = 4  # Max sessions processed concurrently (same-session messages stay ordered)
+    session_cache_size: int = 256  # Max sessions kept in memory (LRU)
+    session_cache_mb: int = 64  # Approximate memory budget for cached sessions
+    failover: FailoverConfig = Field(default_factory=FailoverConfig)
+    response_cache: ResponseCacheConfig = Field(default_factory=ResponseCacheConfig)
+    routes: ModelRoutesConfig = Field(default_factory=ModelRoutesConfig)
 
 
 class AgentsConfig(Base):
@@ -204,6 +244,10 @@ class ProviderConfig(Base):
     api_key: str = ""
     api_base: str | None = None
     extra_headers: dict[str, str] | None = None  # Custom headers (e.g. APP-Code for AiHubMix)
+    rpm: int = 0  # Client-side requests-per-minute limit (0 = unlimited)
+    tpm: int = 0  # Client-side tokens-per-minute limit (0 = unlimited)
+    max_concurrency: int = 16  # Upper bound for adaptive in-flight requests
+    max_retries: int = 3  # Retries on throttling / transient errors
 
 
 class ProvidersConfig(Base):
@@ -235,6 +279,15 @@ class GatewayConfig(Base):
     port: int = 18790
 
 
+class HttpConfig(Base):
+    """Shared HTTP client pool configuration (web tools, transcription, Codex)."""
+
+    http2: bool = True  # Used only when the optional 'h2' package is installed
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0  # Seconds an idle connection stays open
+
+
 class WebSearchConfig(Base):
     """Web search tool configuration."""
 
@@ -282,6 +335,7 @@ class Config(BaseSettings):
     providers: ProvidersConfig = Field(default_factory=ProvidersConfig)
     gateway: GatewayConfig = Field(default_factory=GatewayConfig)
     tools: ToolsConfig = Field(default_factory=ToolsConfig)
+    http: HttpConfig = Field(default_factory=HttpConfig)
 
     @property
     def workspace_path(self) -> Path:
@@ -11,6 +11,7 @@ from typing import Any, Callable, Coroutine
 from loguru import logger
 
 from nanobot.cron.types import CronJob, CronJobState, CronPayload, CronSchedule, CronStore
+from nanobot.utils.journal import Journal
 
 
 def _now_ms() -> int:
@@ -78,6 +79,7 @@ class CronService:
         if self._store:
             return self._store
         
+        Journal.for_dir(self.store_path.parent)  # Replays an interrupted save
         if self.store_path.exists():
             try:
                 data = json.loads(self.store_path.read_text(encoding="utf-8"))
@@ -125,8 +127,6 @@ class CronService:
         if not self._store:
             return
         
-        self.store_path.parent.mkdir(parents=True, exist_ok=True)
-        
         data = {
             "version": self._store.version,
             "jobs": [
@@ -162,7 +162,9 @@ class CronService:
             ]
         }
         
-        self.store_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        content = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+        # Committed by the journal's flusher; the store is kept in memory, so callers need not wait
+        Journal.for_dir(self.store_path.parent).submit_write(self.store_path, content)
     
     async def start(self) -> None:
         """Start the cron service."""
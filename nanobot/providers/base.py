@@ -2,7 +2,7 @@
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, AsyncIterator
 
 
 @dataclass
@@ -28,6 +28,42 @@ class LLMResponse:
         return len(self.tool_calls) > 0
 
 
+def parse_usage(usage: Any) -> dict[str, int]:
+    """Normalize an OpenAI/LiteLLM usage object, including prompt-cache token counts.
+
+    Anthropic reports ``cache_creation_input_tokens`` / ``cache_read_input_tokens``;
+    OpenAI-style APIs report cache reads as ``prompt_tokens_details.cached_tokens``.
+    Both are exposed under the Anthropic names when non-zero.
+    """
+    if not usage:
+        return {}
+    result = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+    }
+    details = getattr(usage, "prompt_tokens_details", None)
+    read = getattr(usage, "cache_read_input_tokens", None) or getattr(details, "cached_tokens", None)
+    created = getattr(usage, "cache_creation_input_tokens", None)
+    if isinstance(read, int) and read:
+        result["cache_read_input_tokens"] = read
+    if isinstance(created, int) and created:
+        result["cache_creation_input_tokens"] = created
+    return result
+
+
+@dataclass
+class LLMStreamChunk:
+    """One increment of a streamed chat completion.
+
+    Exactly one field is set: a text delta, a fully assembled tool call, or
+    (on the last chunk) the complete response.
+    """
+    content: str | None = None
+    tool_call: ToolCallRequest | None = None
+    response: LLMResponse | None = None
+
+
 class LLMProvider(ABC):
     """
     Abstract base class for LLM providers.
@@ -104,6 +140,30 @@ class LLMProvider(ABC):
         """
         pass
     
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        """
+        Stream a chat completion as text deltas and assembled tool calls.
+
+        The last chunk always carries the complete LLMResponse. Providers without
+        native streaming fall back to a single chat() call.
+        """
+        response = await self.chat(
+            messages=messages, tools=tools, model=model,
+            max_tokens=max_tokens, temperature=temperature,
+        )
+        if response.content:
+            yield LLMStreamChunk(content=response.content)
+        for tool_call in response.tool_calls:
+            yield LLMStreamChunk(tool_call=tool_call)
+        yield LLMStreamChunk(response=response)
+
     @abstractmethod
     def get_default_model(self) -> str:
         """Get the default model for this provider."""
@@ -0,0 +1,207 @@
+"""Exact-match on-disk cache for deterministic LLM calls."""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator
+
+from loguru import logger
+
+from nanobot.providers.base import LLMProvider, LLMResponse, LLMStreamChunk, ToolCallRequest
+
+_opt_in: ContextVar[bool] = ContextVar("nanobot_cache_responses", default=False)
+
+
+@contextlib.contextmanager
+def cache_responses(enabled: bool = True) -> Iterator[None]:
+    """Allow LLM calls made inside this block to be served from / stored in the cache."""
+    token = _opt_in.set(enabled)
+    try:
+        yield
+    finally:
+        _opt_in.reset(token)
+
+
+def cache_key(
+    model: str | None,
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]] | None,
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """Canonical SHA-256 of everything that determines a completion."""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "tools": tools or [],
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    One JSON file per response, expired after ``ttl`` seconds and evicted
+    least-recently-used first once the directory exceeds ``max_bytes``.
+    File mtimes record last use, so the LRU order survives restarts.
+    """
+
+    def __init__(self, directory: Path, ttl: float = 86_400, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._index: dict[str, tuple[int, float]] | None = None  # key -> (size, last used)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load_index(self) -> dict[str, tuple[int, float]]:
+        if self._index is None:
+            self._index = {}
+            if self.directory.exists():
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(".json"):
+                        st = entry.stat()
+                        self._index[entry.name[:-5]] = (st.st_size, st.st_mtime)
+        return self._index
+
+    def get(self, key: str) -> LLMResponse | None:
+        index = self._load_index()
+        if key not in index:
+            return None
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._drop(key)
+            return None
+        now = time.time()
+        if now - data.get("created", 0) > self.ttl:
+            self._drop(key)
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path, (now, now))
+        index[key] = (index[key][0], now)
+        r = data["response"]
+        r["tool_calls"] = [ToolCallRequest(**tc) for tc in r.get("tool_calls", [])]
+        return LLMResponse(**r)
+
+    def put(self, key: str, response: LLMResponse) -> None:
+        index = self._load_index()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        raw = json.dumps({"created": time.time(), "response": asdict(response)}, ensure_ascii=False)
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            tmp.write_text(raw, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Failed to write LLM response cache entry: {}", e)
+            return
+        index[key] = (len(raw.encode("utf-8")), time.time())
+        self._evict()
+
+    def _drop(self, key: str) -> None:
+        self._load_index().pop(key, None)
+        with contextlib.suppress(OSError):
+            self._path(key).unlink()
+
+    def _evict(self) -> None:
+        index = self._load_index()
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(index, key=lambda k: index[k][1]):
+            if total <= self.max_bytes:
+                break
+            total -= index[key][0]
+            self._drop(key)
+
+
+class CachingProvider(LLMProvider):
+    """
+    Serves repeated deterministic requests from a ``ResponseCache``.
+
+    A call is cacheable when ``temperature`` is 0, or when the caller opted
+    in with ``cache_responses()``. Error and empty responses are never stored.
+    """
+
+    def __init__(self, provider: LLMProvider, cache: ResponseCache):
+        super().__init__(provider.api_key, provider.api_base)
+        self.provider = provider
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def get_default_model(self) -> str:
+        return self.provider.get_default_model()
+
+    def _key(self, messages, tools, model, max_tokens, temperature) -> str | None:
+        if temperature != 0 and not _opt_in.get():
+            return None
+        return cache_key(model or self.get_default_model(), messages, tools, temperature, max_tokens)
+
+    def _lookup(self, key: str | None) -> LLMResponse | None:
+        if key is None:
+            return None
+        if (cached := self.cache.get(key)) is not None:
+            self.hits += 1
+            logger.debug("LLM response cache hit ({} hits / {} misses)", self.hits, self.misses)
+            return cached
+        self.misses += 1
+        return None
+
+    def _store(self, key: str | None, response: LLMResponse) -> None:
+        if key is not None and response.finish_reason != "error" and (response.content or response.has_tool_calls):
+            self.cache.put(key, response)
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> LLMResponse:
+        key = self._key(messages, tools, model, max_tokens, temperature)
+        if (cached := self._lookup(key)) is not None:
+            return cached
+        response = await self.provider.chat(
+            messages=messages, tools=tools, model=model,
+            max_tokens=max_tokens, temperature=temperature,
+        )
+        self._store(key, response)
+        return response
+
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        key = self._key(messages, tools, model, max_tokens, temperature)
+        if (cached := self._lookup(key)) is not None:
+            if cached.content:
+                yield LLMStreamChunk(content=cached.content)
+            for tool_call in cached.tool_calls:
+                yield LLMStreamChunk(tool_call=tool_call)
+            yield LLMStreamChunk(response=cached)
+            return
+        async for chunk in self.provider.chat_stream(
+            messages=messages, tools=tools, model=model,
+            max_tokens=max_tokens, temperature=temperature,
+        ):
+            if chunk.response is not None:
+                self._store(key, chunk.response)
+            yield chunk
@@ -0,0 +1,236 @@
+"""Composite provider with latency-aware failover, hedged requests and circuit breakers."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from loguru import logger
+
+from nanobot.providers.base import LLMProvider, LLMResponse, LLMStreamChunk
+
+
+@dataclass
+class _Member:
+    """One upstream: a provider plus the model it serves, with health stats."""
+
+    provider: LLMProvider
+    model: str
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=100))
+    outcomes: deque[bool] = field(default_factory=lambda: deque(maxlen=100))
+    consecutive_failures: int = 0
+    open_until: float = 0.0  # Circuit breaker: skipped until this monotonic time
+    trial_running: bool = False  # Half-open: one probe request at a time
+
+    @property
+    def name(self) -> str:
+        return self.model
+
+    def percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def error_rate(self) -> float:
+        return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+
+class FailoverProvider(LLMProvider):
+    """
+    Routes each call to the first healthy member and hedges slow ones.
+
+    If the chosen member has not answered within its observed p95 latency
+    (bounded by ``hedge_min_delay`` / ``hedge_max_delay``), the same request is
+    sent to the next healthy member and whichever succeeds first wins. Members
+    that fail ``failure_threshold`` times in a row are skipped for ``cooldown``
+    seconds, then probed with a single request before being trusted again.
+    """
+
+    def __init__(
+        self,
+        members: list[tuple[LLMProvider, str]],
+        hedge: bool = True,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 2.0,
+        hedge_max_delay: float = 30.0,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+    ):
+        if not members:
+            raise ValueError("FailoverProvider needs at least one provider")
+        super().__init__()
+        self.members = [_Member(provider, model) for provider, model in members]
+        self.hedge = hedge and len(self.members) > 1
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+    def get_default_model(self) -> str:
+        return self.members[0].model
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per-member latency percentiles, error rate and breaker state."""
+        now = time.monotonic()
+        return {
+            m.name: {
+                "p50": m.percentile(0.5),
+                "p95": m.percentile(0.95),
+                "error_rate": round(m.error_rate(), 3),
+                "samples": len(m.outcomes),
+                "open": m.open_until > now,
+            }
+            for m in self.members
+        }
+
+    # ------------------------------------------------------------------
+    # Health bookkeeping
+    # ------------------------------------------------------------------
+
+    def _candidates(self) -> list[_Member]:
+        """Healthy members in configured order; every member if all breakers are open."""
+        now = time.monotonic()
+        healthy = [m for m in self.members if m.open_until <= now and not m.trial_running]
+        return healthy or sorted(self.members, key=lambda m: m.open_until)
+
+    def _record(self, member: _Member, ok: bool, elapsed: float) -> None:
+        member.outcomes.append(ok)
+        if ok:
+            member.latencies.append(elapsed)
+            if member.open_until:
+                logger.info("LLM provider {} recovered, closing circuit", member.name)
+            member.consecutive_failures = 0
+            member.open_until = 0.0
+            return
+        member.consecutive_failures += 1
+        if member.consecutive_failures >= self.failure_threshold:
+            member.open_until = time.monotonic() + self.cooldown
+            logger.warning(
+                "LLM provider {} failed {} times in a row, skipping it for {:.0f}s",
+                member.name, member.consecutive_failures, self.cooldown,
+            )
+
+    def _hedge_delay(self, member: _Member) -> float:
+        p = member.percentile(self.hedge_percentile)
+        if p is None:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, p))
+
+    def _model_for(self, member: _Member, model: str | None) -> str:
+        # The caller's model applies to the primary; fallbacks keep their own
+        return (model or member.model) if member is self.members[0] else member.model
+
+    async def _call(self, member: _Member, kwargs: dict[str, Any]) -> LLMResponse:
+        member.trial_running = member.open_until > 0  # Half-open probe
+        kwargs["model"] = self._model_for(member, kwargs.get("model"))
+        start = time.monotonic()
+        try:
+            response = await member.provider.chat(**kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            response = LLMResponse(content=f"Error calling LLM: {e}", finish_reason="error")
+        finally:
+            member.trial_running = False
+        self._record(member, response.finish_reason != "error", time.monotonic() - start)
+        return response
+
+    # ------------------------------------------------------------------
+    # LLMProvider interface
+    # ------------------------------------------------------------------
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> LLMResponse:
+        kwargs = {
+            "messages": messages, "tools": tools, "model": model,
+            "max_tokens": max_tokens, "temperature": temperature,
+        }
+        queue = self._candidates()
+        pending: dict[asyncio.Task[LLMResponse], _Member] = {}
+        last: LLMResponse | None = None
+
+        def _launch() -> None:
+            member = queue.pop(0)
+            pending[asyncio.create_task(self._call(member, dict(kwargs)))] = member
+
+        _launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and queue and len(pending) == 1:
+                    timeout = self._hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    slow = next(iter(pending.values()))
+                    logger.info("LLM provider {} slower than {:.1f}s, hedging to {}",
+                                slow.name, timeout, queue[0].name)
+                    _launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    response = task.result()
+                    if response.finish_reason != "error":
+                        return response
+                    last = response
+                if not pending and queue:
+                    _launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:  # Let the losers unwind (and free their rate-limit slots) before returning
+                await asyncio.gather(*pending, return_exceptions=True)
+        assert last is not None
+        return last
+
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        """Stream from the first healthy member; fail over only before any output was emitted.
+
+        Streams are not hedged: once text reaches the user, switching upstream
+        would duplicate it.
+        """
+        last: LLMResponse | None = None
+        for member in self._candidates():
+            emitted = False
+            start = time.monotonic()
+            try:
+                async for chunk in member.provider.chat_stream(
+                    messages=messages, tools=tools, model=self._model_for(member, model),
+                    max_tokens=max_tokens, temperature=temperature,
+                ):
+                    if chunk.response is not None:
+                        ok = chunk.response.finish_reason != "error"
+                        self._record(member, ok, time.monotonic() - start)
+                        if ok or emitted:
+                            yield chunk
+                            return
+                        last = chunk.response
+                        break
+                    emitted = True
+                    yield chunk
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._record(member, False, time.monotonic() - start)
+                last = LLMResponse(content=f"Error calling LLM: {e}", finish_reason="error")
+                if emitted:
+                    yield LLMStreamChunk(response=last)
+                    return
+        yield LLMStreamChunk(response=last or LLMResponse(content="No LLM provider available", finish_reason="error"))
@@ -0,0 +1,93 @@
+"""Append-only ledger of LLM calls (tokens, latency, outcome) for usage reporting."""
+
+from __future__ import annotations
+
+import json
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from loguru import logger
+
+# Session key the current task is working for; set by AgentLoop around each turn
+current_session: ContextVar[str | None] = ContextVar("nanobot_usage_session", default=None)
+
+GROUP_BY = ("day", "session", "model", "workload")
+
+
+class UsageLedger:
+    """
+    One compact JSON line per provider call, appended to ``path``.
+
+    Records: ``ts`` (unix seconds), ``session``, ``workload``, ``model``,
+    ``provider``, ``in`` / ``out`` / ``cached`` tokens, ``ms`` latency and
+    ``finish`` reason. Lines are short single writes, so concurrent
+    appends from one process never interleave.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def record(
+        self,
+        *,
+        workload: str,
+        model: str,
+        provider: str,
+        usage: dict[str, int],
+        latency_s: float,
+        finish_reason: str,
+    ) -> None:
+        entry = {
+            "ts": round(time.time(), 3),
+            "session": current_session.get(),
+            "workload": workload,
+            "model": model,
+            "provider": provider,
+            "in": usage.get("prompt_tokens", 0),
+            "out": usage.get("completion_tokens", 0),
+            "cached": usage.get("cache_read_input_tokens", 0),
+            "ms": round(latency_s * 1000),
+            "finish": finish_reason,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        except OSError as e:
+            logger.warning("Failed to write usage ledger: {}", e)
+
+    def entries(self, since: float = 0.0) -> Iterator[dict[str, Any]]:
+        """Yield records with ``ts >= since``, skipping torn or corrupt lines."""
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("ts", 0) >= since:
+                    yield entry
+
+
+def aggregate(entries: Iterator[dict[str, Any]], by: str = "day") -> list[dict[str, Any]]:
+    """Sum calls, tokens, errors and latency per group (``GROUP_BY``), sorted by group key."""
+    if by not in GROUP_BY:
+        raise ValueError(f"Cannot group usage by {by!r}; expected one of {', '.join(GROUP_BY)}")
+    groups: dict[str, dict[str, Any]] = {}
+    for e in entries:
+        if by == "day":
+            key = datetime.fromtimestamp(e.get("ts", 0)).strftime("%Y-%m-%d")
+        else:
+            key = e.get(by) or "-"
+        g = groups.setdefault(key, {"key": key, "calls": 0, "errors": 0, "in": 0, "out": 0, "cached": 0, "ms": 0})
+        g["calls"] += 1
+        g["errors"] += e.get("finish") == "error"
+        for field in ("in", "out", "cached", "ms"):
+            g[field] += e.get(field, 0)
+    for g in groups.values():
+        g["avg_ms"] = g["ms"] // g["calls"]
+    return [groups[k] for k in sorted(groups)]
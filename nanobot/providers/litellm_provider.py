@@ -1,19 +1,27 @@
 """LiteLLM provider implementation for multi-provider support."""
 
+import asyncio
 import json
 import json_repair
 import os
-from typing import Any
+from typing import Any, AsyncIterator
 
 import litellm
 from litellm import acompletion
+from loguru import logger
 
-from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+from nanobot.providers.base import LLMProvider, LLMResponse, LLMStreamChunk, ToolCallRequest, parse_usage
+from nanobot.providers.ratelimit import RETRYABLE_STATUS, RateLimiter, get_limiter
 from nanobot.providers.registry import find_by_model, find_gateway
+from nanobot.providers.streaming import OpenAIStreamAssembler
+from nanobot.providers.tokens import get_estimator
 
 
 # Standard OpenAI chat-completion message keys; extras (e.g. reasoning_content) are stripped for strict providers.
 _ALLOWED_MSG_KEYS = frozenset({"role", "content", "tool_calls", "tool_call_id", "name"})
+# Anthropic accepts at most four cache_control breakpoints per request
+_MAX_CACHE_BREAKPOINTS = 4
+_EPHEMERAL = {"type": "ephemeral"}
 
 
 class LiteLLMProvider(LLMProvider):
@@ -32,10 +40,19 @@ class LiteLLMProvider(LLMProvider):
         default_model: str = "anthropic/claude-opus-4-5",
         extra_headers: dict[str, str] | None = None,
         provider_name: str | None = None,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 16,
+        max_retries: int = 3,
     ):
         super().__init__(api_key, api_base)
         self.default_model = default_model
         self.extra_headers = extra_headers or {}
+        self.provider_name = provider_name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
         
         # Detect gateway / local deployment.
         # provider_name (from config key) is the primary signal;
@@ -46,9 +63,6 @@ class LiteLLMProvider(LLMProvider):
         if api_key:
             self._setup_env(api_key, api_base, default_model)
         
-        if api_base:
-            litellm.api_base = api_base
-        
         # Disable LiteLLM logging noise
         litellm.suppress_debug_info = True
         # Drop unsupported parameters for providers (e.g., gpt-5 rejects some params)
@@ -120,25 +134,32 @@ class LiteLLMProvider(LLMProvider):
         messages: list[dict[str, Any]],
         tools: list[dict[str, Any]] | None,
     ) -> tuple[list[dict[str, Any]], list[dict[str, Any]] | None]:
-        """Return copies of messages and tools with cache_control injected."""
-        new_messages = []
-        for msg in messages:
-            if msg.get("role") == "system":
-                content = msg["content"]
-                if isinstance(content, str):
-                    new_content = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
-                else:
-                    new_content = list(content)
-                    new_content[-1] = {**new_content[-1], "cache_control": {"type": "ephemeral"}}
-                new_messages.append({**msg, "content": new_content})
-            else:
-                new_messages.append(msg)
+        """Return copies of messages and tools with cache_control breakpoints injected.
 
+        Breakpoints go on the last tool, the first system message (the stable
+        prompt; per-call details ride in the current user message), the last user
+        message (history + current request, stable for the whole agent loop) and the
+        newest message. The tail breakpoint rolls forward as tool results are
+        appended, so each iteration reads the prefix the previous one wrote.
+        At most ``_MAX_CACHE_BREAKPOINTS`` are placed.
+        """
+        budget = _MAX_CACHE_BREAKPOINTS
         new_tools = tools
         if tools:
             new_tools = list(tools)
-            new_tools[-1] = {**new_tools[-1], "cache_control": {"type": "ephemeral"}}
+            new_tools[-1] = {**new_tools[-1], "cache_control": _EPHEMERAL}
+            budget -= 1
 
+        targets: list[int] = [i for i, m in enumerate(messages) if m.get("role") == "system"][:1]
+        last_user = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].get("role") == "user"), None)
+        tail = next((i for i in range(len(messages) - 1, -1, -1) if _has_content(messages[i])), None)
+        for i in (tail, last_user):
+            if i is not None and i not in targets:
+                targets.append(i)
+
+        new_messages = list(messages)
+        for i in targets[:max(0, budget)]:
+            new_messages[i] = _with_cache_control(messages[i])
         return new_messages, new_tools
 
     def _apply_model_overrides(self, model: str, kwargs: dict[str, Any]) -> None:
@@ -163,27 +184,15 @@ class LiteLLMProvider(LLMProvider):
             sanitized.append(clean)
         return sanitized
 
-    async def chat(
+    def _build_kwargs(
         self,
         messages: list[dict[str, Any]],
-        tools: list[dict[str, Any]] | None = None,
-        model: str | None = None,
-        max_tokens: int = 4096,
-        temperature: float = 0.7,
-    ) -> LLMResponse:
-        """
-        Send a chat completion request via LiteLLM.
-        
-        Args:
-            messages: List of message dicts with 'role' and 'content'.
-            tools: Optional list of tool definitions in OpenAI format.
-            model: Model identifier (e.g., 'anthropic/claude-sonnet-4-5').
-            max_tokens: Maximum tokens in response.
-            temperature: Sampling temperature.
-        
-        Returns:
-            LLMResponse with content and/or tool calls.
-        """
+        tools: list[dict[str, Any]] | None,
+        model: str | None,
+        max_tokens: int,
+        temperature: float,
+    ) -> dict[str, Any]:
+        """Build acompletion() keyword arguments shared by chat and chat_stream."""
         original_model = model or self.default_model
         model = self._resolve_model(original_model)
 
@@ -219,16 +228,129 @@ class LiteLLMProvider(LLMProvider):
         if tools:
             kwargs["tools"] = tools
             kwargs["tool_choice"] = "auto"
+        return kwargs
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> LLMResponse:
+        """
+        Send a chat completion request via LiteLLM.
+        
+        Args:
+            messages: List of message dicts with 'role' and 'content'.
+            tools: Optional list of tool definitions in OpenAI format.
+            model: Model identifier (e.g., 'anthropic/claude-sonnet-4-5').
+            max_tokens: Maximum tokens in response.
+            temperature: Sampling temperature.
         
+        Returns:
+            LLMResponse with content and/or tool calls.
+        """
+        kwargs = self._build_kwargs(messages, tools, model, max_tokens, temperature)
+        limiter = self._limiter(kwargs["model"])
+        est = get_estimator(kwargs["model"]).count_messages(messages)
+        attempt = 0
+        while True:
+            await limiter.acquire(est)
+            try:
+                response = await acompletion(**kwargs)
+            except Exception as e:
+                delay = self._failed(limiter, e, attempt)
+                if delay is None:
+                    # Return error as content for graceful handling
+                    return LLMResponse(
+                        content=f"Error calling LLM: {str(e)}",
+                        finish_reason="error",
+                    )
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                limiter.release()  # Cancelled: free the slot without counting an outcome
+                raise
+            parsed = self._parse_response(response)
+            limiter.succeeded(est, parsed.usage.get("total_tokens", 0), _response_headers(response))
+            return parsed
+
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        """Stream a chat completion via LiteLLM (text deltas, then assembled tool calls)."""
+        kwargs = self._build_kwargs(messages, tools, model, max_tokens, temperature)
+        kwargs["stream"] = True
+        kwargs["stream_options"] = {"include_usage": True}
+        limiter = self._limiter(kwargs["model"])
+        est = get_estimator(kwargs["model"]).count_messages(messages)
+        assembler = OpenAIStreamAssembler()
+        # Throttling surfaces when the request is opened, so only that step is retried
+        attempt = 0
+        while True:
+            await limiter.acquire(est)
+            try:
+                stream = await acompletion(**kwargs)
+                break
+            except Exception as e:
+                delay = self._failed(limiter, e, attempt)
+                if delay is None:
+                    yield LLMStreamChunk(response=LLMResponse(
+                        content=f"Error calling LLM: {str(e)}",
+                        finish_reason="error",
+                    ))
+                    return
+                await asyncio.sleep(delay)
+                attempt += 1
+            except BaseException:
+                limiter.release()
+                raise
+        # The slot must also be freed if the consumer is cancelled or stops iterating early
+        settled = False
         try:
-            response = await acompletion(**kwargs)
-            return self._parse_response(response)
-        except Exception as e:
-            # Return error as content for graceful handling
-            return LLMResponse(
-                content=f"Error calling LLM: {str(e)}",
-                finish_reason="error",
-            )
+            try:
+                async for chunk in stream:
+                    for event in assembler.feed(chunk):
+                        yield event
+            except Exception as e:
+                settled = True
+                limiter.failed(getattr(e, "status_code", None), 0)
+                yield LLMStreamChunk(response=LLMResponse(
+                    content=f"Error calling LLM: {str(e)}",
+                    finish_reason="error",
+                ))
+                return
+            events = assembler.finish()
+            settled = True
+            limiter.succeeded(est, events[-1].response.usage.get("total_tokens", 0), _response_headers(stream))
+        finally:
+            if not settled:
+                limiter.release()
+        for event in events:
+            yield event
+
+    def _limiter(self, model: str) -> RateLimiter:
+        return get_limiter(
+            self.provider_name or "litellm", model,
+            rpm=self.rpm, tpm=self.tpm, max_concurrency=self.max_concurrency,
+        )
+
+    def _failed(self, limiter: RateLimiter, e: Exception, attempt: int) -> float | None:
+        """Release the limiter slot for a failed call; returns the retry delay, or None to give up."""
+        status = getattr(e, "status_code", None)
+        retryable = status in RETRYABLE_STATUS or isinstance(e, (litellm.Timeout, litellm.APIConnectionError))
+        delay = limiter.failed(status, attempt, _error_headers(e))
+        if not retryable or attempt >= self.max_retries:
+            return None
+        logger.warning("LLM call failed ({}), retry {}/{} in {:.1f}s", e, attempt + 1, self.max_retries, delay)
+        return delay
     
     def _parse_response(self, response: Any) -> LLMResponse:
         """Parse LiteLLM response into our standard format."""
@@ -249,13 +371,7 @@ class LiteLLMProvider(LLMProvider):
                     arguments=args,
                 ))
         
-        usage = {}
-        if hasattr(response, "usage") and response.usage:
-            usage = {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens,
-            }
+        usage = parse_usage(getattr(response, "usage", None))
         
         reasoning_content = getattr(message, "reasoning_content", None) or None
         
@@ -270,3 +386,33 @@ class LiteLLMProvider(LLMProvider):
     def get_default_model(self) -> str:
         """Get the default model."""
         return self.default_model
+
+
+def _has_content(msg: dict[str, Any]) -> bool:
+    return bool(msg.get("content"))
+
+
+def _with_cache_control(msg: dict[str, Any]) -> dict[str, Any]:
+    """Copy of a message with cache_control on its last content block."""
+    content = msg["content"]
+    if isinstance(content, str):
+        return {**msg, "content": [{"type": "text", "text": content, "cache_control": _EPHEMERAL}]}
+    blocks = list(content)
+    blocks[-1] = {**blocks[-1], "cache_control": _EPHEMERAL}
+    return {**msg, "content": blocks}
+
+
+def _response_headers(response: Any) -> dict[str, Any]:
+    """Provider response headers LiteLLM attaches to a response (prefixed with llm_provider-)."""
+    hidden = getattr(response, "_hidden_params", None)
+    return (hidden.get("additional_headers") or {}) if isinstance(hidden, dict) else {}
+
+
+def _error_headers(e: Exception) -> dict[str, Any]:
+    headers = getattr(e, "litellm_response_headers", None)
+    if headers is None:
+        headers = getattr(getattr(e, "response", None), "headers", None)
+    try:
+        return dict(headers or {})
+    except (TypeError, ValueError):
+        return {}
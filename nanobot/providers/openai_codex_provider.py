@@ -5,16 +5,22 @@ from __future__ import annotations
 import asyncio
 import hashlib
 import json
-from typing import Any, AsyncGenerator
+import time
+from typing import Any, AsyncGenerator, AsyncIterator
 
 import httpx
 from loguru import logger
 
-from oauth_cli_kit import get_token as get_codex_token
-from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+from oauth_cli_kit import OAuthToken, get_token as get_codex_token
+from nanobot.providers.base import LLMProvider, LLMResponse, LLMStreamChunk, ToolCallRequest
+from nanobot.utils.http import http_clients
 
 DEFAULT_CODEX_URL = "https://chatgpt.com/backend-api/codex/responses"
 DEFAULT_ORIGINATOR = "nanobot"
+# Refresh the OAuth token this long before it expires
+TOKEN_REFRESH_MARGIN_S = 120
+# Asking for more remaining lifetime than any token has makes get_token() refresh unconditionally
+_FORCE_REFRESH_TTL_S = 10 * 365 * 24 * 3600
 
 
 class OpenAICodexProvider(LLMProvider):
@@ -23,20 +29,45 @@ class OpenAICodexProvider(LLMProvider):
     def __init__(self, default_model: str = "openai-codex/gpt-5.1-codex"):
         super().__init__(api_key=None, api_base=None)
         self.default_model = default_model
-
-    async def chat(
+        self._token: OAuthToken | None = None
+        self._headers: dict[str, str] = {}
+        self._refresh: asyncio.Task[OAuthToken] | None = None
+
+    async def _get_headers(self, rejected: str | None = None) -> dict[str, str]:
+        """Request headers with a valid access token, cached until shortly before expiry.
+
+        ``rejected`` is an access token the server refused; if it is still the
+        current one, a new token is fetched even though it has not expired.
+        Concurrent callers share a single in-flight refresh.
+        """
+        token = self._token
+        force = token is not None and token.access == rejected
+        if token and not force and token.expires - time.time() * 1000 > TOKEN_REFRESH_MARGIN_S * 1000:
+            return self._headers
+        if self._refresh is None:
+            min_ttl = _FORCE_REFRESH_TTL_S if force else TOKEN_REFRESH_MARGIN_S
+            self._refresh = asyncio.create_task(asyncio.to_thread(get_codex_token, min_ttl_seconds=min_ttl))
+        refresh = self._refresh
+        try:
+            token = await asyncio.shield(refresh)
+        finally:
+            if self._refresh is refresh and refresh.done():
+                self._refresh = None
+        if token is not self._token:
+            self._token = token
+            self._headers = _build_headers(token.account_id, token.access)
+        return self._headers
+
+    async def _prepare(
         self,
         messages: list[dict[str, Any]],
-        tools: list[dict[str, Any]] | None = None,
-        model: str | None = None,
-        max_tokens: int = 4096,
-        temperature: float = 0.7,
-    ) -> LLMResponse:
+        tools: list[dict[str, Any]] | None,
+        model: str | None,
+    ) -> tuple[dict[str, str], dict[str, Any]]:
+        """Return request headers and body for a Responses API call."""
         model = model or self.default_model
         system_prompt, input_items = _convert_messages(messages)
-
-        token = await asyncio.to_thread(get_codex_token)
-        headers = _build_headers(token.account_id, token.access)
+        headers = await self._get_headers()
 
         body: dict[str, Any] = {
             "model": _strip_model_prefix(model),
@@ -53,27 +84,59 @@ class OpenAICodexProvider(LLMProvider):
 
         if tools:
             body["tools"] = _convert_tools(tools)
+        return headers, body
 
-        url = DEFAULT_CODEX_URL
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> LLMResponse:
+        response = LLMResponse(content=None)
+        async for chunk in self.chat_stream(messages, tools, model, max_tokens, temperature):
+            if chunk.response is not None:
+                response = chunk.response
+        return response
 
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        url = DEFAULT_CODEX_URL
         try:
+            headers, body = await self._prepare(messages, tools, model)
             try:
-                content, tool_calls, finish_reason = await _request_codex(url, headers, body, verify=True)
+                async for chunk in _stream_codex(url, headers, body, verify=True):
+                    yield chunk
+            except _CodexHTTPError as e:
+                # Nothing has been yielded yet: the status arrives before the first event
+                if e.status_code != 401:
+                    raise
+                rejected = headers["Authorization"].removeprefix("Bearer ")
+                headers = await self._get_headers(rejected=rejected)
+                if headers["Authorization"] == f"Bearer {rejected}":
+                    raise  # The refresh did not produce a new token; retrying would fail the same way
+                logger.info("Codex access token rejected; retrying with a refreshed token")
+                async for chunk in _stream_codex(url, headers, body, verify=True):
+                    yield chunk
             except Exception as e:
+                # Nothing has been yielded yet: TLS setup fails before the first event.
                 if "CERTIFICATE_VERIFY_FAILED" not in str(e):
                     raise
                 logger.warning("SSL certificate verification failed for Codex API; retrying with verify=False")
-                content, tool_calls, finish_reason = await _request_codex(url, headers, body, verify=False)
-            return LLMResponse(
-                content=content,
-                tool_calls=tool_calls,
-                finish_reason=finish_reason,
-            )
+                async for chunk in _stream_codex(url, headers, body, verify=False):
+                    yield chunk
         except Exception as e:
-            return LLMResponse(
+            yield LLMStreamChunk(response=LLMResponse(
                 content=f"Error calling Codex: {str(e)}",
                 finish_reason="error",
-            )
+            ))
 
     def get_default_model(self) -> str:
         return self.default_model
@@ -85,6 +148,12 @@ def _strip_model_prefix(model: str) -> str:
     return model
 
 
+class _CodexHTTPError(RuntimeError):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
 def _build_headers(account_id: str, token: str) -> dict[str, str]:
     return {
         "Authorization": f"Bearer {token}",
@@ -97,18 +166,19 @@ def _build_headers(account_id: str, token: str) -> dict[str, str]:
     }
 
 
-async def _request_codex(
+async def _stream_codex(
     url: str,
     headers: dict[str, str],
     body: dict[str, Any],
     verify: bool,
-) -> tuple[str, list[ToolCallRequest], str]:
-    async with httpx.AsyncClient(timeout=60.0, verify=verify) as client:
-        async with client.stream("POST", url, headers=headers, json=body) as response:
-            if response.status_code != 200:
-                text = await response.aread()
-                raise RuntimeError(_friendly_error(response.status_code, text.decode("utf-8", "ignore")))
-            return await _consume_sse(response)
+) -> AsyncGenerator[LLMStreamChunk, None]:
+    client = http_clients.get("codex", verify=verify, timeout=60.0)
+    async with client.stream("POST", url, headers=headers, json=body) as response:
+        if response.status_code != 200:
+            text = await response.aread()
+            raise _CodexHTTPError(response.status_code, _friendly_error(response.status_code, text.decode("utf-8", "ignore")))
+        async for chunk in _iter_codex_chunks(response):
+            yield chunk
 
 
 def _convert_tools(tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -138,7 +208,8 @@ def _convert_messages(messages: list[dict[str, Any]]) -> tuple[str, list[dict[st
         content = msg.get("content")
 
         if role == "system":
-            system_prompt = content if isinstance(content, str) else ""
+            if isinstance(content, str) and content:
+                system_prompt = f"{system_prompt}\n\n{content}" if system_prompt else content
             continue
 
         if role == "user":
@@ -242,11 +313,12 @@ async def _iter_sse(response: httpx.Response) -> AsyncGenerator[dict[str, Any],
         buffer.append(line)
 
 
-async def _consume_sse(response: httpx.Response) -> tuple[str, list[ToolCallRequest], str]:
+async def _iter_codex_chunks(response: httpx.Response) -> AsyncGenerator[LLMStreamChunk, None]:
     content = ""
     tool_calls: list[ToolCallRequest] = []
     tool_call_buffers: dict[str, dict[str, Any]] = {}
     finish_reason = "stop"
+    usage: dict[str, int] = {}
 
     async for event in _iter_sse(response):
         event_type = event.get("type")
@@ -262,7 +334,10 @@ async def _consume_sse(response: httpx.Response) -> tuple[str, list[ToolCallRequ
                     "arguments": item.get("arguments") or "",
                 }
         elif event_type == "response.output_text.delta":
-            content += event.get("delta") or ""
+            delta = event.get("delta") or ""
+            content += delta
+            if delta:
+                yield LLMStreamChunk(content=delta)
         elif event_type == "response.function_call_arguments.delta":
             call_id = event.get("call_id")
             if call_id and call_id in tool_call_buffers:
@@ -283,20 +358,41 @@ async def _consume_sse(response: httpx.Response) -> tuple[str, list[ToolCallRequ
                     args = json.loads(args_raw)
                 except Exception:
                     args = {"raw": args_raw}
-                tool_calls.append(
-                    ToolCallRequest(
-                        id=f"{call_id}|{buf.get('id') or item.get('id') or 'fc_0'}",
-                        name=buf.get("name") or item.get("name"),
-                        arguments=args,
-                    )
+                tool_call = ToolCallRequest(
+                    id=f"{call_id}|{buf.get('id') or item.get('id') or 'fc_0'}",
+                    name=buf.get("name") or item.get("name"),
+                    arguments=args,
                 )
+                tool_calls.append(tool_call)
+                yield LLMStreamChunk(tool_call=tool_call)
         elif event_type == "response.completed":
-            status = (event.get("response") or {}).get("status")
-            finish_reason = _map_finish_reason(status)
+            resp = event.get("response") or {}
+            finish_reason = _map_finish_reason(resp.get("status"))
+            usage = _parse_usage(resp.get("usage"))
         elif event_type in {"error", "response.failed"}:
             raise RuntimeError("Codex response failed")
 
-    return content, tool_calls, finish_reason
+    yield LLMStreamChunk(response=LLMResponse(
+        content=content,
+        tool_calls=tool_calls,
+        finish_reason=finish_reason,
+        usage=usage,
+    ))
+
+
+def _parse_usage(raw: Any) -> dict[str, int]:
+    if not isinstance(raw, dict):
+        return {}
+    prompt = raw.get("input_tokens") or 0
+    completion = raw.get("output_tokens") or 0
+    usage = {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": raw.get("total_tokens") or prompt + completion,
+    }
+    if cached := (raw.get("input_tokens_details") or {}).get("cached_tokens"):
+        usage["cache_read_input_tokens"] = cached
+    return usage
 
 
 _FINISH_REASON_MAP = {"completed": "stop", "incomplete": "length", "failed": "error", "cancelled": "error"}
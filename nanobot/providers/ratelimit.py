@@ -0,0 +1,215 @@
+"""Client-side rate limiting and adaptive concurrency for LLM providers."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping
+
+from loguru import logger
+
+# HTTP statuses worth retrying: timeouts, throttling, transient server errors, Anthropic "overloaded"
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+# Statuses that mean "slow down" (halve concurrency), as opposed to a one-off failure
+THROTTLE_STATUS = frozenset({429, 503, 529})
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class _Bucket:
+    """Token bucket refilled continuously at ``per_minute`` units per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (oversized requests wait for a full bucket)."""
+        self._refill(now)
+        need = min(amount, self.capacity)
+        return 0.0 if self.level >= need else (need - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= amount  # May go negative when usage exceeds the estimate
+
+    def clamp(self, remaining: float) -> None:
+        """Trust the server's view of remaining quota when it is lower than ours."""
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """
+    Limits one provider/model to a request and token rate, with AIMD concurrency.
+
+    The in-flight limit grows by ~1 per round of successful requests and halves
+    whenever the provider throttles us, so throughput converges on the quota
+    instead of bursting into 429 storms. Rate-limit headers from responses
+    tighten the local buckets and pause new requests until the reset time.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_concurrency: int = 16):
+        self.rpm = _Bucket(rpm) if rpm > 0 else None
+        self.tpm = _Bucket(tpm) if tpm > 0 else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(min(4, self.max_concurrency))
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    async def acquire(self, est_tokens: int = 0) -> None:
+        """Wait for a concurrency slot and for request/token quota."""
+        while self.in_flight >= int(self.limit):
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            finally:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+        self.in_flight += 1
+        try:
+            while True:
+                now = time.monotonic()
+                delay = max(
+                    self.blocked_until - now,
+                    self.rpm.wait_time(1, now) if self.rpm else 0.0,
+                    self.tpm.wait_time(est_tokens, now) if self.tpm else 0.0,
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.release()
+            raise
+        if self.rpm:
+            self.rpm.take(1)
+        if self.tpm:
+            self.tpm.take(est_tokens)
+
+    def succeeded(self, est_tokens: int = 0, used_tokens: int = 0, headers: Mapping[str, Any] | None = None) -> None:
+        """Release a slot after a successful call and grow the concurrency limit additively."""
+        if self.tpm and used_tokens:
+            self.tpm.take(used_tokens - est_tokens)
+        if headers:
+            self.observe_headers(headers)
+        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+        self.release()
+
+    def failed(self, status: int | None, attempt: int, headers: Mapping[str, Any] | None = None) -> float:
+        """Release a slot after a failed call; returns the delay before retrying."""
+        info = parse_rate_limit_headers(headers or {})
+        if headers:
+            self.observe_headers(headers)
+        delay = info.get("retry_after")
+        if delay is None:
+            delay = backoff_delay(attempt)
+        if status in THROTTLE_STATUS:
+            self.limit = max(1.0, self.limit / 2)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            logger.warning("LLM throttled (HTTP {}), concurrency limit now {}", status, int(self.limit))
+        self.release()
+        return delay
+
+    def observe_headers(self, headers: Mapping[str, Any]) -> None:
+        """Apply x-ratelimit-* / anthropic-ratelimit-* headers to local state."""
+        info = parse_rate_limit_headers(headers)
+        now = time.monotonic()
+        for kind, bucket in (("requests", self.rpm), ("tokens", self.tpm)):
+            remaining = info.get(f"remaining_{kind}")
+            if remaining is None:
+                continue
+            if bucket:
+                bucket.clamp(remaining)
+            reset = info.get(f"reset_{kind}")
+            if remaining <= 0 and reset:
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+    def release(self) -> None:
+        """Free a slot without an outcome (e.g. a cancelled or abandoned call)."""
+        self.in_flight -= 1
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_rate_limit_headers(headers: Mapping[str, Any]) -> dict[str, float]:
+    """
+    Extract remaining quota, reset times and retry-after (all in seconds) from
+    OpenAI-style, Anthropic-style or LiteLLM-prefixed (``llm_provider-``) headers.
+    """
+    h = {str(k).lower().removeprefix("llm_provider-"): str(v) for k, v in headers.items()}
+    out: dict[str, float] = {}
+
+    def _first(*names: str) -> str | None:
+        return next((h[n] for n in names if n in h), None)
+
+    for kind in ("requests", "tokens"):
+        remaining = _first(f"x-ratelimit-remaining-{kind}", f"anthropic-ratelimit-{kind}-remaining")
+        if remaining is not None:
+            try:
+                out[f"remaining_{kind}"] = float(remaining)
+            except ValueError:
+                pass
+        reset = _first(f"x-ratelimit-reset-{kind}", f"anthropic-ratelimit-{kind}-reset")
+        if reset is not None and (seconds := _parse_duration(reset)) is not None:
+            out[f"reset_{kind}"] = seconds
+
+    if (ms := h.get("retry-after-ms")) is not None:
+        try:
+            out["retry_after"] = float(ms) / 1000
+        except ValueError:
+            pass
+    elif (value := h.get("retry-after")) is not None and (seconds := _parse_duration(value)) is not None:
+        out["retry_after"] = seconds
+    return out
+
+
+def _parse_duration(value: str) -> float | None:
+    """Parse "12", "1.5", "6m0s", "20ms", an RFC 3339 timestamp or an HTTP date into seconds from now."""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    if parts := _DURATION_RE.findall(value):
+        if "".join(n + u for n, u in parts) == value:
+            return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    for parse in (lambda v: datetime.fromisoformat(v.replace("Z", "+00:00")), parsedate_to_datetime):
+        try:
+            when = parse(value)
+        except (ValueError, TypeError):
+            continue
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    return None
+
+
+_LIMITERS: dict[tuple[str, str], RateLimiter] = {}
+
+
+def get_limiter(provider: str, model: str, rpm: int = 0, tpm: int = 0, max_concurrency: int = 16) -> RateLimiter:
+    """Shared limiter per provider/model, so every caller draws on the same quota."""
+    key = (provider, model)
+    limiter = _LIMITERS.get(key)
+    if limiter is None:
+        limiter = _LIMITERS[key] = RateLimiter(rpm=rpm, tpm=tpm, max_concurrency=max_concurrency)
+    return limiter
@@ -0,0 +1,164 @@
+"""Per-workload model routing with latency and cost accounting."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+from loguru import logger
+
+from nanobot.providers.base import LLMProvider, LLMResponse, LLMStreamChunk
+from nanobot.providers.ledger import UsageLedger
+
+# Workload classes a call can be attributed to
+WORKLOADS = ("interactive", "consolidation", "heartbeat", "subagent", "cron")
+
+
+@dataclass
+class _WorkloadStats:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0  # USD, for models in LiteLLM's price map
+
+
+def _estimate_cost(model: str, usage: dict[str, int]) -> float:
+    """Best-effort USD cost from LiteLLM's model price map; 0 for unknown models."""
+    if not usage:
+        return 0.0
+    try:
+        from litellm import cost_per_token
+
+        prompt, completion = cost_per_token(
+            model=model,
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+        )
+        return prompt + completion
+    except Exception:
+        return 0.0
+
+
+class _MeteredProvider(LLMProvider):
+    """Forwards calls to a provider and records them against one workload."""
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        workload: str,
+        stats: _WorkloadStats,
+        ledger: UsageLedger | None = None,
+    ):
+        super().__init__(provider.api_key, provider.api_base)
+        self.provider = provider
+        self.workload = workload
+        self.stats = stats
+        self.ledger = ledger
+
+    def get_default_model(self) -> str:
+        return self.provider.get_default_model()
+
+    def _record(self, model: str | None, response: LLMResponse, start: float) -> None:
+        model = model or self.get_default_model()
+        elapsed = time.monotonic() - start
+        s = self.stats
+        s.calls += 1
+        s.errors += response.finish_reason == "error"
+        s.seconds += elapsed
+        s.prompt_tokens += response.usage.get("prompt_tokens", 0)
+        s.completion_tokens += response.usage.get("completion_tokens", 0)
+        s.cost += _estimate_cost(model, response.usage)
+        if self.ledger:
+            self.ledger.record(
+                workload=self.workload,
+                model=model,
+                provider=getattr(self.provider, "provider_name", None) or type(self.provider).__name__,
+                usage=response.usage,
+                latency_s=elapsed,
+                finish_reason=response.finish_reason,
+            )
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> LLMResponse:
+        start = time.monotonic()
+        response = await self.provider.chat(
+            messages=messages, tools=tools, model=model,
+            max_tokens=max_tokens, temperature=temperature,
+        )
+        self._record(model, response, start)
+        return response
+
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        start = time.monotonic()
+        async for chunk in self.provider.chat_stream(
+            messages=messages, tools=tools, model=model,
+            max_tokens=max_tokens, temperature=temperature,
+        ):
+            if chunk.response is not None:
+                self._record(model, chunk.response, start)
+            yield chunk
+
+
+class ModelRouter:
+    """
+    Maps workload classes (see ``WORKLOADS``) to a provider and model.
+
+    Workloads without a route use the caller's default provider and model.
+    Every resolved provider is metered, so ``stats()`` reports calls, latency,
+    tokens and estimated cost per workload class, and each call is appended
+    to ``ledger`` when one is given.
+    """
+
+    def __init__(
+        self,
+        routes: dict[str, tuple[LLMProvider, str]] | None = None,
+        ledger: UsageLedger | None = None,
+    ):
+        self.routes = dict(routes or {})
+        self.ledger = ledger
+        self._stats: dict[str, _WorkloadStats] = {}
+
+    def resolve(self, workload: str, provider: LLMProvider, model: str) -> tuple[LLMProvider, str]:
+        """Provider and model for a workload, falling back to the given defaults."""
+        provider, model = self.routes.get(workload, (provider, model))
+        stats = self._stats.setdefault(workload, _WorkloadStats())
+        return _MeteredProvider(provider, workload, stats, self.ledger), model
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per-workload call counts, mean latency, tokens and estimated cost."""
+        return {
+            workload: {
+                "calls": s.calls,
+                "errors": s.errors,
+                "avg_latency_s": round(s.seconds / s.calls, 2) if s.calls else 0.0,
+                "prompt_tokens": s.prompt_tokens,
+                "completion_tokens": s.completion_tokens,
+                "cost_usd": round(s.cost, 4),
+            }
+            for workload, s in self._stats.items()
+            if s.calls
+        }
+
+    def log_summary(self) -> None:
+        for workload, s in self.stats().items():
+            logger.info(
+                "LLM usage [{}]: {} calls, {}s avg, {} prompt + {} completion tokens, ${}",
+                workload, s["calls"], s["avg_latency_s"], s["prompt_tokens"],
+                s["completion_tokens"], s["cost_usd"],
+            )
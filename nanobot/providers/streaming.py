@@ -0,0 +1,92 @@
+"""Assembly of OpenAI-style streamed chat completion chunks."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import json_repair
+
+from nanobot.providers.base import LLMResponse, LLMStreamChunk, ToolCallRequest, parse_usage
+
+
+class OpenAIStreamAssembler:
+    """
+    Turn OpenAI-format stream chunks (LiteLLM, openai SDK) into LLMStreamChunks.
+
+    Text deltas are forwarded as they arrive. Tool-call fragments are buffered
+    per index and emitted once complete — when a later tool call starts or the
+    stream ends — so consumers never see half-parsed arguments.
+    """
+
+    def __init__(self) -> None:
+        self._content: list[str] = []
+        self._reasoning: list[str] = []
+        self._calls: dict[int, dict[str, str]] = {}
+        self._done: dict[int, ToolCallRequest] = {}
+        self._finish_reason = "stop"
+        self._usage: dict[str, int] = {}
+
+    def feed(self, chunk: Any) -> list[LLMStreamChunk]:
+        """Consume one raw chunk and return the stream events it completes."""
+        events: list[LLMStreamChunk] = []
+        if usage := parse_usage(getattr(chunk, "usage", None)):
+            self._usage = usage
+        if not getattr(chunk, "choices", None):
+            return events
+
+        choice = chunk.choices[0]
+        delta = choice.delta
+        if delta is not None:
+            if text := getattr(delta, "content", None):
+                self._content.append(text)
+                events.append(LLMStreamChunk(content=text))
+            if reasoning := getattr(delta, "reasoning_content", None):
+                self._reasoning.append(reasoning)
+            for tc in getattr(delta, "tool_calls", None) or []:
+                index = tc.index if getattr(tc, "index", None) is not None else len(self._calls)
+                if index not in self._calls:
+                    events.extend(self._complete(below=index))
+                    self._calls[index] = {"id": "", "name": "", "arguments": ""}
+                buf = self._calls[index]
+                if tc.id:
+                    buf["id"] = tc.id
+                if fn := getattr(tc, "function", None):
+                    if fn.name and not buf["name"]:
+                        buf["name"] = fn.name
+                    if fn.arguments:
+                        buf["arguments"] += fn.arguments
+        if choice.finish_reason:
+            self._finish_reason = choice.finish_reason
+        return events
+
+    def finish(self) -> list[LLMStreamChunk]:
+        """Flush remaining tool calls and return them followed by the final response."""
+        events = self._complete(below=None)
+        events.append(LLMStreamChunk(response=self.response()))
+        return events
+
+    def response(self) -> LLMResponse:
+        """The response assembled so far."""
+        return LLMResponse(
+            content="".join(self._content) or None,
+            tool_calls=[self._done[i] for i in sorted(self._done)],
+            finish_reason=self._finish_reason,
+            usage=self._usage,
+            reasoning_content="".join(self._reasoning) or None,
+        )
+
+    def _complete(self, below: int | None) -> list[LLMStreamChunk]:
+        events = []
+        for index in sorted(self._calls):
+            if index in self._done or (below is not None and index >= below):
+                continue
+            buf = self._calls[index]
+            args = json_repair.loads(buf["arguments"]) if buf["arguments"] else {}
+            call = ToolCallRequest(
+                id=buf["id"] or f"call_{index}",
+                name=buf["name"],
+                arguments=args if isinstance(args, dict) else {},
+            )
+            self._done[index] = call
+            events.append(LLMStreamChunk(tool_call=call))
+        return events
@@ -0,0 +1,119 @@
+"""Local token estimation for prompt budgeting (no tokenizer downloads, no network)."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from nanobot.providers.registry import find_by_model
+
+# Fixed per-message cost for role markers and separators in chat templates
+_MESSAGE_OVERHEAD = 4
+# Rough cost of one image part (providers bill images by tiles, not bytes)
+_IMAGE_TOKENS = 1000
+
+
+def _is_cjk(ch: str) -> bool:
+    code = ord(ch)
+    return (
+        0x3040 <= code <= 0x30FF      # Hiragana, Katakana
+        or 0x3400 <= code <= 0x4DBF   # CJK Extension A
+        or 0x4E00 <= code <= 0x9FFF   # CJK Unified Ideographs
+        or 0xAC00 <= code <= 0xD7AF   # Hangul syllables
+        or 0xF900 <= code <= 0xFAFF   # CJK Compatibility Ideographs
+    )
+
+
+class TokenEstimator:
+    """
+    Heuristic token counter.
+
+    Latin text averages ~``chars_per_token`` characters per token; CJK
+    characters are roughly one token each. Estimates err slightly high so
+    budgets stay safe.
+    """
+
+    def __init__(self, chars_per_token: float = 4.0, cjk_tokens_per_char: float = 1.0):
+        self.chars_per_token = chars_per_token
+        self.cjk_tokens_per_char = cjk_tokens_per_char
+
+    def count_text(self, text: str) -> int:
+        """Estimate tokens in a string."""
+        if not text:
+            return 0
+        if text.isascii():
+            return int(len(text) / self.chars_per_token) + 1
+        cjk = sum(1 for ch in text if _is_cjk(ch))
+        return int((len(text) - cjk) / self.chars_per_token + cjk * self.cjk_tokens_per_char) + 1
+
+    def count_message(self, message: dict[str, Any]) -> int:
+        """Estimate tokens in one chat message, including tool calls and image parts."""
+        total = _MESSAGE_OVERHEAD
+        content = message.get("content")
+        if isinstance(content, str):
+            total += self.count_text(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    total += self.count_text(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    total += _IMAGE_TOKENS
+        for call in message.get("tool_calls") or []:
+            fn = call.get("function", {})
+            total += self.count_text(fn.get("name", "")) + self.count_text(fn.get("arguments", ""))
+        return total
+
+    def count_messages(self, messages: list[dict[str, Any]]) -> int:
+        """Estimate tokens in a message list."""
+        return sum(self.count_message(m) for m in messages)
+
+    def count_tools(self, tools: list[dict[str, Any]] | None) -> int:
+        """Estimate tokens spent on tool definitions."""
+        return self.count_text(json.dumps(tools, ensure_ascii=False)) if tools else 0
+
+
+DEFAULT_ESTIMATOR = TokenEstimator()
+
+# Provider name (see providers/registry.py) -> estimator
+_ESTIMATORS: dict[str, TokenEstimator] = {
+    "anthropic": TokenEstimator(chars_per_token=3.5),
+    "gemini": TokenEstimator(chars_per_token=4.0, cjk_tokens_per_char=0.8),
+    "deepseek": TokenEstimator(chars_per_token=3.8, cjk_tokens_per_char=0.7),
+    "dashscope": TokenEstimator(chars_per_token=3.8, cjk_tokens_per_char=0.7),
+    "moonshot": TokenEstimator(chars_per_token=3.8, cjk_tokens_per_char=0.7),
+    "zhipu": TokenEstimator(chars_per_token=3.8, cjk_tokens_per_char=0.7),
+}
+
+
+def register_estimator(provider_name: str, estimator: TokenEstimator) -> None:
+    """Use a custom estimator for models of the given provider."""
+    _ESTIMATORS[provider_name] = estimator
+
+
+def get_estimator(model: str | None) -> TokenEstimator:
+    """Pick the estimator for a model, falling back to the generic heuristic."""
+    spec = find_by_model(model) if model else None
+    return _ESTIMATORS.get(spec.name, DEFAULT_ESTIMATOR) if spec else DEFAULT_ESTIMATOR
+
+
+def fit_to_budget(
+    messages: list[dict[str, Any]],
+    max_tokens: int,
+    estimator: TokenEstimator = DEFAULT_ESTIMATOR,
+) -> list[dict[str, Any]]:
+    """
+    Keep the most recent messages that fit in ``max_tokens``.
+
+    When older messages are cut, the result starts at a user message so no
+    orphaned tool results or assistant replies lead the history.
+    """
+    used = 0
+    for i in range(len(messages) - 1, -1, -1):
+        used += estimator.count_message(messages[i])
+        if used > max_tokens:
+            kept = messages[i + 1:]
+            for j, m in enumerate(kept):
+                if m.get("role") == "user":
+                    return kept[j:]
+            return []
+    return messages
@@ -1,15 +1,24 @@
 """Session management for conversation history."""
 
+import asyncio
 import json
+import os
 import shutil
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable, Iterator
 
 from loguru import logger
 
 from nanobot.utils.helpers import ensure_dir, safe_filename
+from nanobot.utils.journal import Journal
+
+if TYPE_CHECKING:
+    from nanobot.providers.tokens import TokenEstimator
 
 
 @dataclass
@@ -22,15 +31,76 @@ class Session:
     Important: Messages are append-only for LLM cache efficiency.
     The consolidation process writes summaries to MEMORY.md/HISTORY.md
     but does NOT modify the messages list or get_history() output.
+    SessionManager.save() relies on this and only appends the new tail;
+    call clear() (or SessionManager.compact()) after any other rewrite.
+
+    Sessions loaded from disk may hold only the unconsolidated tail in memory;
+    the consolidated head is read back the first time ``messages`` is accessed.
+    Hot paths use ``message_count``, ``messages_since()`` and ``append()``,
+    which never touch the head.
     """
 
     key: str  # channel:chat_id
-    messages: list[dict[str, Any]] = field(default_factory=list)
+    # Storage behind the ``messages`` property: _tail holds messages from index _head_count on
+    _tail: list[dict[str, Any]] = field(default_factory=list, init=False, repr=False, compare=False)
+    _head_count: int = field(default=0, init=False, repr=False, compare=False)
+    _head_source: tuple[Path, int] | None = field(default=None, init=False, repr=False, compare=False)
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     metadata: dict[str, Any] = field(default_factory=dict)
     last_consolidated: int = 0  # Number of messages already consolidated to files
-    
+    _persisted: int = field(default=0, init=False, repr=False)  # Messages already on disk
+    _persisted_consolidated: int = field(default=0, init=False, repr=False)  # last_consolidated on disk
+    _bytes: int = field(default=0, init=False, repr=False)  # Approximate in-memory size
+    _stale_records: int = field(default=0, init=False, repr=False)  # Superseded metadata trailers
+    _rewrite: bool = field(default=False, init=False, repr=False)  # Force a full rewrite on next save
+    # Byte offsets of persisted messages from index _offsets_start on, and the
+    # (index, offset) checkpoint written to the trailer for tail-only loading
+    _offsets_start: int = field(default=0, init=False, repr=False)
+    _offsets: list[int] = field(default_factory=list, init=False, repr=False)
+    _checkpoint: tuple[int, int] | None = field(default=None, init=False, repr=False)
+
+    @property
+    def messages(self) -> list[dict[str, Any]]:
+        """All messages, paging in the consolidated head if it was skipped at load time."""
+        if self._head_count:
+            self._load_head()
+        return self._tail
+
+    @messages.setter
+    def messages(self, messages: list[dict[str, Any]]) -> None:
+        self._tail = messages
+        self._head_count = 0
+        self._head_source = None
+
+    def _load_head(self) -> None:
+        """Page in the consolidated messages that were skipped at load time."""
+        head: list[dict[str, Any]] = []
+        if self._head_source:
+            for raw in _iter_message_lines(*self._head_source):
+                head.append(json.loads(raw))
+                self._bytes += len(raw)
+        if len(head) != self._head_count:
+            logger.warning("Session {}: expected {} older messages, read {}", self.key, self._head_count, len(head))
+        self._tail = head + self._tail
+        self._head_count = 0
+        self._head_source = None
+
+    @property
+    def message_count(self) -> int:
+        """Total number of messages, without loading the consolidated head."""
+        return self._head_count + len(self._tail)
+
+    def messages_since(self, start: int) -> list[dict[str, Any]]:
+        """Messages from index ``start`` on (same semantics as ``messages[start:]``)."""
+        if start >= self._head_count:
+            return self._tail[start - self._head_count:]
+        return self.messages[start:]
+
+    def append(self, message: dict[str, Any]) -> None:
+        """Append a prepared message entry."""
+        self._tail.append(message)
+
     def add_message(self, role: str, content: str, **kwargs: Any) -> None:
         """Add a message to the session."""
         msg = {
@@ -39,13 +109,28 @@ class Session:
             "timestamp": datetime.now().isoformat(),
             **kwargs
         }
-        self.messages.append(msg)
+        self._tail.append(msg)
         self.updated_at = datetime.now()
     
-    def get_history(self, max_messages: int = 500) -> list[dict[str, Any]]:
-        """Return unconsolidated messages for LLM input, aligned to a user turn."""
-        unconsolidated = self.messages[self.last_consolidated:]
+    def get_history(
+        self,
+        max_messages: int = 500,
+        max_tokens: int | None = None,
+        estimator: "TokenEstimator | None" = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Return unconsolidated messages for LLM input, aligned to a user turn.
+
+        Args:
+            max_messages: Cap on the number of messages.
+            max_tokens: Optional token budget; the oldest turns are dropped to fit.
+            estimator: Token estimator for the budget (defaults to the generic heuristic).
+        """
+        unconsolidated = self.messages_since(self.last_consolidated)
         sliced = unconsolidated[-max_messages:]
+        if max_tokens is not None:
+            from nanobot.providers.tokens import DEFAULT_ESTIMATOR, fit_to_budget
+            sliced = fit_to_budget(sliced, max_tokens, estimator or DEFAULT_ESTIMATOR)
 
         # Drop leading non-user messages to avoid orphaned tool_result blocks
         for i, m in enumerate(sliced):
@@ -67,20 +152,56 @@ class Session:
         self.messages = []
         self.last_consolidated = 0
         self.updated_at = datetime.now()
+        self._rewrite = True
+
+    @property
+    def dirty(self) -> bool:
+        """True when the session has changes that have not been saved."""
+        return (
+            self._rewrite
+            or self.message_count != self._persisted
+            or self.last_consolidated != self._persisted_consolidated
+        )
 
 
 class SessionManager:
     """
     Manages conversation sessions.
 
-    Sessions are stored as JSONL files in the sessions directory.
+    Sessions are stored as JSONL files in the sessions directory. Each save
+    appends the new messages followed by a metadata record; the last metadata
+    record in a file wins. Files are compacted (rewritten with no superseded
+    metadata records) once enough of them accumulate.
+
+    Each trailer also records the byte offset of the first unconsolidated
+    message, so loading seeks straight to the tail instead of parsing months
+    of already-consolidated history.
+
+    Writes go through the sessions directory's ``Journal``, so a crash
+    mid-write is repaired on the next start.
+
+    Loaded sessions are kept in an LRU cache bounded by entry count and
+    approximate size. Sessions with unsaved changes or that are pinned
+    (in use by a turn or a consolidation) are never evicted.
     """
 
-    def __init__(self, workspace: Path):
+    def __init__(
+        self,
+        workspace: Path,
+        compact_after: int = 100,
+        max_cached: int = 256,
+        max_cache_bytes: int = 64 * 1024 * 1024,
+    ):
         self.workspace = workspace
+        self.compact_after = compact_after
+        self.max_cached = max_cached
+        self.max_cache_bytes = max_cache_bytes
         self.sessions_dir = ensure_dir(self.workspace / "sessions")
+        self.journal = Journal.for_dir(self.sessions_dir)  # Replayed here, before any session loads
         self.legacy_sessions_dir = Path.home() / ".nanobot" / "sessions"
-        self._cache: dict[str, Session] = {}
+        self._cache: OrderedDict[str, Session] = OrderedDict()
+        self._pins: dict[str, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
     
     def _get_session_path(self, key: str) -> Path:
         """Get the file path for a session."""
@@ -103,14 +224,66 @@ class SessionManager:
             The session.
         """
         if key in self._cache:
+            self._stats["hits"] += 1
+            self._cache.move_to_end(key)
             return self._cache[key]
         
+        self._stats["misses"] += 1
         session = self._load(key)
         if session is None:
             session = Session(key=key)
         
-        self._cache[key] = session
+        self._remember(session)
         return session
+
+    def pin(self, key: str) -> None:
+        """Keep a session cached until the matching unpin()."""
+        self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: str) -> None:
+        """Release a pin taken with pin()."""
+        count = self._pins.get(key, 0) - 1
+        if count > 0:
+            self._pins[key] = count
+        else:
+            self._pins.pop(key, None)
+            self._evict()
+
+    @contextmanager
+    def pinned(self, key: str) -> Iterator[None]:
+        """Context manager form of pin()/unpin()."""
+        self.pin(key)
+        try:
+            yield
+        finally:
+            self.unpin(key)
+
+    def cache_stats(self) -> dict[str, int]:
+        """Cache counters (hits, misses, evictions) and current size."""
+        return {
+            **self._stats,
+            "entries": len(self._cache),
+            "bytes": sum(s._bytes for s in self._cache.values()),
+            "pinned": len(self._pins),
+        }
+
+    def _remember(self, session: Session) -> None:
+        self._cache[session.key] = session
+        self._cache.move_to_end(session.key)
+        self._evict(keep=session.key)
+
+    def _evict(self, keep: str | None = None) -> None:
+        """Drop least-recently-used sessions until within the count and byte budgets."""
+        total = sum(s._bytes for s in self._cache.values())
+        for key in list(self._cache):
+            if len(self._cache) <= self.max_cached and total <= self.max_cache_bytes:
+                break
+            session = self._cache[key]
+            if key == keep or key in self._pins or session.dirty:
+                continue
+            del self._cache[key]
+            total -= session._bytes
+            self._stats["evictions"] += 1
     
     def _load(self, key: str) -> Session | None:
         """Load a session from disk."""
@@ -128,55 +301,233 @@ class SessionManager:
             return None
 
         try:
-            messages = []
-            metadata = {}
-            created_at = None
-            last_consolidated = 0
+            trailer = _read_last_line(path)
+            if trailer.get("_type") == "metadata" and "tail_offset" in trailer:
+                session = self._load_tail(key, path, trailer)
+                if session is not None:
+                    return session
+            return self._load_full(key, path)
+        except Exception as e:
+            logger.warning("Failed to load session {}: {}", key, e)
+            return None
+
+    def _load_tail(self, key: str, path: Path, trailer: dict[str, Any]) -> Session | None:
+        """Load only the messages after the trailer's checkpoint; None if the index looks wrong."""
+        index, offset = trailer.get("tail_index", 0), trailer["tail_offset"]
+        messages, offsets = [], []
+        size = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            pos = offset
+            for raw in f:
+                start = pos
+                pos += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    return None
+                if data.get("_type") == "metadata":
+                    continue
+                messages.append(data)
+                offsets.append(start)
+                size += len(raw)
+
+        session = self._new_session(key, trailer, messages)
+        session._head_count = index
+        session._head_source = (path, offset) if index else None
+        session._persisted = index + len(messages)
+        session._bytes = size
+        session._stale_records = trailer.get("stale_records", 0)
+        session._offsets_start = index
+        session._offsets = offsets
+        session._checkpoint = (index, offset)
+        return session
 
-            with open(path, encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
+    def _load_full(self, key: str, path: Path) -> Session:
+        """Parse the whole file (legacy files, or when the tail index is unusable)."""
+        messages, offsets = [], []
+        metadata_line: dict[str, Any] = {}
+        metadata_records = 0
+        corrupt = False
+        size = 0
 
+        with open(path, "rb") as f:
+            pos = 0
+            for raw in f:
+                start = pos
+                pos += len(raw)
+                size += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+
+                try:
                     data = json.loads(line)
+                except json.JSONDecodeError:
+                    # Typically a torn append from a crash; drop it and rewrite on next save
+                    corrupt = True
+                    continue
 
-                    if data.get("_type") == "metadata":
-                        metadata = data.get("metadata", {})
-                        created_at = datetime.fromisoformat(data["created_at"]) if data.get("created_at") else None
-                        last_consolidated = data.get("last_consolidated", 0)
-                    else:
-                        messages.append(data)
-
-            return Session(
-                key=key,
-                messages=messages,
-                created_at=created_at or datetime.now(),
-                metadata=metadata,
-                last_consolidated=last_consolidated
-            )
-        except Exception as e:
-            logger.warning("Failed to load session {}: {}", key, e)
-            return None
+                if data.get("_type") == "metadata":
+                    metadata_records += 1
+                    metadata_line = data
+                else:
+                    messages.append(data)
+                    offsets.append(start)
+
+        if corrupt:
+            logger.warning("Skipped unreadable lines in session {}", key)
+
+        session = self._new_session(key, metadata_line, messages)
+        session._persisted = len(messages)
+        session._bytes = size
+        session._stale_records = metadata_line.get("stale_records", max(0, metadata_records - 1))
+        session._rewrite = corrupt
+        session._offsets = offsets
+        session._checkpoint = (0, offsets[0]) if offsets else None
+        self._advance_checkpoint(session)
+        return session
+
+    @staticmethod
+    def _new_session(key: str, data: dict[str, Any], messages: list[dict[str, Any]]) -> Session:
+        created_at = data.get("created_at")
+        updated_at = data.get("updated_at")
+        session = Session(
+            key=key,
+            created_at=datetime.fromisoformat(created_at) if created_at else datetime.now(),
+            metadata=data.get("metadata", {}),
+            last_consolidated=data.get("last_consolidated", 0)
+        )
+        if updated_at:
+            session.updated_at = datetime.fromisoformat(updated_at)
+        session.messages = messages
+        session._persisted_consolidated = session.last_consolidated
+        return session
+
+    @staticmethod
+    def _advance_checkpoint(session: Session) -> None:
+        """Move the tail checkpoint up to last_consolidated and drop offsets before it."""
+        i = min(session.last_consolidated, session._persisted) - session._offsets_start
+        if 0 <= i < len(session._offsets):
+            session._checkpoint = (session._offsets_start + i, session._offsets[i])
+            del session._offsets[:i]
+            session._offsets_start += i
     
     def save(self, session: Session) -> None:
-        """Save a session to disk."""
+        """
+        Save a session to disk.
+
+        Only messages added since the previous save are written, followed by a
+        metadata record, so the cost depends on the turn rather than the history.
+        """
+        future, done = self._stage_save(session)
+        future.result()
+        done()
+
+    async def save_async(self, session: Session) -> None:
+        """``save()`` that waits for the journal commit without blocking the event loop."""
+        future, done = self._stage_save(session)
+        await asyncio.wrap_future(future)
+        done()
+
+    def compact(self, session: Session) -> None:
+        """Rewrite a session file with no superseded metadata records."""
+        future, done = self._stage_compact(session)
+        future.result()
+        done()
+
+    def _stage_save(self, session: Session) -> tuple[Future, Callable[[], None]]:
+        """Queue the save in the journal; returns its future and the bookkeeping to run once it is applied."""
         path = self._get_session_path(session.key)
+        size = self.journal.size(path)  # Includes saves still being committed
 
-        with open(path, "w", encoding="utf-8") as f:
-            metadata_line = {
-                "_type": "metadata",
-                "key": session.key,
-                "created_at": session.created_at.isoformat(),
-                "updated_at": session.updated_at.isoformat(),
-                "metadata": session.metadata,
-                "last_consolidated": session.last_consolidated
-            }
-            f.write(json.dumps(metadata_line, ensure_ascii=False) + "\n")
-            for msg in session.messages:
-                f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+        if (
+            session._rewrite
+            or not session._persisted
+            or session.message_count < session._persisted
+            or session._stale_records >= self.compact_after
+            or size is None
+        ):
+            return self._stage_compact(session)
 
-        self._cache[session.key] = session
+        pos = size
+        chunks = []
+        for msg in session.messages_since(session._persisted):
+            raw = _encode(msg)
+            session._offsets.append(pos)
+            pos += len(raw)
+            chunks.append(raw)
+        session._persisted = session.message_count
+        session._persisted_consolidated = session.last_consolidated
+        session._stale_records += 1
+        self._advance_checkpoint(session)
+        chunks.append(self._metadata_line(session))
+        future = self.journal.submit_append(path, b"".join(chunks))
+
+        def done() -> None:
+            session._bytes += sum(len(c) for c in chunks)
+            self._remember(session)
+
+        return future, done
+
+    def _stage_compact(self, session: Session) -> tuple[Future, Callable[[], None]]:
+        path = self._get_session_path(session.key)
+
+        header = self._metadata_line(session, checkpoint=False)
+        chunks = [header]
+        offsets: list[int] = []
+        tail_bytes = 0
+        pos = len(header)
+        # A lazily loaded head is copied from the old file without being parsed
+        if session._head_count and session._head_source:
+            for raw in _iter_message_lines(*session._head_source):
+                offsets.append(pos)
+                chunks.append(raw)
+                pos += len(raw)
+        head_end = pos
+        for msg in session.messages_since(session._head_count):
+            raw = _encode(msg)
+            offsets.append(pos)
+            chunks.append(raw)
+            pos += len(raw)
+            tail_bytes += len(raw)
+
+        session._persisted = session._head_count + len(session._tail)
+        session._persisted_consolidated = session.last_consolidated
+        session._stale_records = 0
+        session._rewrite = False
+        session._offsets_start = 0
+        session._offsets = offsets
+        session._checkpoint = (0, offsets[0]) if offsets else None
+        self._advance_checkpoint(session)
+        chunks.append(self._metadata_line(session))
+        future = self.journal.submit_write(path, b"".join(chunks))
+
+        def done() -> None:
+            if session._head_count:
+                session._head_source = (path, head_end)
+            session._bytes = tail_bytes
+            self._remember(session)
+
+        return future, done
+
+    @staticmethod
+    def _metadata_line(session: Session, checkpoint: bool = True) -> bytes:
+        metadata_line = {
+            "_type": "metadata",
+            "key": session.key,
+            "created_at": session.created_at.isoformat(),
+            "updated_at": session.updated_at.isoformat(),
+            "metadata": session.metadata,
+            "last_consolidated": session.last_consolidated,
+            "stale_records": session._stale_records,
+        }
+        if checkpoint and session._checkpoint:
+            metadata_line["tail_index"], metadata_line["tail_offset"] = session._checkpoint
+        return _encode(metadata_line)
     
     def invalidate(self, key: str) -> None:
         """Remove a session from the in-memory cache."""
@@ -193,20 +544,58 @@ class SessionManager:
         
         for path in self.sessions_dir.glob("*.jsonl"):
             try:
-                # Read just the metadata line
-                with open(path, encoding="utf-8") as f:
-                    first_line = f.readline().strip()
-                    if first_line:
-                        data = json.loads(first_line)
-                        if data.get("_type") == "metadata":
-                            key = data.get("key") or path.stem.replace("_", ":", 1)
-                            sessions.append({
-                                "key": key,
-                                "created_at": data.get("created_at"),
-                                "updated_at": data.get("updated_at"),
-                                "path": str(path)
-                            })
+                # The newest metadata record is the last line (or the first, after compaction)
+                data = _read_last_line(path)
+                if data.get("_type") != "metadata":
+                    with open(path, encoding="utf-8") as f:
+                        first_line = f.readline().strip()
+                    data = json.loads(first_line) if first_line else {}
+                if data.get("_type") == "metadata":
+                    key = data.get("key") or path.stem.replace("_", ":", 1)
+                    sessions.append({
+                        "key": key,
+                        "created_at": data.get("created_at"),
+                        "updated_at": data.get("updated_at"),
+                        "path": str(path)
+                    })
             except Exception:
                 continue
         
         return sorted(sessions, key=lambda x: x.get("updated_at", ""), reverse=True)
+
+
+def _encode(record: dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _iter_message_lines(path: Path, end: int) -> Iterator[bytes]:
+    """Raw message lines (metadata records skipped) from the start of a file up to byte ``end``."""
+    with open(path, "rb") as f:
+        pos = 0
+        for raw in f:
+            if pos >= end:
+                break
+            pos += len(raw)
+            if raw.strip() and not raw.startswith(b'{"_type": "metadata"'):
+                yield raw
+
+
+def _read_last_line(path: Path, block: int = 4096) -> dict[str, Any]:
+    """Parse the last JSON line of a file without reading the whole file."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        buf = b""
+        pos = end
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            if buf.rstrip(b"\n").count(b"\n") >= 1:
+                break
+    lines = buf.rstrip(b"\n").split(b"\n")
+    try:
+        return json.loads(lines[-1]) if lines and lines[-1] else {}
+    except json.JSONDecodeError:
+        return {}
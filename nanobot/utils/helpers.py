@@ -48,6 +48,15 @@ def timestamp() -> str:
     return datetime.now().isoformat()
 
 
+def file_stamp(path: Path) -> tuple[int, int] | None:
+    """Get (mtime_ns, size) of a file as a change detector, or None if it doesn't exist."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 def truncate_string(s: str, max_len: int = 100, suffix: str = "...") -> str:
     """Truncate a string to max length, adding suffix if truncated."""
     if len(s) <= max_len:
@@ -0,0 +1,130 @@
+"""Shared, pooled HTTP clients for tools and providers."""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import httpx
+from loguru import logger
+
+if TYPE_CHECKING:
+    from nanobot.config.schema import HttpConfig
+
+
+@dataclass
+class _ClientStats:
+    requests: int = 0
+    connections: int = 0  # New TCP connections opened
+    tls_handshakes: int = 0
+
+
+class HttpClientPool:
+    """
+    Process-wide registry of long-lived ``httpx.AsyncClient`` instances.
+
+    Clients are keyed by purpose (e.g. "web", "codex"), TLS/redirect settings
+    and default timeout, so repeated calls reuse pooled keep-alive connections
+    instead of paying a TCP + TLS handshake each time. A client replaced
+    because the event loop changed is closed on its own loop if that is still
+    running, or else by ``aclose_all()``.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[tuple, tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+        self._stats: dict[tuple, _ClientStats] = {}
+        self._retired: list[httpx.AsyncClient] = []  # Replaced clients still to be closed
+        self.http2 = False
+        self.limits = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+
+    def configure(self, config: HttpConfig) -> None:
+        """Apply pool settings; affects clients created afterwards."""
+        self.http2 = config.http2 and importlib.util.find_spec("h2") is not None
+        if config.http2 and not self.http2:
+            logger.info("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+        self.limits = httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        )
+
+    def get(
+        self,
+        purpose: str,
+        *,
+        verify: bool = True,
+        follow_redirects: bool = False,
+        max_redirects: int = 20,
+        timeout: float = 30.0,
+    ) -> httpx.AsyncClient:
+        """Return the shared client for a purpose and settings, creating it on first use."""
+        key = (purpose, verify, follow_redirects, max_redirects, timeout)
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(key)
+        # Pooled connections belong to the event loop that opened them
+        if entry is not None and not entry[0].is_closed and entry[1] is loop:
+            return entry[0]
+        if entry is not None and not entry[0].is_closed:
+            self._retire(*entry)
+        stats = self._stats.setdefault(key, _ClientStats())
+        client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=self.limits,
+            timeout=timeout,
+            verify=verify,
+            follow_redirects=follow_redirects,
+            max_redirects=max_redirects,
+            event_hooks={"request": [_tracer(stats)]},
+        )
+        self._clients[key] = (client, loop)
+        return client
+
+    def _retire(self, client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+        """Close a client created on another event loop, on that loop if it is still running."""
+        if loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        else:
+            self._retired.append(client)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Per-purpose request and connection counts (requests / connections = reuse factor)."""
+        out: dict[str, dict[str, int]] = {}
+        for (purpose, *_), s in self._stats.items():
+            agg = out.setdefault(purpose, {"requests": 0, "connections": 0, "tls_handshakes": 0})
+            agg["requests"] += s.requests
+            agg["connections"] += s.connections
+            agg["tls_handshakes"] += s.tls_handshakes
+        return out
+
+    async def aclose_all(self) -> None:
+        """Close every pooled client (gateway shutdown)."""
+        clients, self._clients = [c for c, _ in self._clients.values()], {}
+        clients, self._retired = clients + self._retired, []
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.debug("Error closing HTTP client: {}", e)
+        if self._stats:
+            logger.debug("HTTP client stats: {}", self.stats())
+
+
+def _tracer(stats: _ClientStats) -> Any:
+    """Request hook that attaches an httpcore trace callback to count new connections."""
+
+    async def trace(event: str, info: dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            stats.connections += 1
+        elif event == "connection.start_tls.complete":
+            stats.tls_handshakes += 1
+
+    async def on_request(request: httpx.Request) -> None:
+        stats.requests += 1
+        request.extensions["trace"] = trace
+
+    return on_request
+
+
+http_clients = HttpClientPool()
@@ -0,0 +1,287 @@
+"""Write-ahead journal with group commit for small state files."""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from pathlib import Path
+
+from loguru import logger
+
+_HEADER = struct.Struct("<II")  # payload length, crc32
+_COMMIT_INTERVAL_S = 0.002  # Window in which queued changes join the same commit
+_CHECKPOINT_BYTES = 8 * 1024 * 1024  # Checkpoint once the journal grows past this
+_CHECKPOINT_INTERVAL_S = 30.0
+
+
+def _fsync_path(path: Path, directory: bool = False) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY | (getattr(os, "O_DIRECTORY", 0) if directory else 0))
+    except OSError:
+        return  # Gone since (replaced or deleted); nothing left to sync
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # Directories cannot be fsynced on some platforms
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """
+    Write-ahead journal for the state files in one directory (and below it).
+
+    ``write()`` replaces a file atomically (temp file + rename) and ``append()``
+    extends one. Each change is first recorded in ``.journal`` and fsynced
+    there; only then is it applied to the file, without an fsync of its own.
+    Changes are queued and committed by a background flusher thread: records
+    queued within ``commit_interval`` of each other (or while a commit is in
+    progress) share a single fsync. ``write()``/``append()`` block until their
+    change is applied; coroutines use ``write_async()``/``append_async()``,
+    which wait without blocking the event loop, and ``submit_*()`` queues a
+    change and returns its future. A checkpoint fsyncs the files changed since
+    the last one and truncates the journal.
+
+    On startup the journal is replayed: full writes are re-applied and appends
+    are restored at their recorded offsets, repairing files torn by a crash.
+    """
+
+    _instances: dict[Path, Journal] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: Path, commit_interval: float = _COMMIT_INTERVAL_S):
+        self.directory = directory
+        self.path = directory / ".journal"
+        self.commit_interval = commit_interval
+        self._lock = threading.Lock()  # Guards the queue and the projected file state
+        self._queued = threading.Condition(self._lock)
+        self._io_lock = threading.Lock()  # Serializes journal commits and checkpoints
+        self._pending: list[tuple[bytes, dict, bytes, Path, Future]] = []  # (encoded, header, data, path, future)
+        self._sizes: dict[Path, int] = {}  # Projected size of files with queued changes
+        self._contents: dict[Path, bytes] = {}  # Latest queued write() per file
+        self._dirty: set[Path] = set()  # Files changed since the last checkpoint
+        self._journal_bytes = 0
+        self._last_checkpoint = time.monotonic()
+        self._flusher: threading.Thread | None = None
+        directory.mkdir(parents=True, exist_ok=True)
+        self.replay()
+
+    @classmethod
+    def for_dir(cls, directory: Path) -> Journal:
+        """Shared journal per directory; the first call replays it."""
+        key = directory.resolve()
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(directory)
+            return cls._instances[key]
+
+    def submit_write(self, path: Path, data: bytes) -> Future[int]:
+        """Queue an atomic replacement of ``path``; the future resolves once it is applied."""
+        return self._submit({"op": "write"}, data, path)
+
+    def submit_append(self, path: Path, data: bytes) -> Future[int]:
+        """Queue an append to ``path``; the future resolves to its offset once it is applied."""
+        return self._submit({"op": "append"}, data, path)
+
+    def write(self, path: Path, data: bytes) -> None:
+        """Atomically replace ``path`` with ``data`` (blocking until the change is applied)."""
+        self.submit_write(path, data).result()
+
+    def append(self, path: Path, data: bytes) -> int:
+        """Append ``data`` to ``path`` (blocking); returns the offset it was written at."""
+        return self.submit_append(path, data).result()
+
+    async def write_async(self, path: Path, data: bytes) -> None:
+        """``write()`` without blocking the event loop."""
+        await asyncio.wrap_future(self.submit_write(path, data))
+
+    async def append_async(self, path: Path, data: bytes) -> int:
+        """``append()`` without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit_append(path, data))
+
+    def size(self, path: Path) -> int | None:
+        """Size of ``path`` once queued changes are applied (None if it does not exist)."""
+        with self._lock:
+            if path in self._sizes:
+                return self._sizes[path]
+        try:
+            return path.stat().st_size
+        except OSError:
+            return None
+
+    def read(self, path: Path) -> bytes:
+        """Contents of a file replaced with ``write()``, including a write still being committed."""
+        with self._lock:
+            if path in self._contents:
+                return self._contents[path]
+        return path.read_bytes()
+
+    def flush(self) -> None:
+        """Commit and apply anything still queued (blocking)."""
+        with self._io_lock:
+            self._commit()
+
+    def checkpoint(self) -> None:
+        """Fsync files changed since the last checkpoint and truncate the journal."""
+        with self._io_lock:
+            self._commit()
+            self._checkpoint()
+
+    def close(self) -> None:
+        self.checkpoint()
+
+    def replay(self) -> int:
+        """Re-apply journaled changes after a crash; returns the number of records applied."""
+        try:
+            raw = self.path.read_bytes()
+        except OSError:
+            return 0
+        applied = pos = 0
+        while pos + _HEADER.size <= len(raw):
+            length, crc = _HEADER.unpack_from(raw, pos)
+            payload = raw[pos + _HEADER.size:pos + _HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                logger.warning("Journal {}: ignoring torn record at byte {}", self.path, pos)
+                break
+            pos += _HEADER.size + length
+            head, _, data = payload.partition(b"\n")
+            record = json.loads(head)
+            target = self.directory / record["path"]
+            if record["op"] == "write":
+                self._replace(target, data)
+            else:
+                self._restore_append(target, record["offset"], data)
+            self._dirty.add(target)
+            applied += 1
+        if applied:
+            logger.info("Journal {}: replayed {} records", self.path, applied)
+        with self._io_lock:
+            self._checkpoint()
+        return applied
+
+    @staticmethod
+    def _replace(target: Path, data: bytes) -> None:
+        tmp = target.with_name(f"{target.name}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+
+    @staticmethod
+    def _restore_append(target: Path, offset: int, data: bytes) -> None:
+        """Make sure ``data`` is at ``offset``, keeping anything written after it intact."""
+        mode = "r+b" if target.exists() else "w+b"
+        with open(target, mode) as f:
+            f.seek(offset)
+            if f.read(len(data)) == data:
+                return
+            f.seek(offset)
+            f.truncate()
+            f.write(data)
+
+    # ------------------------------------------------------------------
+    # Group commit
+    # ------------------------------------------------------------------
+
+    def _submit(self, header: dict, data: bytes, path: Path) -> Future[int]:
+        """Queue a record for the flusher; its future resolves to the append offset (0 for writes)."""
+        try:
+            relative = path.relative_to(self.directory)
+        except ValueError:  # Same place, spelled differently (relative path, symlink)
+            relative = path.resolve().relative_to(self.directory.resolve())
+        header = {**header, "path": relative.as_posix()}
+        future: Future[int] = Future()
+        with self._lock:
+            offset = 0
+            if header["op"] == "append":
+                # Earlier changes to the file may still be queued
+                offset = self._sizes.get(path, path.stat().st_size if path.exists() else 0)
+                header["offset"] = offset
+                if path in self._contents:
+                    self._contents[path] += data
+            else:
+                self._contents[path] = data
+            self._sizes[path] = offset + len(data)
+            payload = json.dumps(header).encode("utf-8") + b"\n" + data
+            self._pending.append((_HEADER.pack(len(payload), zlib.crc32(payload)) + payload, header, data, path, future))
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="journal-flusher", daemon=True)
+                self._flusher.start()
+                atexit.register(self.close)
+            self._queued.notify()
+        return future
+
+    def _flush_loop(self) -> None:
+        """Background flusher: commit whatever is queued, one group at a time."""
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._queued.wait()
+            if self.commit_interval:
+                time.sleep(self.commit_interval)  # Let more writers join this commit
+            with self._io_lock:
+                self._commit()
+                if self._journal_bytes >= _CHECKPOINT_BYTES or (
+                    time.monotonic() - self._last_checkpoint >= _CHECKPOINT_INTERVAL_S
+                ):
+                    self._checkpoint()
+
+    def _commit(self) -> None:
+        """Append queued records to the journal with one fsync, then apply them. Caller holds the IO lock."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        raw = b"".join(encoded for encoded, *_ in batch)
+        try:
+            with open(self.path, "ab") as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_bytes += len(raw)
+        except OSError as e:
+            logger.warning("Journal {}: commit failed, applying without it: {}", self.path, e)
+        results: list[tuple[Future, int | None, OSError | None]] = []
+        for _, header, data, path, future in batch:
+            try:
+                if header["op"] == "write":
+                    self._replace(path, data)
+                else:
+                    with open(path, "ab") as f:
+                        f.write(data)
+                results.append((future, header.get("offset", 0), None))
+            except OSError as e:
+                logger.warning("Journal {}: failed to apply a change to {}: {}", self.path, path, e)
+                results.append((future, None, e))
+        with self._lock:
+            self._dirty.update(path for *_, path, _ in batch)
+            queued = {path for *_, path, _ in self._pending}
+            self._sizes = {p: n for p, n in self._sizes.items() if p in queued}
+            self._contents = {p: c for p, c in self._contents.items() if p in queued}
+        for future, offset, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(offset)
+
+    def _checkpoint(self) -> None:
+        """Fsync dirty files, then empty the journal. Caller holds the IO lock."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        for path in dirty:
+            _fsync_path(path)
+        for directory in {path.parent for path in dirty}:
+            _fsync_path(directory, directory=True)
+        try:
+            if self._journal_bytes or self.path.exists():
+                with open(self.path, "wb") as f:
+                    os.fsync(f.fileno())
+        except OSError as e:
+            logger.warning("Journal {}: checkpoint failed: {}", self.path, e)
+        self._journal_bytes = 0
+        self._last_checkpoint = time.monotonic()
@@ -0,0 +1,94 @@
+"""Test OAuth token caching and 401 recovery in OpenAICodexProvider."""
+
+import asyncio
+import time
+
+from oauth_cli_kit import OAuthToken
+
+from nanobot.providers import openai_codex_provider as codex
+from nanobot.providers.base import LLMResponse, LLMStreamChunk
+from nanobot.providers.openai_codex_provider import OpenAICodexProvider
+
+
+def _token_source(monkeypatch, ttl_s: float, refreshes: bool = True) -> list[str]:
+    issued: list[str] = []
+
+    def _get_token(min_ttl_seconds: int = 60) -> OAuthToken:
+        time.sleep(0.05)  # Runs in a worker thread, like a real refresh
+        # Like oauth_cli_kit: the stored token is returned while it outlives min_ttl_seconds
+        if issued and (not refreshes or min_ttl_seconds < ttl_s):
+            return OAuthToken(access=issued[-1], refresh="r", expires=int((time.time() + ttl_s) * 1000), account_id="acct")
+        issued.append(f"access-{len(issued)}")
+        return OAuthToken(access=issued[-1], refresh="r", expires=int((time.time() + ttl_s) * 1000), account_id="acct")
+
+    monkeypatch.setattr(codex, "get_codex_token", _get_token)
+    return issued
+
+
+async def test_token_cached_with_single_flight_refresh(monkeypatch) -> None:
+    issued = _token_source(monkeypatch, ttl_s=3600)
+    provider = OpenAICodexProvider()
+
+    headers = await asyncio.gather(*(provider._get_headers() for _ in range(5)))
+    assert issued == ["access-0"]
+    assert all(h["Authorization"] == "Bearer access-0" for h in headers)
+    await provider._get_headers()
+    assert issued == ["access-0"]
+
+
+async def test_expiring_token_is_refreshed(monkeypatch) -> None:
+    issued = _token_source(monkeypatch, ttl_s=codex.TOKEN_REFRESH_MARGIN_S - 1)
+    provider = OpenAICodexProvider()
+    await provider._get_headers()
+    await provider._get_headers()
+    assert len(issued) == 2
+
+
+async def test_unauthorized_refreshes_token_and_retries(monkeypatch) -> None:
+    issued = _token_source(monkeypatch, ttl_s=3600)
+    seen: list[str] = []
+
+    async def _stream(url, headers, body, verify):
+        seen.append(headers["Authorization"])
+        if len(seen) == 1:
+            raise codex._CodexHTTPError(401, "HTTP 401: expired")
+        yield LLMStreamChunk(response=LLMResponse(content="ok"))
+
+    monkeypatch.setattr(codex, "_stream_codex", _stream)
+    response = await OpenAICodexProvider().chat([{"role": "user", "content": "hi"}])
+    assert response.content == "ok"
+    assert seen == ["Bearer access-0", "Bearer access-1"]
+    assert len(issued) == 2
+
+
+async def test_certificate_fallback_is_per_request(monkeypatch) -> None:
+    _token_source(monkeypatch, ttl_s=3600)
+    attempts: list[bool] = []
+
+    async def _stream(url, headers, body, verify):
+        attempts.append(verify)
+        if verify:
+            raise RuntimeError("[SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed")
+        yield LLMStreamChunk(response=LLMResponse(content="ok"))
+
+    monkeypatch.setattr(codex, "_stream_codex", _stream)
+    provider = OpenAICodexProvider()
+    for _ in range(2):
+        assert (await provider.chat([{"role": "user", "content": "hi"}])).content == "ok"
+    assert attempts == [True, False, True, False]
+
+
+async def test_unauthorized_without_new_token_is_not_retried(monkeypatch) -> None:
+    _token_source(monkeypatch, ttl_s=3600, refreshes=False)
+    calls = 0
+
+    async def _stream(url, headers, body, verify):
+        nonlocal calls
+        calls += 1
+        raise codex._CodexHTTPError(401, "HTTP 401: revoked")
+        yield
+
+    monkeypatch.setattr(codex, "_stream_codex", _stream)
+    response = await OpenAICodexProvider().chat([{"role": "user", "content": "hi"}])
+    assert response.finish_reason == "error"
+    assert calls == 1
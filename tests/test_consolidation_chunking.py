@@ -0,0 +1,71 @@
+"""Test map-reduce consolidation of large backlogs."""
+
+import asyncio
+from pathlib import Path
+
+from nanobot.agent.memory import MemoryStore
+from nanobot.providers.base import LLMResponse, ToolCallRequest
+from nanobot.session.manager import Session
+
+
+class _Provider:
+    """Summarizes chunks (tracking concurrency) and answers the final call with save_memory."""
+
+    def __init__(self, fail_summaries: bool = False):
+        self.fail_summaries = fail_summaries
+        self.summaries = 0
+        self.active = self.max_active = 0
+        self.final_prompt = ""
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+        if tools is None:
+            self.summaries += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            await asyncio.sleep(0.01)
+            self.active -= 1
+            if self.fail_summaries:
+                return LLMResponse(content="Error calling LLM: boom", finish_reason="error")
+            return LLMResponse(content=f"summary {self.summaries}")
+        self.final_prompt = messages[1]["content"]
+        return LLMResponse(content=None, tool_calls=[ToolCallRequest(
+            id="c1", name="save_memory",
+            arguments={"history_entry": "[2025-01-01 10:00] Long chat archived.", "memory_patch": []},
+        )])
+
+
+def _session(messages: int) -> Session:
+    session = Session(key="cli:test")
+    for i in range(messages):
+        session.add_message("user", f"message number {i} about the garden planner project")
+    return session
+
+
+async def test_large_backlog_is_summarized_in_bounded_parallel_chunks(tmp_path: Path) -> None:
+    provider = _Provider()
+    session = _session(200)
+    ok = await MemoryStore(tmp_path).consolidate(
+        session, provider, "test-model", archive_all=True, chunk_tokens=300, fan_out=3,
+    )
+    assert ok
+    assert provider.summaries > 3
+    assert provider.max_active == 3
+    assert "message number" not in provider.final_prompt
+    assert "[Part 1/" in provider.final_prompt
+    assert session.last_consolidated == 0
+
+
+async def test_small_backlog_skips_summaries(tmp_path: Path) -> None:
+    provider = _Provider()
+    assert await MemoryStore(tmp_path).consolidate(_session(5), provider, "test-model", archive_all=True)
+    assert provider.summaries == 0
+    assert "message number 4" in provider.final_prompt
+
+
+async def test_failed_chunk_summary_fails_consolidation(tmp_path: Path) -> None:
+    provider = _Provider(fail_summaries=True)
+    store = MemoryStore(tmp_path)
+    ok = await store.consolidate(_session(200), provider, "test-model", archive_all=True, chunk_tokens=300)
+    assert not ok
+    assert provider.final_prompt == ""
+    assert not store.history_file.exists()
@@ -0,0 +1,98 @@
+"""Test the background consolidation scheduler."""
+
+import asyncio
+import re
+from pathlib import Path
+
+from nanobot.agent.consolidation import ConsolidationScheduler
+from nanobot.agent.memory import MemoryStore
+from nanobot.providers.base import LLMResponse, ToolCallRequest
+from nanobot.session.manager import Session
+
+
+async def test_coalesces_and_bounds_workers() -> None:
+    active = max_active = 0
+    ran: list[str] = []
+
+    async def _run(session: Session) -> None:
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.02)
+        ran.append(session.key)
+        active -= 1
+
+    scheduler = ConsolidationScheduler(_run, max_workers=2)
+    submitted = [scheduler.submit(Session(key=k)) for k in ("a", "b", "a", "c", "b")]
+    assert submitted == [True, True, False, True, False]
+    assert "a" in scheduler
+
+    await asyncio.gather(*scheduler.tasks)
+    assert sorted(ran) == ["a", "b", "c"]
+    assert max_active == 2
+    assert "a" not in scheduler and not scheduler.tasks
+
+
+async def test_waits_for_idle_but_not_forever() -> None:
+    busy = True
+    ran = asyncio.Event()
+
+    async def _run(session: Session) -> None:
+        ran.set()
+
+    scheduler = ConsolidationScheduler(_run, is_busy=lambda: busy, idle_poll=0.01)
+    scheduler.submit(Session(key="a"))
+    await asyncio.sleep(0.05)
+    assert not ran.is_set()
+    busy = False
+    await asyncio.wait_for(ran.wait(), 1)
+
+    ran.clear()
+    busy = True
+    scheduler.max_defer = 0.03
+    scheduler.submit(Session(key="b"))
+    await asyncio.wait_for(ran.wait(), 1)
+
+
+async def test_concurrent_rewrites_keep_every_sessions_facts(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path)
+    store.write_long_term("## Facts\n\n")
+    both_read = asyncio.Barrier(2)
+
+    class _Rewriter:
+        """Answers with a full memory_update: the memory it was shown plus one fact."""
+
+        async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+            shown, conversation = messages[1]["content"].split("## Conversation to Process", 1)
+            shown = shown.split("## Current Long-term Memory\n", 1)[1].strip()
+            fact = re.search(r"fact from (\w+)", conversation).group(1)
+            if not both_read.broken:
+                await both_read.wait()  # Both sessions read the same memory before either writes
+            return LLMResponse(content=None, tool_calls=[ToolCallRequest(id="c", name="save_memory", arguments={
+                "history_entry": f"[2025-01-01 10:00] Fact from {fact}.",
+                "memory_update": re.sub(r"\[[0-9a-f]{6}\] ", "", shown) + f"\n- fact from {fact}\n",
+            })])
+
+    sessions = []
+    for key in ("a", "b"):
+        session = Session(key=key)
+        for i in range(6):
+            session.add_message("user", f"fact from {key} number {i}")
+        sessions.append(session)
+
+    async def _run(session: Session) -> None:
+        await MemoryStore(tmp_path).consolidate(session, _Rewriter(), "m", memory_window=4)
+
+    scheduler = ConsolidationScheduler(_run, max_workers=2)
+    for session in sessions:
+        scheduler.submit(session)
+    await asyncio.gather(*scheduler.tasks)
+    lost = [s for s in sessions if s.last_consolidated == 0]
+    assert len(lost) == 1  # The slower rewrite was refused, and its messages kept
+
+    await both_read.abort()
+    scheduler.submit(lost[0])  # The session's next turn resubmits it
+    await asyncio.gather(*scheduler.tasks)
+    memory = store.read_long_term()
+    assert "fact from a" in memory and "fact from b" in memory
+    assert all(s.last_consolidated == 4 for s in sessions)
@@ -0,0 +1,76 @@
+"""Test cached system prompt assembly in ContextBuilder."""
+
+import os
+from pathlib import Path
+
+from nanobot.agent.context import ContextBuilder
+
+
+def _bump_mtime(path: Path) -> None:
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_system_prompt_is_stable_and_excludes_volatile_parts(tmp_path: Path) -> None:
+    (tmp_path / "SOUL.md").write_text("be kind", encoding="utf-8")
+    builder = ContextBuilder(tmp_path)
+
+    first = builder.build_system_prompt()
+    second = builder.build_system_prompt()
+    assert first is second
+    assert "Current Time" not in first
+
+    history = [{"role": "user", "content": "earlier"}, {"role": "assistant", "content": "ok"}]
+    messages = builder.build_messages(history, "hi", channel="telegram", chat_id="42")
+    assert messages[0]["content"] == first  # The cacheable prefix carries nothing per-call
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+    runtime = messages[-1]["content"]  # Per-call details ride in the current turn, after the history
+    assert "## Current Time" in runtime
+    assert "Chat ID: 42" in runtime
+    assert ContextBuilder.strip_runtime_context(runtime) == "hi"
+    assert ContextBuilder.strip_runtime_context("plain") == "plain"
+
+
+def test_system_prompt_rebuilds_when_inputs_change(tmp_path: Path) -> None:
+    soul = tmp_path / "SOUL.md"
+    soul.write_text("be kind", encoding="utf-8")
+    builder = ContextBuilder(tmp_path)
+    assert "be kind" in builder.build_system_prompt()
+
+    soul.write_text("be brief", encoding="utf-8")
+    _bump_mtime(soul)
+    assert "be brief" in builder.build_system_prompt()
+
+    builder.memory.write_long_term("User likes tea")
+    _bump_mtime(builder.memory.memory_file)
+    assert "User likes tea" in builder.build_system_prompt()
+
+
+def test_unchanged_segments_are_not_reread(tmp_path: Path, monkeypatch) -> None:
+    builder = ContextBuilder(tmp_path)
+    builder.build_system_prompt()
+
+    def _fail(*_args, **_kwargs):
+        raise AssertionError("segment rebuilt without input change")
+
+    monkeypatch.setattr(builder.skills, "build_skills_summary", _fail)
+    monkeypatch.setattr(builder.memory, "get_memory_context", _fail)
+    builder.build_system_prompt()
+
+
+async def test_saved_turn_excludes_runtime_context(tmp_path: Path) -> None:
+    from nanobot.agent.loop import AgentLoop
+    from nanobot.bus.queue import MessageBus
+    from nanobot.providers.base import LLMProvider, LLMResponse
+
+    class _Echo(LLMProvider):
+        async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+            return LLMResponse(content="hello")
+
+        def get_default_model(self) -> str:
+            return "echo"
+
+    loop = AgentLoop(bus=MessageBus(), provider=_Echo(), workspace=tmp_path, model="echo")
+    await loop.process_direct("hi")
+    saved = loop.sessions.get_or_create("cli:direct").messages
+    assert saved[0]["content"] == "hi"
@@ -0,0 +1,85 @@
+"""Test the hedging / failover composite provider."""
+
+import asyncio
+from types import SimpleNamespace
+
+from nanobot.providers import litellm_provider
+from nanobot.providers.base import LLMProvider, LLMResponse
+from nanobot.providers.failover import FailoverProvider
+from nanobot.providers.litellm_provider import LiteLLMProvider
+
+
+class _Fake(LLMProvider):
+    def __init__(self, content: str, delay: float = 0.0, fail: bool = False):
+        super().__init__()
+        self.content = content
+        self.delay = delay
+        self.fail = fail
+        self.calls: list[str | None] = []
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+        self.calls.append(model)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return LLMResponse(content=self.content)
+
+    def get_default_model(self) -> str:
+        return "fake"
+
+
+async def test_fails_over_and_opens_circuit() -> None:
+    primary, backup = _Fake("a", fail=True), _Fake("b")
+    provider = FailoverProvider([(primary, "m1"), (backup, "m2")], hedge=False, failure_threshold=2)
+
+    for _ in range(3):
+        response = await provider.chat([{"role": "user", "content": "hi"}])
+        assert response.content == "b"
+    # After two consecutive failures the primary is skipped
+    assert len(primary.calls) == 2
+    assert backup.calls == ["m2", "m2", "m2"]
+    assert provider.stats()["m1"]["open"] is True
+
+
+async def test_hedges_slow_primary() -> None:
+    primary, backup = _Fake("slow", delay=5), _Fake("fast")
+    provider = FailoverProvider(
+        [(primary, "m1"), (backup, "m2")], hedge_min_delay=0.01, hedge_max_delay=0.01,
+    )
+
+    response = await asyncio.wait_for(provider.chat([{"role": "user", "content": "hi"}], model="m1-override"), 1)
+    assert response.content == "fast"
+    assert primary.calls == ["m1-override"]
+    assert backup.calls == ["m2"]
+
+
+async def test_repeated_hedging_does_not_leak_rate_limit_slots(monkeypatch) -> None:
+    async def _acompletion(**kwargs):
+        await asyncio.sleep(5 if "slow" in kwargs["model"] else 0)
+        message = SimpleNamespace(content=kwargs["model"], tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+    monkeypatch.setattr(litellm_provider, "acompletion", _acompletion)
+    slow = LiteLLMProvider(default_model="hedge-slow", provider_name="hedge-slow")
+    fast = LiteLLMProvider(default_model="hedge-fast", provider_name="hedge-fast")
+    provider = FailoverProvider(
+        [(slow, "hedge-slow"), (fast, "hedge-fast")], hedge_min_delay=0.01, hedge_max_delay=0.01,
+    )
+
+    limiter = slow._limiter("hedge-slow")
+    for _ in range(3 * int(limiter.limit)):
+        response = await asyncio.wait_for(provider.chat([{"role": "user", "content": "hi"}]), 1)
+        assert response.content == "hedge-fast"
+    assert limiter.in_flight == 0
+
+
+async def test_all_members_failing_returns_error() -> None:
+    provider = FailoverProvider([(_Fake("a", fail=True), "m1"), (_Fake("b", fail=True), "m2")], hedge=False)
+    response = await provider.chat([{"role": "user", "content": "hi"}])
+    assert response.finish_reason == "error"
+
+
+async def test_stream_fails_over_before_output() -> None:
+    provider = FailoverProvider([(_Fake("a", fail=True), "m1"), (_Fake("b"), "m2")])
+    chunks = [c async for c in provider.chat_stream([{"role": "user", "content": "hi"}])]
+    assert chunks[-1].response.content == "b"
@@ -0,0 +1,93 @@
+"""Test monthly, compressed history segments."""
+
+import gzip
+import json
+from datetime import datetime
+from pathlib import Path
+
+from nanobot.agent import history
+from nanobot.agent.history import HistoryLog
+from nanobot.agent.memory import MemoryStore
+
+
+def _set_month(monkeypatch, month: str) -> None:
+    class _Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromisoformat(f"{month}-15T12:00:00")
+
+    monkeypatch.setattr(history, "datetime", _Clock)
+
+
+def test_segments_roll_over_monthly_and_compress(tmp_path: Path, monkeypatch) -> None:
+    _set_month(monkeypatch, "2025-01")
+    store = MemoryStore(tmp_path)
+    store.append_history("[2025-01-10 09:00] Planned the Lisbon trip.")
+    store.append_history("[2025-01-20 09:00] Booked the hotel.")
+    _set_month(monkeypatch, "2025-02")
+    store.append_history("[2025-02-02 09:00] Flew to Lisbon.")
+
+    log = store.history
+    manifest = json.loads(log.manifest_file.read_text(encoding="utf-8"))
+    january, february = manifest["segments"]
+    assert (january["name"], january["start"], january["end"], january["entries"]) == ("2025-01", "2025-01-10", "2025-01-20", 2)
+    assert january["closed"] and (log.dir / "2025-01.md.gz").exists() and not (log.dir / "2025-01.md").exists()
+    assert b"Booked the hotel" in gzip.decompress((log.dir / "2025-01.md.gz").read_bytes())
+    assert not february["closed"]
+
+    # HISTORY.md only mirrors the open segment; January lives on compressed
+    assert store.history_file.read_text(encoding="utf-8") == "[2025-02-02 09:00] Flew to Lisbon.\n\n"
+    assert [s["name"] for s in log.overlapping(since="2025-02")] == ["2025-02"]
+    assert [s["name"] for s in log.overlapping(until="2025-01-15")] == ["2025-01"]
+
+    assert [d for d, _ in store.search_history("lisbon")] == ["2025-02-02", "2025-01-10"]
+    assert [d for d, _ in store.search_history("lisbon", until="2025-01")] == ["2025-01-10"]
+
+
+def test_size_limit_starts_a_new_segment(tmp_path: Path, monkeypatch) -> None:
+    _set_month(monkeypatch, "2025-03")
+    monkeypatch.setattr(history, "_SEGMENT_MAX_BYTES", 60)
+    log = HistoryLog(tmp_path)
+    for day in range(1, 4):
+        log.append(f"[2025-03-0{day} 10:00] Daily standup notes.\n\n".encode())
+    assert [s["name"] for s in log.segments] == ["2025-03", "2025-03.2", "2025-03.3"]
+    assert [s["closed"] for s in log.segments] == [True, True, False]
+
+    # A lost manifest is rebuilt from the segment files, in order
+    log.manifest_file.unlink()
+    assert [s["name"] for s in HistoryLog(tmp_path).segments] == ["2025-03", "2025-03.2", "2025-03.3"]
+
+
+def test_legacy_history_file_is_split_into_segments(tmp_path: Path, monkeypatch) -> None:
+    _set_month(monkeypatch, "2025-03")
+    memory_dir = tmp_path / "memory"
+    memory_dir.mkdir()
+    (memory_dir / "HISTORY.md").write_text(
+        "[2025-01-05 10:00] Old entry.\n\nWith a continuation.\n\n"
+        "[2025-03-01 10:00] Recent entry.\n\n",
+        encoding="utf-8",
+    )
+    store = MemoryStore(tmp_path)
+    assert [(s["name"], s["closed"]) for s in store.history.segments] == [("2025-01", True), ("2025-03", False)]
+    assert store.history_file.read_text(encoding="utf-8") == "[2025-03-01 10:00] Recent entry.\n\n"
+    assert "continuation" in store.search_history("old")[0][1]
+
+
+def test_manifest_is_repaired_after_a_crash_between_writes(tmp_path: Path, monkeypatch) -> None:
+    _set_month(monkeypatch, "2025-03")
+    log = HistoryLog(tmp_path)
+    log.append(b"[2025-03-01 10:00] Saved.\n\n")
+    manifest = log.manifest_file.read_bytes()
+    log.append(b"[2025-03-02 10:00] Appended before the crash.\n\n")
+    log.manifest_file.write_bytes(manifest)  # The manifest update never happened
+
+    segment = HistoryLog(tmp_path).segments[0]
+    assert (segment["entries"], segment["end"]) == (2, "2025-03-02")
+    assert segment["bytes"] == (log.dir / "2025-03.md").stat().st_size
+    assert (tmp_path / "HISTORY.md").read_bytes().count(b"Appended before the crash") == 1
+
+    # Crashed before the view was appended to as well
+    (tmp_path / "HISTORY.md").write_bytes(b"[2025-03-01 10:00] Saved.\n\n")
+    log.manifest_file.write_bytes(manifest)
+    HistoryLog(tmp_path).refresh()
+    assert (tmp_path / "HISTORY.md").read_bytes() == (log.dir / "2025-03.md").read_bytes()
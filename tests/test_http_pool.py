@@ -0,0 +1,50 @@
+"""Test the shared pooled HTTP client registry."""
+
+import asyncio
+
+import httpx
+
+from nanobot.config.schema import HttpConfig
+from nanobot.utils.http import HttpClientPool
+
+
+async def test_clients_are_shared_per_purpose_and_tls_settings() -> None:
+    pool = HttpClientPool()
+    pool.configure(HttpConfig(max_connections=5))
+
+    web = pool.get("web")
+    assert pool.get("web") is web
+    assert pool.get("web", verify=False) is not web
+    assert pool.get("codex") is not web
+    assert pool.get("web", timeout=5.0) is not web
+    assert pool.get("web", timeout=5.0).timeout.read == 5.0
+
+    await pool.aclose_all()
+    assert web.is_closed
+    assert pool.get("web") is not web
+    await pool.aclose_all()
+
+
+async def test_stats_count_requests_per_purpose() -> None:
+    pool = HttpClientPool()
+    client = pool.get("web")
+    client._transport = httpx.MockTransport(lambda request: httpx.Response(200, text="ok"))
+
+    for _ in range(3):
+        r = await client.get("https://example.com/")
+        assert r.text == "ok"
+    assert pool.stats()["web"]["requests"] == 3
+    await pool.aclose_all()
+
+
+def test_client_replaced_on_a_new_loop_is_closed() -> None:
+    pool = HttpClientPool()
+
+    async def _get() -> httpx.AsyncClient:
+        return pool.get("web")
+
+    first = asyncio.run(_get())
+    second = asyncio.run(_get())  # The first loop is closed by now
+    assert second is not first and not first.is_closed
+    asyncio.run(pool.aclose_all())
+    assert first.is_closed and second.is_closed
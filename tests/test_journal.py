@@ -0,0 +1,152 @@
+"""Test the group-commit write-ahead journal."""
+
+import asyncio
+import os
+import threading
+from pathlib import Path
+
+from nanobot.agent.memory import MemoryStore
+from nanobot.session.manager import SessionManager
+from nanobot.utils import journal as journal_mod
+from nanobot.utils.journal import Journal
+
+
+def test_writes_in_one_window_share_a_commit(tmp_path: Path, monkeypatch) -> None:
+    fsyncs = 0
+    real_fsync = os.fsync
+
+    def _counting_fsync(fd: int) -> None:
+        nonlocal fsyncs
+        fsyncs += 1
+        real_fsync(fd)
+
+    journal = Journal(tmp_path, commit_interval=0.1)
+    monkeypatch.setattr(journal_mod.os, "fsync", _counting_fsync)
+    threads = [
+        threading.Thread(target=journal.write, args=(tmp_path / f"state{i}.json", b"{}"))
+        for i in range(20)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert (tmp_path / "state7.json").read_bytes() == b"{}"  # Applied by the time write() returns
+    assert fsyncs == 1
+    assert journal.path.stat().st_size > 0
+
+    journal.checkpoint()
+    assert journal.path.stat().st_size == 0
+    journal.close()
+
+
+async def test_concurrent_coroutines_share_a_commit(tmp_path: Path, monkeypatch) -> None:
+    manager = SessionManager(tmp_path)
+    manager.journal.commit_interval = 0.05
+    sessions = []
+    for i in range(20):
+        session = manager.get_or_create(f"cli:{i}")
+        session.add_message("user", "hello")
+        sessions.append(session)
+
+    fsyncs = 0
+    real_fsync = os.fsync
+    ticks = 0
+
+    def _counting_fsync(fd: int) -> None:
+        nonlocal fsyncs
+        fsyncs += 1
+        real_fsync(fd)
+
+    async def _ticker() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    monkeypatch.setattr(journal_mod.os, "fsync", _counting_fsync)
+    ticker = asyncio.create_task(_ticker())
+    await asyncio.gather(*(manager.save_async(s) for s in sessions))
+    ticker.cancel()
+
+    assert fsyncs == 1
+    assert ticks > 1  # The event loop kept running during the commit window
+    reloaded = SessionManager(tmp_path)._load("cli:7")
+    assert [m["content"] for m in reloaded.messages] == ["hello"]
+
+    # A history entry's segment, view and manifest changes go out in one commit
+    store = MemoryStore(tmp_path)
+    store.history.refresh()
+    fsyncs = 0
+    await store.append_history_async("[2025-01-01 10:00] Planted tomatoes.")
+    assert fsyncs == 1
+    assert store.search_history("tomatoes")
+
+
+def test_record_is_durable_before_the_file_changes(tmp_path: Path, monkeypatch) -> None:
+    journal = Journal(tmp_path)
+    state = tmp_path / "sub" / "state.json"
+    state.parent.mkdir()
+    journal_sizes: list[int] = []
+    real_replace = journal_mod.os.replace
+
+    def _replace(src, dst) -> None:
+        journal_sizes.append(journal.path.stat().st_size)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(journal_mod.os, "replace", _replace)
+    journal.write(state, b'{"v": 1}')
+    assert journal_sizes[0] > len(b'{"v": 1}')
+    assert state.read_bytes() == b'{"v": 1}'
+
+    # Files below the journal's directory are replayed too
+    state.write_bytes(b"{")
+    Journal(tmp_path)
+    assert state.read_bytes() == b'{"v": 1}'
+
+
+def test_replay_repairs_torn_files(tmp_path: Path) -> None:
+    journal = Journal(tmp_path)
+    state, log = tmp_path / "state.json", tmp_path / "log.jsonl"
+    journal.write(state, b'{"v": 2}')
+    journal.append(log, b"one\n")
+    journal.append(log, b"two\n")
+    journal.flush()
+
+    # Simulate a crash: file contents torn, plus a half-written journal record
+    state.write_bytes(b'{"v')
+    log.write_bytes(b"one\ntw")
+    with open(journal.path, "ab") as f:
+        f.write(b"\x40\x00\x00\x00garbage")
+
+    assert Journal(tmp_path).replay() == 0  # Constructor already replayed and checkpointed
+    assert state.read_bytes() == b'{"v": 2}'
+    assert log.read_bytes() == b"one\ntwo\n"
+    assert journal.path.stat().st_size == 0
+
+
+def test_replay_keeps_appends_written_after_the_record(tmp_path: Path) -> None:
+    log = tmp_path / "log.jsonl"
+    journal = Journal(tmp_path)
+    journal.append(log, b"one\n")
+    journal.flush()
+    with open(log, "ab") as f:
+        f.write(b"two\n")
+    Journal(tmp_path)
+    assert log.read_bytes() == b"one\ntwo\n"
+
+
+def test_session_manager_replays_its_journal(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path)
+    session = manager.get_or_create("cli:test")
+    session.add_message("user", "hello")
+    manager.save(session)
+    session.add_message("assistant", "hi there")
+    manager.save(session)
+    manager.journal.flush()
+
+    path = manager._get_session_path("cli:test")
+    path.write_bytes(path.read_bytes()[:-20])  # Torn trailer
+    Journal(manager.sessions_dir)
+
+    reloaded = SessionManager(tmp_path)._load("cli:test")
+    assert [m["content"] for m in reloaded.messages] == ["hello", "hi there"]
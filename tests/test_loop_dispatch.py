@@ -0,0 +1,99 @@
+"""Test session-keyed message dispatch in AgentLoop.run."""
+
+import asyncio
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.agent.tools.message import MessageTool
+from nanobot.bus.events import InboundMessage
+from nanobot.bus.queue import MessageBus
+
+
+def _make_loop(tmp_path: Path, max_concurrency: int = 4) -> AgentLoop:
+    provider = MagicMock()
+    provider.get_default_model.return_value = "test-model"
+    return AgentLoop(
+        bus=MessageBus(), provider=provider, workspace=tmp_path,
+        model="test-model", max_concurrency=max_concurrency,
+    )
+
+
+def _msg(chat_id: str, content: str) -> InboundMessage:
+    return InboundMessage(channel="telegram", sender_id="u", chat_id=chat_id, content=content)
+
+
+async def _drain(loop: AgentLoop) -> None:
+    while loop._session_workers:
+        await asyncio.gather(*list(loop._session_workers.values()))
+
+
+@pytest.mark.asyncio
+async def test_same_session_messages_stay_ordered(tmp_path: Path) -> None:
+    loop = _make_loop(tmp_path)
+    seen: list[str] = []
+    active = 0
+    max_active = 0
+
+    async def _fake_process(msg, session_key=None, on_progress=None):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        seen.append(msg.content)
+        active -= 1
+        return None
+
+    loop._process_message = _fake_process  # type: ignore[method-assign]
+    for i in range(5):
+        loop._dispatch(_msg("a", f"m{i}"))
+    await _drain(loop)
+
+    assert seen == [f"m{i}" for i in range(5)]
+    assert max_active == 1
+    assert not loop._session_queues
+
+
+@pytest.mark.asyncio
+async def test_different_sessions_run_concurrently_up_to_cap(tmp_path: Path) -> None:
+    loop = _make_loop(tmp_path, max_concurrency=2)
+    active = 0
+    max_active = 0
+
+    async def _fake_process(msg, session_key=None, on_progress=None):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return None
+
+    loop._process_message = _fake_process  # type: ignore[method-assign]
+    for chat in ("a", "b", "c", "d"):
+        loop._dispatch(_msg(chat, "hi"))
+    await _drain(loop)
+
+    assert max_active == 2
+
+
+@pytest.mark.asyncio
+async def test_system_messages_share_origin_session_queue(tmp_path: Path) -> None:
+    loop = _make_loop(tmp_path)
+    system = InboundMessage(channel="system", sender_id="subagent", chat_id="telegram:a", content="done")
+    assert loop._dispatch_key(system) == _msg("a", "x").session_key
+
+
+@pytest.mark.asyncio
+async def test_message_tool_context_is_isolated_per_task() -> None:
+    tool = MessageTool()
+
+    async def _turn(chat_id: str) -> tuple[str, str, str | None]:
+        tool.set_context("telegram", chat_id)
+        await asyncio.sleep(0.01)
+        return tool._context.get()
+
+    a, b = await asyncio.gather(_turn("a"), _turn("b"))
+    assert a[1] == "a"
+    assert b[1] == "b"
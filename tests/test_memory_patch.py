@@ -0,0 +1,123 @@
+"""Test patch-based MEMORY.md consolidation."""
+
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+from nanobot.agent.memory import MemoryStore, annotate_facts, apply_memory_patch
+from nanobot.providers.base import LLMResponse, ToolCallRequest
+from nanobot.session.manager import Session
+
+_MEMORY = """# Long-term Memory
+
+## User Information
+
+- Name: Alice
+- Lives in Porto
+
+## Preferences
+
+- Likes tea
+"""
+
+
+def _ids(content: str) -> dict[str, str]:
+    return {line.split("] ", 1)[1]: line[1:].split("]", 1)[0] for line in annotate_facts(content).splitlines() if line.startswith("[")}
+
+
+def test_fact_ids_are_stable_across_edits() -> None:
+    ids = _ids(_MEMORY)
+    assert set(ids) == {"- Name: Alice", "- Lives in Porto", "- Likes tea"}
+    edited = _MEMORY.replace("- Likes tea", "- Likes coffee")
+    assert _ids(edited)["- Name: Alice"] == ids["- Name: Alice"]
+
+
+def test_apply_patch_adds_updates_and_removes() -> None:
+    ids = _ids(_MEMORY)
+    updated, applied = apply_memory_patch(_MEMORY, [
+        {"op": "update", "id": ids["- Lives in Porto"], "text": "Lives in Lisbon"},
+        {"op": "remove", "id": ids["- Likes tea"]},
+        {"op": "add", "section": "User Information", "text": "- Works as a nurse"},
+        {"op": "add", "section": "Project Context", "text": "Building a garden planner"},
+        {"op": "remove", "id": "ffffff"},
+    ])
+    assert applied == 4
+    assert updated == """# Long-term Memory
+
+## User Information
+
+- Name: Alice
+- Lives in Lisbon
+- Works as a nurse
+
+## Preferences
+
+## Project Context
+
+- Building a garden planner
+"""
+
+
+async def test_consolidate_applies_patch(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path)
+    store.write_long_term(_MEMORY)
+    session = Session(key="cli:test")
+    for i in range(6):
+        session.add_message("user", f"message {i}")
+
+    tea = _ids(_MEMORY)["- Likes tea"]
+    provider = AsyncMock()
+    provider.chat.return_value = LLMResponse(content=None, tool_calls=[ToolCallRequest(
+        id="c1",
+        name="save_memory",
+        arguments={
+            "history_entry": "[2025-01-01 10:00] Alice switched to coffee.",
+            "memory_patch": [{"op": "update", "id": tea, "text": "- Likes coffee"}],
+        },
+    )])
+
+    assert await store.consolidate(session, provider, "test-model", memory_window=4)
+    prompt = provider.chat.call_args.kwargs["messages"][1]["content"]
+    assert f"[{tea}] - Likes tea" in prompt
+    assert store.read_long_term() == _MEMORY.replace("Likes tea", "Likes coffee")
+    assert session.last_consolidated == 4
+
+
+async def test_rewrite_racing_another_consolidation_is_retried(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path)
+    store.write_long_term(_MEMORY)
+    session = Session(key="cli:test")
+    for i in range(6):
+        session.add_message("user", f"message {i}")
+
+    async def _chat(**kwargs):
+        # Another session's consolidation lands while this one waits for the LLM
+        store.write_long_term(_MEMORY + "- Owns a cat\n")
+        return LLMResponse(content=None, tool_calls=[ToolCallRequest(
+            id="c1",
+            name="save_memory",
+            arguments={
+                "history_entry": "[2025-01-01 10:00] Alice moved to Lisbon.",
+                "memory_update": _MEMORY.replace("Porto", "Lisbon"),
+            },
+        )])
+
+    provider = AsyncMock()
+    provider.chat.side_effect = _chat
+    assert not await store.consolidate(session, provider, "test-model", memory_window=4)
+    assert store.read_long_term() == _MEMORY + "- Owns a cat\n"
+    assert session.last_consolidated == 0
+    assert not store.search_history("Lisbon")  # Written once, by the retry
+
+    provider.chat.side_effect = None
+    provider.chat.return_value = LLMResponse(content=None, tool_calls=[ToolCallRequest(
+        id="c2",
+        name="save_memory",
+        arguments={
+            "history_entry": "[2025-01-01 10:00] Alice moved to Lisbon.",
+            "memory_update": (_MEMORY + "- Owns a cat\n").replace("Porto", "Lisbon"),
+        },
+    )])
+    assert await store.consolidate(session, provider, "test-model", memory_window=4)
+    assert "Lisbon" in store.read_long_term() and "Owns a cat" in store.read_long_term()
+    assert session.last_consolidated == 4
+    assert len(store.search_history("Lisbon")) == 1
@@ -0,0 +1,64 @@
+"""Test the BM25 history index and the memory_search tool."""
+
+from pathlib import Path
+
+from nanobot.agent import history
+from nanobot.agent.history import HistoryIndex, HistoryLog
+from nanobot.agent.memory import MemoryStore
+from nanobot.agent.search import BM25Index, term_counts, tokenize
+from nanobot.agent.tools.memory import MemorySearchTool
+
+
+def test_tokenize_words_and_cjk_bigrams() -> None:
+    assert tokenize("The Deploy of api-v2 to Prod") == ["deploy", "api-v2", "prod"]
+    assert tokenize("部署服务") == ["部署", "署服", "服务"]
+
+
+def test_bm25_prefers_rarer_terms() -> None:
+    index = BM25Index()
+    index.add(0, term_counts("lunch with alice"))
+    index.add(1, term_counts("lunch with bob about the database migration"))
+    index.add(2, term_counts("lunch again"))
+    assert [doc for doc, _ in index.search("lunch migration")] == [1, 2, 0]
+    index.remove(1)
+    assert all(doc != 1 for doc, _ in index.search("migration lunch"))
+
+
+async def test_memory_search_ranks_and_filters_by_date(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path)
+    store.append_history("[2025-01-03 10:00] Discussed the Postgres migration plan with Alice.")
+    store.append_history("[2025-02-11 09:30] Booked flights to Lisbon.\n\nHotel is near the river.")
+    store.append_history("[2025-03-20 18:00] Postgres migration finished; Alice approved.")
+
+    tool = MemorySearchTool(tmp_path)
+    result = await tool.execute(query="postgres migration")
+    assert result.index("2025-03-20") < result.index("2025-01-03")
+    assert "2025-01-03" not in await tool.execute(query="postgres", since="2025-02")
+    # Continuation paragraphs belong to their timestamped entry
+    assert "Booked flights" in await tool.execute(query="hotel river")
+    assert (await tool.execute(query="kubernetes")).startswith("No history entries")
+
+
+def test_index_catches_up_and_restores_from_snapshot(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(history, "_SNAPSHOT_EVERY_BYTES", 1)
+    log = HistoryLog(tmp_path)
+    index = HistoryIndex(log)
+    log.append(b"[2025-01-01 00:00] Alpha release shipped.\n\n")
+    assert [d for d, _ in index.search("alpha")] == ["2025-01-01"]
+
+    # Appended to the HISTORY.md view by another writer: imported and indexed
+    with open(log.view_file, "a", encoding="utf-8") as f:
+        f.write("[2025-01-02 00:00] Beta release shipped.\n\n")
+    assert len(index.search("release")) == 2
+    assert index.snapshot_file.exists()
+
+    restored = HistoryIndex(HistoryLog(tmp_path))
+    restored._load_snapshot()
+    assert len(restored._docs) == 2
+
+    # A segment that shrank invalidates the index
+    segment = log.dir / log.segments[-1]["file"]
+    segment.write_bytes(b"[2025-02-01 00:00] Gamma.\n\n")
+    log.segments[-1]["bytes"] = segment.stat().st_size
+    assert index.search("release") == []
+    assert len(index) == 1
@@ -0,0 +1,83 @@
+"""Test relevance-selected MEMORY.md injection in ContextBuilder."""
+
+from pathlib import Path
+
+from nanobot.agent.context import ContextBuilder
+from nanobot.providers.tokens import DEFAULT_ESTIMATOR
+
+_MEMORY = """# Long-term Memory
+
+## User Information
+
+- Name: Alice, based in Lisbon
+
+## Preferences
+
+- Prefers short answers
+
+## Project Context
+
+### Billing service
+- Postgres 16, migrations run with alembic
+- Invoices are generated nightly by a cron job
+
+### Mobile app
+- React Native, released through TestFlight
+
+## Important Notes
+
+- Garden: tomatoes need watering every morning
+"""
+
+
+def _builder(tmp_path: Path, memory_tokens: int) -> ContextBuilder:
+    builder = ContextBuilder(tmp_path, memory_tokens=memory_tokens)
+    builder.memory.write_long_term(_MEMORY)
+    return builder
+
+
+def test_small_memory_is_injected_in_full(tmp_path: Path) -> None:
+    builder = _builder(tmp_path, memory_tokens=2048)
+    prompt, runtime = (m["content"] for m in builder.build_messages([], "how are the tomatoes?"))
+    assert "React Native" in prompt
+    assert "Relevant Memory" not in runtime
+
+
+def test_large_memory_keeps_core_and_selects_relevant_sections(tmp_path: Path) -> None:
+    builder = _builder(tmp_path, memory_tokens=60)
+    prompt = builder.build_system_prompt()
+    assert "Alice" in prompt and "short answers" in prompt
+    assert "alembic" not in prompt and "tomatoes" not in prompt
+
+    messages = builder.build_messages([], "did the postgres migration run?")
+    assert messages[0]["content"] == prompt
+    relevant = messages[-1]["content"]
+    assert "## Billing service" in relevant and "alembic" in relevant
+    assert "TestFlight" not in relevant and "tomatoes" not in relevant
+
+    # Recent history also steers the selection
+    history = [{"role": "user", "content": "my tomatoes look dry"}]
+    relevant = builder.build_messages(history, "what should I do?")[-1]["content"]
+    assert "watering every morning" in relevant
+
+
+def test_relevant_memory_budget_accounts_for_core_on_first_turn(tmp_path: Path, monkeypatch) -> None:
+    builder = _builder(tmp_path, memory_tokens=60)
+    budgets: list[int] = []
+    select = builder.memory.get_relevant_context
+    monkeypatch.setattr(builder.memory, "get_relevant_context", lambda q, budget: budgets.append(budget) or select(q, budget))
+
+    builder.build_messages([], "did the postgres migration run?")
+    core = builder.memory.get_core_context(60)
+    assert core and budgets == [60 - DEFAULT_ESTIMATOR.count_text(core)]
+
+
+def test_long_sections_are_split_into_facts(tmp_path: Path) -> None:
+    facts = "\n".join(f"- fact {i}: the {'kiwi' if i == 57 else 'apple'} crate is in shed {i}" for i in range(80))
+    builder = ContextBuilder(tmp_path, memory_tokens=200)
+    builder.memory.write_long_term(f"## User Information\n\n- Alice\n\n## Inventory\n\n{facts}\n")
+
+    chunks, _ = builder.memory._chunks()
+    assert len(chunks) > 3
+    relevant = builder.memory.get_relevant_context("where is the kiwi crate", budget=400)
+    assert "fact 57" in relevant and "fact 3:" not in relevant
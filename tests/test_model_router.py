@@ -0,0 +1,57 @@
+"""Test per-workload model routing."""
+
+from pathlib import Path
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.bus.events import InboundMessage
+from nanobot.bus.queue import MessageBus
+from nanobot.providers.base import LLMProvider, LLMResponse
+from nanobot.providers.router import ModelRouter
+
+
+class _Recording(LLMProvider):
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+        self.models: list[str | None] = []
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+        self.models.append(model)
+        return LLMResponse(content=self.name, usage={"prompt_tokens": 10, "completion_tokens": 2})
+
+    def get_default_model(self) -> str:
+        return self.name
+
+
+async def test_router_falls_back_and_meters_per_workload() -> None:
+    main, small = _Recording("main"), _Recording("small")
+    router = ModelRouter({"heartbeat": (small, "small-model")})
+
+    provider, model = router.resolve("heartbeat", main, "big-model")
+    await provider.chat([{"role": "user", "content": "tick"}], model=model)
+    provider, model = router.resolve("interactive", main, "big-model")
+    await provider.chat([{"role": "user", "content": "hi"}], model=model)
+
+    assert small.models == ["small-model"]
+    assert main.models == ["big-model"]
+    stats = router.stats()
+    assert stats["heartbeat"]["calls"] == 1
+    assert stats["interactive"]["prompt_tokens"] == 10
+    assert "cron" not in stats
+
+
+async def test_agent_loop_routes_heartbeat_and_subagents(tmp_path: Path) -> None:
+    main, small = _Recording("main"), _Recording("small")
+    router = ModelRouter({"heartbeat": (small, "small-model"), "subagent": (small, "small-model")})
+    loop = AgentLoop(bus=MessageBus(), provider=main, workspace=tmp_path, model="big-model", router=router)
+
+    assert await loop.process_direct("tick", session_key="heartbeat", workload="heartbeat") == "small"
+    assert await loop.process_direct("hi") == "main"
+    assert loop.subagents.model == "small-model"
+    assert main.models == ["big-model"]
+
+    # The announcement of a finished subagent is handled on the subagent route too
+    announce = InboundMessage(channel="system", sender_id="subagent", chat_id="cli:direct", content="done")
+    response = await loop._process_message(announce)
+    assert response is not None and response.content == "small"
+    assert main.models == ["big-model"]
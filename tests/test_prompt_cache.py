@@ -0,0 +1,64 @@
+"""Test rolling prompt-cache breakpoints and cache usage accounting."""
+
+from types import SimpleNamespace
+
+from nanobot.providers.base import parse_usage
+from nanobot.providers.litellm_provider import LiteLLMProvider
+
+
+def _marked(messages: list[dict]) -> list[int]:
+    return [
+        i for i, m in enumerate(messages)
+        if isinstance(m.get("content"), list) and "cache_control" in m["content"][-1]
+    ]
+
+
+def test_breakpoints_roll_forward_with_tool_results() -> None:
+    provider = LiteLLMProvider(default_model="anthropic/claude-opus-4-5")
+    tools = [{"type": "function", "function": {"name": "a"}}, {"type": "function", "function": {"name": "b"}}]
+    messages = [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "old"},
+        {"role": "assistant", "content": "reply"},
+        {"role": "user", "content": "now"},
+    ]
+    msgs, new_tools = provider._apply_cache_control(messages, tools)
+    assert "cache_control" in new_tools[-1] and "cache_control" not in tools[-1]
+    assert _marked(msgs) == [0, 3]
+    assert messages[3]["content"] == "now"  # Originals untouched
+
+    messages += [
+        {"role": "assistant", "content": None, "tool_calls": [{"id": "1"}]},
+        {"role": "tool", "tool_call_id": "1", "content": "result"},
+    ]
+    msgs, _ = provider._apply_cache_control(messages, tools)
+    # Tools + system + current request + newest tool result = 4 breakpoints
+    assert _marked(msgs) == [0, 3, 5]
+
+
+def test_parse_usage_reports_cache_tokens() -> None:
+    anthropic = SimpleNamespace(
+        prompt_tokens=1200, completion_tokens=50, total_tokens=1250,
+        cache_read_input_tokens=1000, cache_creation_input_tokens=150,
+    )
+    assert parse_usage(anthropic) == {
+        "prompt_tokens": 1200, "completion_tokens": 50, "total_tokens": 1250,
+        "cache_read_input_tokens": 1000, "cache_creation_input_tokens": 150,
+    }
+    openai = SimpleNamespace(
+        prompt_tokens=100, completion_tokens=5, total_tokens=105,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=64),
+    )
+    assert parse_usage(openai)["cache_read_input_tokens"] == 64
+    assert parse_usage(None) == {}
+
+
+def test_system_breakpoint_excludes_per_call_context(tmp_path) -> None:
+    from nanobot.agent.context import ContextBuilder
+
+    provider = LiteLLMProvider(default_model="anthropic/claude-opus-4-5")
+    messages = ContextBuilder(tmp_path).build_messages([], "hi", channel="telegram", chat_id="42")
+    msgs, _ = provider._apply_cache_control(messages, None)
+    assert _marked(msgs) == [0, 1]
+    assert "Current Time" not in msgs[0]["content"][-1]["text"]
+    assert "Current Time" in msgs[1]["content"][0]["text"]
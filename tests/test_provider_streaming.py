@@ -0,0 +1,153 @@
+"""Test streamed chat completions and delta forwarding."""
+
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.bus.queue import MessageBus
+from nanobot.config.schema import ChannelsConfig
+from nanobot.providers.base import LLMProvider, LLMResponse, LLMStreamChunk, ToolCallRequest
+from nanobot.providers.streaming import OpenAIStreamAssembler
+
+
+def _chunk(content=None, tool_calls=None, finish_reason=None, usage=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls, reasoning_content=None)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)], usage=usage,
+    )
+
+
+def _tc(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+def test_assembler_emits_text_then_complete_tool_calls() -> None:
+    asm = OpenAIStreamAssembler()
+    events = []
+    events += asm.feed(_chunk(content="Hel"))
+    events += asm.feed(_chunk(content="lo"))
+    events += asm.feed(_chunk(tool_calls=[_tc(0, "call_a", "read_file", '{"pa')]))
+    events += asm.feed(_chunk(tool_calls=[_tc(0, arguments='th": "a.txt"}')]))
+    assert [e.content for e in events] == ["Hel", "lo"]
+
+    # Starting the second call completes the first one.
+    events = asm.feed(_chunk(tool_calls=[_tc(1, "call_b", "list_dir", '{"path": "."}')]))
+    assert events[0].tool_call.arguments == {"path": "a.txt"}
+
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+    asm.feed(_chunk(finish_reason="tool_calls", usage=usage))
+    final = asm.finish()
+    assert final[0].tool_call.name == "list_dir"
+    response = final[-1].response
+    assert response.content == "Hello"
+    assert [tc.id for tc in response.tool_calls] == ["call_a", "call_b"]
+    assert response.finish_reason == "tool_calls"
+    assert response.usage["total_tokens"] == 15
+
+
+class _StaticProvider(LLMProvider):
+    def __init__(self, response: LLMResponse):
+        super().__init__()
+        self._response = response
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7) -> LLMResponse:
+        return self._response
+
+    def get_default_model(self) -> str:
+        return "static"
+
+
+async def test_default_chat_stream_falls_back_to_chat() -> None:
+    call = ToolCallRequest(id="1", name="exec", arguments={"command": "ls"})
+    provider = _StaticProvider(LLMResponse(content="hi", tool_calls=[call]))
+    chunks = [c async for c in provider.chat_stream([{"role": "user", "content": "x"}])]
+    assert chunks[0].content == "hi"
+    assert chunks[1].tool_call is call
+    assert chunks[-1].response.content == "hi"
+
+
+@pytest.mark.asyncio
+async def test_agent_loop_forwards_visible_deltas(tmp_path: Path) -> None:
+    provider = MagicMock()
+    provider.get_default_model.return_value = "test-model"
+
+    async def _stream(**kwargs: Any):
+        for piece in ["<thi", "nk>plan</think>", "Hi ", "there"]:
+            yield LLMStreamChunk(content=piece)
+        yield LLMStreamChunk(response=LLMResponse(content="<think>plan</think>Hi there"))
+
+    provider.chat_stream = _stream
+    loop = AgentLoop(
+        bus=MessageBus(), provider=provider, workspace=tmp_path, model="test-model",
+        channels_config=ChannelsConfig(send_stream_deltas=True),
+    )
+    deltas: list[str] = []
+
+    async def _progress(content: str, *, tool_hint: bool = False, delta: bool = False) -> None:
+        if delta:
+            deltas.append(content)
+
+    final, _, _ = await loop._run_agent_loop([{"role": "user", "content": "hello"}], on_progress=_progress)
+    assert "".join(deltas) == "Hi there"
+    assert final == "Hi there"
+
+
+@pytest.mark.asyncio
+async def test_streamed_interim_text_is_still_reported(tmp_path: Path) -> None:
+    provider = MagicMock()
+    provider.get_default_model.return_value = "test-model"
+    call = ToolCallRequest(id="1", name="list_dir", arguments={"path": "."})
+    responses = [LLMResponse(content="Let me look.", tool_calls=[call]), LLMResponse(content="Done.")]
+
+    async def _stream(**kwargs: Any):
+        response = responses.pop(0)
+        yield LLMStreamChunk(content=response.content)
+        yield LLMStreamChunk(response=response)
+
+    provider.chat_stream = _stream
+    loop = AgentLoop(
+        bus=MessageBus(), provider=provider, workspace=tmp_path, model="test-model",
+        channels_config=ChannelsConfig(send_stream_deltas=True),
+    )
+    events: list[tuple[str, dict]] = []
+
+    async def _progress(content: str, **flags: bool) -> None:
+        events.append((content, flags))
+
+    await loop._run_agent_loop([{"role": "user", "content": "hello"}], on_progress=_progress)
+    # Non-streaming channels need the interim text; the flag lets streaming ones skip it
+    assert ("Let me look.", {"streamed": True}) in events
+
+
+@pytest.mark.asyncio
+async def test_telegram_edits_one_message_while_streaming() -> None:
+    from unittest.mock import AsyncMock
+
+    from nanobot.bus.events import OutboundMessage
+    from nanobot.channels.telegram import TelegramChannel
+    from nanobot.config.schema import TelegramConfig
+
+    channel = TelegramChannel(TelegramConfig(), MessageBus())
+    bot = SimpleNamespace(
+        send_message=AsyncMock(return_value=SimpleNamespace(message_id=7)),
+        edit_message_text=AsyncMock(),
+    )
+    channel._app = SimpleNamespace(bot=bot)
+
+    for piece in ["Hel", "lo ", "world"]:
+        await channel.send(OutboundMessage(
+            channel="telegram", chat_id="42", content=piece, metadata={"_progress": True, "_stream_delta": True},
+        ))
+    await channel.send(OutboundMessage(
+        channel="telegram", chat_id="42", content="Hello **world**", metadata={"_streamed": True},
+    ))
+
+    bot.send_message.assert_awaited_once()
+    assert bot.send_message.await_args.kwargs["text"] == "Hel"
+    final = bot.edit_message_text.await_args.kwargs
+    assert final["message_id"] == 7 and final["text"] == "Hello <b>world</b>"
+    assert not channel._streams
@@ -0,0 +1,114 @@
+"""Test client-side rate limiting, AIMD concurrency and LLM retries."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from nanobot.providers import litellm_provider
+from nanobot.providers.litellm_provider import LiteLLMProvider
+from nanobot.providers.ratelimit import RateLimiter, parse_rate_limit_headers
+
+
+def test_parse_rate_limit_headers() -> None:
+    info = parse_rate_limit_headers({
+        "llm_provider-x-ratelimit-remaining-requests": "0",
+        "llm_provider-x-ratelimit-reset-requests": "6m0s",
+        "x-ratelimit-reset-tokens": "20ms",
+        "Retry-After": "2",
+    })
+    assert info == {"remaining_requests": 0.0, "reset_requests": 360.0, "reset_tokens": 0.02, "retry_after": 2.0}
+
+
+async def test_aimd_concurrency_limit() -> None:
+    limiter = RateLimiter(max_concurrency=8)
+    limiter.limit = 2.0
+    await limiter.acquire()
+    await limiter.acquire()
+
+    third = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not third.done()
+
+    limiter.succeeded()
+    await asyncio.wait_for(third, 1)
+    assert limiter.limit == 2.5
+
+    limiter.failed(429, 0, {"retry-after": "0"})
+    assert limiter.limit == 1.25
+    limiter.succeeded()
+    assert limiter.in_flight == 0
+
+
+class _RateLimitedError(Exception):
+    status_code = 429
+    litellm_response_headers = {"retry-after": "0"}
+
+
+async def test_chat_retries_after_throttling(monkeypatch) -> None:
+    calls = 0
+
+    async def _acompletion(**kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise _RateLimitedError("slow down")
+        message = SimpleNamespace(content="hi", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+    monkeypatch.setattr(litellm_provider, "acompletion", _acompletion)
+    provider = LiteLLMProvider(default_model="ratelimit-test-model", provider_name="ratelimit-test")
+    response = await provider.chat([{"role": "user", "content": "x"}])
+    assert response.content == "hi"
+    assert calls == 2
+
+
+@pytest.mark.parametrize("status", [400, 401])
+async def test_chat_does_not_retry_client_errors(monkeypatch, status) -> None:
+    calls = 0
+
+    class _ClientError(Exception):
+        status_code = status
+
+    async def _acompletion(**kwargs):
+        nonlocal calls
+        calls += 1
+        raise _ClientError("bad request")
+
+    monkeypatch.setattr(litellm_provider, "acompletion", _acompletion)
+    provider = LiteLLMProvider(default_model="ratelimit-test-model", provider_name=f"ratelimit-{status}")
+    response = await provider.chat([{"role": "user", "content": "x"}])
+    assert response.finish_reason == "error"
+    assert calls == 1
+
+
+async def test_cancelled_calls_free_their_slots(monkeypatch) -> None:
+    started = 0
+
+    async def _hang(**kwargs):
+        nonlocal started
+        started += 1
+        if kwargs.get("stream"):
+            async def _chunks():
+                await asyncio.Event().wait()
+                yield None
+            return _chunks()
+        await asyncio.Event().wait()
+
+    async def _consume(provider: LiteLLMProvider) -> None:
+        async for _ in provider.chat_stream([{"role": "user", "content": "x"}]):
+            pass
+
+    monkeypatch.setattr(litellm_provider, "acompletion", _hang)
+    provider = LiteLLMProvider(default_model="ratelimit-test-model", provider_name="ratelimit-cancel")
+    tasks = [asyncio.create_task(provider.chat([{"role": "user", "content": "x"}])) for _ in range(3)]
+    tasks += [asyncio.create_task(_consume(provider)) for _ in range(3)]
+    limiter = provider._limiter("ratelimit-test-model")
+    while started < int(limiter.limit):  # The rest queue for a slot
+        await asyncio.sleep(0.01)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert limiter.in_flight == 0
+
+    assert not limiter._waiters
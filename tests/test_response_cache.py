@@ -0,0 +1,119 @@
+"""Test the exact-match LLM response cache."""
+
+from pathlib import Path
+
+from nanobot.agent.memory import MemoryStore
+from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+from nanobot.providers.cache import CachingProvider, ResponseCache, cache_key, cache_responses
+from nanobot.session.manager import Session
+
+
+class _Counting(LLMProvider):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+        self.calls += 1
+        return LLMResponse(
+            content=f"answer {self.calls}",
+            tool_calls=[ToolCallRequest(id="t1", name="noop", arguments={"a": 1})],
+        )
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def test_cache_key_is_canonical() -> None:
+    a = cache_key("m", [{"role": "user", "content": "x"}], None, 0, 10)
+    b = cache_key("m", [{"content": "x", "role": "user"}], [], 0, 10)
+    assert a == b
+    assert a != cache_key("m", [{"role": "user", "content": "x"}], None, 0, 11)
+
+
+async def test_only_deterministic_or_opted_in_calls_are_cached(tmp_path: Path) -> None:
+    inner = _Counting()
+    provider = CachingProvider(inner, ResponseCache(tmp_path))
+
+    await provider.chat(MESSAGES, temperature=0.7)
+    await provider.chat(MESSAGES, temperature=0.7)
+    assert inner.calls == 2
+
+    first = await provider.chat(MESSAGES, temperature=0)
+    again = await provider.chat(MESSAGES, temperature=0)
+    assert inner.calls == 3
+    assert again.content == first.content
+    assert again.tool_calls[0].arguments == {"a": 1}
+
+    with cache_responses():
+        await provider.chat(MESSAGES, temperature=0.7)
+        await provider.chat(MESSAGES, temperature=0.7)
+    assert inner.calls == 4
+
+    # Persisted on disk: a fresh cache instance serves the same entry
+    fresh = CachingProvider(inner, ResponseCache(tmp_path))
+    await fresh.chat(MESSAGES, temperature=0)
+    assert inner.calls == 4
+
+
+def test_ttl_and_lru_eviction(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path, ttl=60, max_bytes=500)  # Room for two entries
+    cache.put("a", LLMResponse(content="x" * 50))
+    cache.put("b", LLMResponse(content="y" * 50))
+    assert cache.get("a") is not None  # a is now more recently used than b
+    cache._index["b"] = (cache._index["b"][0], 0)  # Make b the oldest regardless of clock resolution
+    cache.put("c", LLMResponse(content="z" * 50))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    expired = ResponseCache(tmp_path, ttl=-1)
+    assert expired.get("a") is None
+    assert not (tmp_path / "a.json").exists()
+
+
+async def test_failed_consolidation_is_not_replayed_from_cache(tmp_path: Path) -> None:
+    replies = [
+        LLMResponse(content="I'll remember that."),  # No save_memory call
+        LLMResponse(content=None, tool_calls=[ToolCallRequest(
+            id="c1", name="save_memory",
+            arguments={"history_entry": "[2025-01-01 10:00] Archived.", "memory_patch": []},
+        )]),
+    ]
+
+    class _Scripted(_Counting):
+        async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+            self.calls += 1
+            return replies.pop(0)
+
+    inner = _Scripted()
+    provider = CachingProvider(inner, ResponseCache(tmp_path / "cache"))
+    session = Session(key="cli:test")
+    session.add_message("user", "remember the garden planner project")
+    store = MemoryStore(tmp_path)
+
+    assert not await store.consolidate(session, provider, "test-model", archive_all=True)
+    assert await store.consolidate(session, provider, "test-model", archive_all=True)
+    assert inner.calls == 2
+
+
+def test_routed_providers_share_the_response_cache(tmp_path: Path, monkeypatch) -> None:
+    from nanobot.cli import commands
+    from nanobot.config.schema import Config
+
+    monkeypatch.setattr("nanobot.config.loader.get_data_dir", lambda: tmp_path)
+    monkeypatch.setattr(commands, "_response_cache", None)
+    config = Config()
+    config.agents.defaults.model = "anthropic/claude-opus-4-5"
+    config.agents.defaults.routes.consolidation = "anthropic/claude-haiku-4-5"
+    config.agents.defaults.response_cache.enabled = True
+    config.providers.anthropic.api_key = "sk-test"
+
+    default = commands._make_provider(config)
+    routed, model = commands._make_router(config).resolve("consolidation", default, config.agents.defaults.model)
+    assert model == "anthropic/claude-haiku-4-5"
+    routed = routed.provider  # Unwrap the router's usage metering
+    assert isinstance(default, CachingProvider) and isinstance(routed, CachingProvider)
+    assert routed.cache is default.cache
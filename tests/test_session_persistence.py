@@ -0,0 +1,139 @@
+"""Test append-only session persistence and compaction."""
+
+import json
+from pathlib import Path
+
+from nanobot.session.manager import SessionManager
+
+
+def _lines(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line]
+
+
+def test_save_appends_only_new_messages(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path)
+    session = manager.get_or_create("cli:direct")
+    session.add_message("user", "one")
+    manager.save(session)
+    path = manager._get_session_path(session.key)
+    size = path.stat().st_size
+
+    session.add_message("assistant", "two")
+    session.last_consolidated = 1
+    manager.save(session)
+    appended = path.read_bytes()[size:].decode("utf-8").splitlines()
+    assert [json.loads(line).get("content") for line in appended] == ["two", None]
+    assert json.loads(appended[-1])["_type"] == "metadata"
+
+    reloaded = SessionManager(tmp_path).get_or_create("cli:direct")
+    assert [m["content"] for m in reloaded.messages] == ["one", "two"]
+    assert reloaded.last_consolidated == 1
+    assert manager.list_sessions()[0]["updated_at"] == session.updated_at.isoformat()
+
+
+def test_compaction_after_threshold_and_clear(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path, compact_after=3)
+    session = manager.get_or_create("cli:direct")
+    path = manager._get_session_path(session.key)
+    for i in range(5):
+        session.add_message("user", f"m{i}")
+        manager.save(session)
+    records = _lines(path)
+    assert sum(r.get("_type") == "metadata" for r in records) <= 3
+    assert records[0]["_type"] == "metadata"
+
+    session.clear()
+    manager.save(session)
+    assert [r["_type"] for r in _lines(path)] == ["metadata", "metadata"]
+
+
+def test_torn_append_is_dropped_and_rewritten(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path)
+    session = manager.get_or_create("cli:direct")
+    session.add_message("user", "kept")
+    manager.save(session)
+    path = manager._get_session_path(session.key)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"role": "user", "cont')
+
+    fresh = SessionManager(tmp_path)
+    reloaded = fresh.get_or_create("cli:direct")
+    assert [m["content"] for m in reloaded.messages] == ["kept"]
+    reloaded.add_message("user", "next")
+    fresh.save(reloaded)
+    assert [m["content"] for m in SessionManager(tmp_path).get_or_create("cli:direct").messages] == ["kept", "next"]
+
+
+def test_lru_cache_evicts_clean_unpinned_sessions(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path, max_cached=2)
+    for key in ("a:1", "b:1"):
+        session = manager.get_or_create(key)
+        session.add_message("user", key)
+        manager.save(session)
+
+    manager.pin("a:1")
+    dirty = manager.get_or_create("c:1")
+    dirty.add_message("user", "unsaved")
+    manager.get_or_create("d:1")
+    assert set(manager._cache) == {"a:1", "c:1", "d:1"}  # b evicted; a pinned, c dirty
+
+    manager.unpin("a:1")
+    manager.save(dirty)
+    assert len(manager._cache) == 2
+    stats = manager.cache_stats()
+    assert stats["misses"] == 4 and stats["evictions"] == 2
+
+    assert manager.get_or_create("b:1").messages[0]["content"] == "b:1"
+
+
+def test_cache_respects_byte_budget(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path, max_cache_bytes=1)
+    session = manager.get_or_create("a:1")
+    session.add_message("user", "x" * 100)
+    manager.save(session)
+    manager.get_or_create("b:1")
+    assert "a:1" not in manager._cache
+
+
+def test_load_reads_only_unconsolidated_tail(tmp_path: Path, monkeypatch) -> None:
+    manager = SessionManager(tmp_path)
+    session = manager.get_or_create("cli:direct")
+    for i in range(10):
+        session.add_message("user", f"m{i}")
+    manager.save(session)
+    session.last_consolidated = 7
+    session.add_message("assistant", "m10")
+    manager.save(session)
+
+    fresh = SessionManager(tmp_path)
+    loaded = fresh.get_or_create("cli:direct")
+    assert loaded._head_count == 7 and len(loaded._tail) == 4
+    assert loaded.message_count == 11
+    assert [m["content"] for m in loaded.get_history()] == ["m7", "m8", "m9", "m10"]
+
+    loaded.add_message("user", "m11")
+    fresh.save(loaded)
+    assert "cli:direct" in repr(loaded) and loaded == loaded
+    assert loaded._head_count == 7  # saving, repr and == do not page in the head
+    assert [m["content"] for m in loaded.messages] == [f"m{i}" for i in range(12)]
+
+
+def test_compaction_keeps_lazy_head(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path, compact_after=1)
+    session = manager.get_or_create("cli:direct")
+    for i in range(6):
+        session.add_message("user", f"m{i}")
+    session.last_consolidated = 4
+    manager.save(session)
+
+    fresh = SessionManager(tmp_path, compact_after=1)
+    loaded = fresh.get_or_create("cli:direct")
+    for i in range(6, 8):
+        loaded.add_message("user", f"m{i}")
+        fresh.save(loaded)  # second save compacts
+    assert loaded._head_count == 4
+
+    reloaded = SessionManager(tmp_path).get_or_create("cli:direct")
+    assert [m["content"] for m in reloaded.messages_since(4)] == ["m4", "m5", "m6", "m7"]
+    assert [m["content"] for m in reloaded.messages] == [f"m{i}" for i in range(8)]
+    assert [m["content"] for m in loaded.messages] == [f"m{i}" for i in range(8)]
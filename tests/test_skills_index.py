@@ -0,0 +1,78 @@
+"""Test the parsed skill index behind SkillsLoader."""
+
+import os
+from pathlib import Path
+
+from nanobot.agent import skills as skills_mod
+from nanobot.agent.skills import SkillsLoader
+
+
+def _write_skill(root: Path, name: str, body: str, meta: str = "") -> Path:
+    path = root / name / "SKILL.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    front = f"---\nname: {name}\ndescription: {name} skill\n"
+    if meta:
+        front += f"metadata: {meta}\n"
+    path.write_text(f"{front}---\n{body}\n", encoding="utf-8")
+    return path
+
+
+def test_index_parses_each_skill_once(tmp_path: Path, monkeypatch) -> None:
+    builtin = tmp_path / "builtin"
+    _write_skill(builtin, "alpha", "Alpha body", '{"nanobot": {"always": true}}')
+    _write_skill(builtin, "beta", "Beta body")
+    loader = SkillsLoader(tmp_path / "ws", builtin_skills_dir=builtin)
+
+    parsed: list[str] = []
+    original = skills_mod._parse_skill
+
+    def _tracking(name, *args):
+        parsed.append(name)
+        return original(name, *args)
+
+    monkeypatch.setattr(skills_mod, "_parse_skill", _tracking)
+    assert "<description>alpha skill</description>" in loader.build_skills_summary()
+    assert loader.get_always_skills() == ["alpha"]
+    assert loader.load_skills_for_context(["alpha"]) == "### Skill: alpha\n\nAlpha body"
+    assert sorted(parsed) == ["alpha", "beta"]
+
+    version = loader.index.version
+    loader.list_skills()
+    assert loader.index.version == version and len(parsed) == 2
+
+
+def test_index_picks_up_edits_and_new_skills(tmp_path: Path) -> None:
+    builtin = tmp_path / "builtin"
+    path = _write_skill(builtin, "alpha", "old")
+    loader = SkillsLoader(tmp_path / "ws", builtin_skills_dir=builtin)
+    signature = loader.signature()
+
+    _write_skill(builtin, "alpha", "new body")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert "new body" in loader.load_skills_for_context(["alpha"])
+
+    _write_skill(tmp_path / "ws" / "skills", "alpha", "override")
+    assert [s["source"] for s in loader.list_skills()] == ["workspace"]
+    assert loader.signature() != signature
+
+
+def test_requirement_checks_are_memoized(tmp_path: Path, monkeypatch) -> None:
+    builtin = tmp_path / "builtin"
+    _write_skill(builtin, "tool", "body", '{"nanobot": {"requires": {"bins": ["nanobot-missing-bin"]}}}')
+    loader = SkillsLoader(tmp_path / "ws", builtin_skills_dir=builtin)
+
+    calls: list[str] = []
+    monkeypatch.setattr(skills_mod.shutil, "which", lambda b: calls.append(b) or None)
+
+    for _ in range(3):
+        assert loader.list_skills() == []
+        assert "CLI: nanobot-missing-bin" in loader.build_skills_summary()
+    assert calls == ["nanobot-missing-bin"]
+
+    # Once the TTL has passed, an installed binary is picked up by the next check
+    now = skills_mod.time.monotonic() + skills_mod.REQUIREMENTS_TTL_S + 1
+    monkeypatch.setattr(skills_mod.time, "monotonic", lambda: now)
+    monkeypatch.setattr(skills_mod.shutil, "which", lambda b: calls.append(b) or f"/usr/bin/{b}")
+    assert [s["name"] for s in loader.list_skills()] == ["tool"]
+    assert calls == ["nanobot-missing-bin"] * 2
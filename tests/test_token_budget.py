@@ -0,0 +1,55 @@
+"""Test token estimation and token-budgeted history."""
+
+from pathlib import Path
+
+from nanobot.agent.context import ContextBuilder
+from nanobot.providers.tokens import DEFAULT_ESTIMATOR, TokenEstimator, get_estimator
+from nanobot.session.manager import Session
+
+
+def test_estimator_counts_latin_and_cjk() -> None:
+    assert DEFAULT_ESTIMATOR.count_text("a" * 400) == 101
+    assert DEFAULT_ESTIMATOR.count_text("你好世界") == 5
+    assert get_estimator("anthropic/claude-opus-4-5").chars_per_token == 3.5
+    assert get_estimator("unknown-model") is DEFAULT_ESTIMATOR
+
+
+def test_history_drops_oldest_turns_to_fit_budget() -> None:
+    session = Session(key="cli:test")
+    session.add_message("user", "old question")
+    session.add_message("assistant", "x" * 4000)  # ~1000 tokens
+    session.add_message("user", "new question")
+    session.add_message("assistant", "short answer")
+
+    assert len(session.get_history()) == 4
+    history = session.get_history(max_tokens=200)
+    assert [m["content"] for m in history] == ["new question", "short answer"]
+
+
+def test_history_cut_mid_turn_realigns_to_user() -> None:
+    session = Session(key="cli:test")
+    session.add_message("user", "q1")
+    session.add_message("assistant", "", tool_calls=[{"id": "1", "type": "function",
+                        "function": {"name": "exec", "arguments": "{}"}}])
+    session.add_message("tool", "y" * 2000, tool_call_id="1", name="exec")
+    session.add_message("assistant", "done")
+
+    # The tool result alone exceeds the budget, and no user message follows it
+    assert session.get_history(max_tokens=100) == []
+
+
+def test_build_messages_respects_total_budget(tmp_path: Path) -> None:
+    builder = ContextBuilder(tmp_path)
+    history = [
+        {"role": "user", "content": "a" * 2000},
+        {"role": "assistant", "content": "b" * 2000},
+        {"role": "user", "content": "recent"},
+        {"role": "assistant", "content": "reply"},
+    ]
+    estimator = TokenEstimator()
+    system_tokens = sum(map(estimator.count_message, builder.build_messages([], "hi")))
+
+    full = builder.build_messages(history, "hi")
+    assert len(full) == 6
+    trimmed = builder.build_messages(history, "hi", token_budget=system_tokens + 100, estimator=estimator)
+    assert [ContextBuilder.strip_runtime_context(m["content"]) for m in trimmed[1:]] == ["recent", "reply", "hi"]
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any
 
 from nanobot.agent.tools.base import Tool
@@ -86,3 +87,83 @@ async def test_registry_returns_validation_error() -> None:
     reg.register(SampleTool())
     result = await reg.execute("sample", {"query": "hi"})
     assert "Invalid parameters" in result
+
+
+class _TracingTool(Tool):
+    def __init__(self, name: str, safe: bool, log: list[str], active: list[int]):
+        self._name = name
+        self.concurrency_safe = safe
+        self._log = log
+        self._active = active
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return self._name
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {"type": "object", "properties": {"tag": {"type": "string"}}}
+
+    async def execute(self, tag: str = "", **kwargs: Any) -> str:
+        self._active[0] += 1
+        self._active[1] = max(self._active[1], self._active[0])
+        self._log.append(f"start {self._name}:{tag}")
+        await asyncio.sleep(0.01)
+        self._log.append(f"end {self._name}:{tag}")
+        self._active[0] -= 1
+        return f"{self._name}:{tag}"
+
+
+async def test_execute_batch_runs_safe_calls_concurrently_in_order() -> None:
+    log: list[str] = []
+    active = [0, 0]
+    reg = ToolRegistry()
+    reg.register(_TracingTool("read", True, log, active))
+    reg.register(_TracingTool("write", False, log, active))
+
+    calls = [("read", {"tag": "a"}), ("read", {"tag": "b"}), ("write", {"tag": "c"}), ("read", {"tag": "d"})]
+    results = await reg.execute_batch(calls)
+
+    assert results == ["read:a", "read:b", "write:c", "read:d"]
+    assert active[1] == 2
+    # The write waits for earlier reads and finishes before the later read starts.
+    assert log.index("start write:c") > log.index("end read:b")
+    assert log.index("start read:d") > log.index("end write:c")
+
+
+def test_registry_caches_definitions_until_registration_changes() -> None:
+    reg = ToolRegistry()
+    reg.register(SampleTool())
+    first = reg.get_definitions()
+    second = reg.get_definitions()
+    assert first == second and first is not second
+    assert first[0] is second[0]
+
+    version = reg.version
+    reg.unregister("sample")
+    assert reg.version == version + 1
+    assert reg.get_definitions() == []
+
+
+def test_validator_is_compiled_once_at_registration() -> None:
+    calls = 0
+
+    class CountingTool(SampleTool):
+        @property
+        def parameters(self) -> dict[str, Any]:
+            nonlocal calls
+            calls += 1
+            return super().parameters
+
+    tool = CountingTool()
+    ToolRegistry().register(tool)
+    for _ in range(3):
+        assert tool.validate_params({"query": "hi", "count": 2}) == []
+    assert tool.validate_params({"query": "hi", "count": 2, "meta": {"flags": [1]}}) == [
+        "missing required meta.tag", "meta.flags[0] should be string",
+    ]
+    assert calls == 1
@@ -0,0 +1,60 @@
+"""Test the persistent LLM usage ledger and the `nanobot usage` command."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from nanobot.cli.commands import app
+from nanobot.providers.base import LLMProvider, LLMResponse
+from nanobot.providers.ledger import UsageLedger, aggregate, current_session
+from nanobot.providers.router import ModelRouter
+
+
+class _Fixed(LLMProvider):
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+        return LLMResponse(content="ok", usage={"prompt_tokens": 100, "completion_tokens": 7,
+                                               "cache_read_input_tokens": 80})
+
+    def get_default_model(self) -> str:
+        return "fixed"
+
+
+async def test_router_records_calls_with_session_and_workload(tmp_path: Path) -> None:
+    ledger = UsageLedger(tmp_path / "ledger.jsonl")
+    router = ModelRouter(ledger=ledger)
+
+    provider, model = router.resolve("cron", _Fixed(), "m1")
+    token = current_session.set("cron:job1")
+    try:
+        await provider.chat([{"role": "user", "content": "x"}], model=model)
+        await provider.chat([{"role": "user", "content": "x"}], model=model)
+    finally:
+        current_session.reset(token)
+    provider, model = router.resolve("interactive", _Fixed(), "m2")
+    await provider.chat([{"role": "user", "content": "y"}], model=model)
+
+    entries = list(ledger.entries())
+    assert [(e["session"], e["workload"], e["model"]) for e in entries] == [
+        ("cron:job1", "cron", "m1"), ("cron:job1", "cron", "m1"), (None, "interactive", "m2"),
+    ]
+    assert entries[0]["in"] == 100 and entries[0]["cached"] == 80 and entries[0]["finish"] == "stop"
+
+    by_session = aggregate(iter(entries), by="session")
+    assert [(g["key"], g["calls"], g["out"]) for g in by_session] == [("-", 1, 7), ("cron:job1", 2, 14)]
+
+
+def test_usage_command_aggregates_ledger(tmp_path: Path) -> None:
+    ledger = UsageLedger(tmp_path / "usage" / "ledger.jsonl")
+    ledger.record(workload="interactive", model="gpt-4o", provider="openai",
+                  usage={"prompt_tokens": 1234, "completion_tokens": 56}, latency_s=2.0, finish_reason="stop")
+    with ledger.path.open("a") as f:
+        f.write("{torn\n")
+
+    with patch("nanobot.config.loader.get_data_dir", return_value=tmp_path):
+        result = CliRunner().invoke(app, ["usage", "--by", "model"])
+        assert result.exit_code == 0
+        assert "gpt-4o" in result.stdout and "1,234" in result.stdout
+
+        result = CliRunner().invoke(app, ["usage", "--by", "color"])
+        assert result.exit_code == 1